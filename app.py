@@ -3,16 +3,18 @@ Main Streamlit application for the ESG & Impact Pre-Investment Analyzer.
 """
 
 import os
-import yaml
 import streamlit as st
-from dotenv import load_dotenv
 from loguru import logger
 import re
 import io
 
-from standards.loader import StandardsLoader
-from prompts.enhanced_prompts import EnhancedPromptManager
-from engine.llm_service import get_llm_manager
+from utils.app_resources import (
+    get_config,
+    get_llm_manager,
+    get_prompt_manager,
+    invalidate as invalidate_resources,
+    load_environment
+)
 from config.risk_classification import (
     RISK_CATEGORIES,
     SECTOR_RISK_MAPPING,
@@ -24,16 +26,20 @@ from utils.ehs_processor import EHSProcessor
 import json
 from formatters.docx_formatter import DocxFormatter
 from utils.llm_report_parser import parse_llm_report
+from prompts.enhanced_prompts import assemble_report, REPORT_SECTIONS
 from engine.llm_service import ProviderType
+from engine.report_repair import repair_report
+from engine import tracing
+from engine.tracing import get_tracer, waterfall
+import plotly.graph_objects as go
 
 # Load environment variables
-load_dotenv()
+load_environment()
 
-# Load configuration
+# Load configuration (cached for the whole process, re-read when the file changes)
 def load_config():
     try:
-        with open("config/config.yaml", "r") as f:
-            return yaml.safe_load(f)
+        return get_config()
     except Exception as e:
         logger.error(f"Error loading config: {str(e)}")
         st.error("Error loading configuration. Please check the config file.")
@@ -72,8 +78,7 @@ def validate_api_keys():
 if not validate_api_keys():
     st.stop()
 
-standards_loader = StandardsLoader()
-prompt_manager = EnhancedPromptManager(standards_loader)
+prompt_manager = get_prompt_manager()
 
 # Set up Streamlit page
 st.set_page_config(
@@ -98,6 +103,77 @@ st.markdown("""
 ---
 """)
 
+if st.sidebar.button(
+    "Reload configuration and standards",
+    help="Config and standards are loaded once for all sessions and re-read when their files change; this forces a reload"
+):
+    invalidate_resources()
+    st.rerun()
+
+with st.sidebar.expander("LLM provider health"):
+    provider_health = get_llm_manager().get_provider_health()
+    if provider_health:
+        st.dataframe(provider_health, hide_index=True)
+    else:
+        st.caption("No LLM providers configured.")
+
+with st.sidebar.expander("LLM request metrics"):
+    metrics_summary = get_llm_manager().metrics.summary()
+    if metrics_summary:
+        st.dataframe(metrics_summary, hide_index=True)
+    else:
+        st.caption("No LLM requests recorded yet.")
+    cascade_summary = get_llm_manager().metrics.cascade_summary()
+    if cascade_summary["requests"]:
+        tiers = ", ".join(f"{tier}: {count}" for tier, count in sorted(cascade_summary["requests"].items()))
+        st.caption(
+            f"Cascade requests by tier ({tiers}); estimated savings "
+            f"${cascade_summary['saved_cost']:.4f} and {cascade_summary['saved_latency']:.0f}s"
+        )
+    latency_model = get_llm_manager().get_latency_model()
+    if latency_model:
+        st.caption("Observed latency per model (used for timeouts and time estimates)")
+        st.dataframe(
+            [{"model": model, **fit} for model, fit in latency_model.items()],
+            hide_index=True
+        )
+
+if config.get("tracing", {}).get("panel", True) and get_tracer().memory:
+    with st.sidebar.expander("Analysis traces"):
+        traces = get_tracer().memory.traces()
+        if traces:
+            trace_index = st.selectbox(
+                "Analysis",
+                range(len(traces)),
+                format_func=lambda i: (
+                    f"{traces[i]['attributes'].get('company', '?')} "
+                    f"({traces[i]['duration']:.1f}s{', failed' if traces[i]['error'] else ''})"
+                )
+            )
+            rows = waterfall(traces[trace_index])
+            figure = go.Figure(go.Bar(
+                x=[row["duration"] for row in rows],
+                base=[row["offset"] for row in rows],
+                y=list(range(len(rows))),
+                orientation="h",
+                marker_color=["#E53935" if row["error"] else "#1E88E5" for row in rows],
+                hovertext=[
+                    f"{row['duration']:.2f}s " + ", ".join(f"{k}={v}" for k, v in row["attributes"].items())
+                    for row in rows
+                ]
+            ))
+            figure.update_yaxes(
+                tickvals=list(range(len(rows))),
+                ticktext=["  " * row["depth"] + row["name"] for row in rows],
+                autorange="reversed"
+            )
+            figure.update_layout(height=40 + 22 * len(rows), margin=dict(l=0, r=0, t=10, b=0),
+                                 xaxis_title="seconds")
+            st.plotly_chart(figure, use_container_width=True)
+            st.caption(f"Trace {traces[trace_index]['trace_id']}")
+        else:
+            st.caption("No analyses traced yet.")
+
 # LLM provider and model selection OUTSIDE the form for dynamic updates
 st.subheader("Analysis Parameters")
 
@@ -161,6 +237,12 @@ llm_model = st.selectbox(
 st.session_state.llm_provider = llm_provider
 st.session_state.llm_model = llm_model
 
+hedge_requests = st.checkbox(
+    "Hedge slow requests across providers",
+    value=False,
+    help="If the selected provider is slower than usual, send the same prompt to another provider and keep the first answer"
+)
+
 with st.form("company_info_form"):
     st.subheader("Company Information")
     col1, col2 = st.columns(2)
@@ -199,14 +281,38 @@ with st.form("company_info_form"):
         ["standard", "detailed"],
         horizontal=True
     )
+    generation_mode = st.radio(
+        "Generation Mode",
+        ["Single report (streamed)", "Section by section (parallel)", "Cascade (fast model first)"],
+        horizontal=True,
+        help="Section by section generates every report section concurrently, so the wait is the slowest section rather than the whole report. "
+             "Cascade tries a cheaper model first and only uses the selected model if the report is incomplete"
+    )
+    regenerate = st.checkbox(
+        "Regenerate analysis",
+        value=False,
+        help="Ignore any cached or similar previous report and request a fresh one"
+    )
     submitted = st.form_submit_button("Generate Analysis")
 
-if submitted:
+# Set by the "Use previous report" / "Generate new" buttons for the inputs above
+similar_choice = st.session_state.pop("similar_choice", None)
+
+if submitted or similar_choice:
     if not company_name or not country or not sector or not description:
         st.error("Please fill in all required fields.")
     elif not frameworks:
         st.error("Please select at least one ESG framework.")
     else:
+        tracer = get_tracer()
+        trace = tracer.start_trace(
+            "analysis",
+            company=company_name,
+            provider=st.session_state.llm_provider,
+            model=st.session_state.llm_model,
+            mode=generation_mode,
+            frameworks=",".join(frameworks)
+        )
         try:
             with st.spinner("Generating analysis..."):
                 logger.info(f"Starting analysis generation for {company_name}")
@@ -222,43 +328,178 @@ if submitted:
                     "size": size if size else None
                 }
                 
-                logger.info("Generating analysis prompt...")
-                prompt = prompt_manager.generate_analysis_prompt(
-                    company_info=company_info,
-                    selected_frameworks=frameworks,
-                    detail_level=detail_level
-                )
-                
-                logger.info("Sending request to LLM...")
-                try:
-                    response = llm_manager.generate_response(
-                        prompt=prompt,
-                        primary_provider=ProviderType(st.session_state.llm_provider.lower()),
-                        max_tokens=st.session_state.max_tokens,
-                        temperature=st.session_state.temperature
+                # Offer a previous report for near-identical inputs unless regenerating
+                with tracing.span("similarity_lookup") as lookup_span:
+                    similar = None if regenerate or similar_choice == "generate" else (
+                        llm_manager.similarity_cache.lookup(company_info, frameworks, detail_level)
+                    )
+                    lookup_span.set(hit=similar is not None)
+                # Names are not part of the match: another company's report is only used if chosen
+                if similar and not similar.is_same_company(company_name) and similar_choice != "reuse":
+                    st.info(
+                        f"A previous analysis of {similar.company_name} from "
+                        f"{similar.created_at:%Y-%m-%d %H:%M} has {similar.score:.0%} similar inputs."
+                    )
+                    col_reuse, col_generate = st.columns(2)
+                    col_reuse.button("Use previous report", on_click=st.session_state.update,
+                                     kwargs={"similar_choice": "reuse"})
+                    col_generate.button("Generate new", on_click=st.session_state.update,
+                                        kwargs={"similar_choice": "generate"})
+                    st.stop()
+                # A reused report is exported under the company it was written for
+                report_company = similar.company_name if similar else company_name
+                if similar:
+                    st.markdown("## Analysis Results")
+                    st.info(
+                        f"Showing the previous analysis of {similar.company_name} from "
+                        f"{similar.created_at:%Y-%m-%d %H:%M} ({similar.score:.0%} similar inputs). "
+                        "Tick 'Regenerate analysis' and submit again for a fresh report."
                     )
-                    logger.info("Successfully received response from LLM")
-                except Exception as llm_error:
-                    logger.error(f"LLM request failed: {str(llm_error)}")
-                    st.error(f"Error communicating with LLM service: {str(llm_error)}")
-                    raise
+                    response = similar.report
+                    st.markdown(response)
+                else:
+                    section_mode = generation_mode.startswith("Section")
+                    logger.info("Generating analysis prompt...")
+                    with tracing.span("prompt", mode="sections" if section_mode else "single") as prompt_span:
+                        if section_mode:
+                            section_prompts = prompt_manager.generate_section_prompts(
+                                company_info=company_info,
+                                selected_frameworks=frameworks,
+                                detail_level=detail_level
+                            )
+                            prompt_span.set(sections=len(section_prompts),
+                                            prompt_chars=sum(len(p) for p in section_prompts.values()))
+                        else:
+                            # Static instructions and standards go in a cacheable prefix
+                            prompt_parts = prompt_manager.generate_prompt_parts(
+                                company_info=company_info,
+                                selected_frameworks=frameworks,
+                                detail_level=detail_level
+                            )
+                            prompt_span.set(prefix_chars=len(prompt_parts.prefix),
+                                            prompt_chars=len(prompt_parts.prefix) + len(prompt_parts.suffix))
                 
-                # Display the analysis results
-                st.markdown("## Analysis Results")
-                st.markdown(response)
+                    # Display the analysis results as they are generated
+                    st.markdown("## Analysis Results")
+                    logger.info("Sending request to LLM...")
+                    primary_provider = ProviderType(st.session_state.llm_provider.lower())
+                    fallback_providers = [p for p in ProviderType if p != primary_provider] if hedge_requests else None
+                    # Only the cascade sends the selected model; other modes use the provider's configured one
+                    request_model = st.session_state.llm_model if generation_mode.startswith("Cascade") else None
+                    estimate = llm_manager.predict_duration(primary_provider, st.session_state.max_tokens,
+                                                            model=request_model)
+                    if estimate:
+                        if section_mode:
+                            # Sections run in waves of section_concurrency parallel requests
+                            concurrency = config.get("analysis", {}).get("section_concurrency", 4)
+                            estimate *= -(-len(section_prompts) // concurrency)
+                        st.caption(f"Estimated generation time: ~{estimate:.0f}s")
+                    with tracing.span("llm", provider=primary_provider.value,
+                                      max_tokens=st.session_state.max_tokens) as llm_span:
+                        try:
+                            if section_mode:
+                                sections = llm_manager.generate_sections(
+                                    section_prompts,
+                                    primary_provider=primary_provider,
+                                    fallback_providers=fallback_providers,
+                                    max_tokens=st.session_state.max_tokens,
+                                    temperature=st.session_state.temperature,
+                                    use_cache=not regenerate,
+                                    hedge=hedge_requests
+                                )
+                                response = assemble_report(sections)
+                                st.markdown(response)
+                            elif generation_mode.startswith("Cascade"):
+                                result = llm_manager.generate_cascade(
+                                    prompt=prompt_parts.suffix,
+                                    prompt_prefix=prompt_parts.prefix,
+                                    primary_provider=primary_provider,
+                                    fallback_providers=fallback_providers,
+                                    max_tokens=st.session_state.max_tokens,
+                                    temperature=st.session_state.temperature,
+                                    use_cache=not regenerate,
+                                    required_sections=[heading for _, heading in REPORT_SECTIONS],
+                                    model=request_model
+                                )
+                                response = result.text
+                                tier_note = f"Served by the {result.tier} tier ({result.model}) in {result.latency:.1f}s"
+                                if result.escalated:
+                                    tier_note += f" after escalation: {'; '.join(result.reasons)}"
+                                st.caption(tier_note)
+                                st.markdown(response)
+                            elif hedge_requests:
+                                # Hedged requests race whole responses, so they are not streamed
+                                response = llm_manager.generate_response(
+                                    prompt=prompt_parts.suffix,
+                                    prompt_prefix=prompt_parts.prefix,
+                                    primary_provider=primary_provider,
+                                    fallback_providers=fallback_providers,
+                                    max_tokens=st.session_state.max_tokens,
+                                    temperature=st.session_state.temperature,
+                                    use_cache=not regenerate,
+                                    hedge=True
+                                )
+                                st.markdown(response)
+                            else:
+                                response = st.write_stream(llm_manager.stream_response(
+                                    prompt=prompt_parts.suffix,
+                                    prompt_prefix=prompt_parts.prefix,
+                                    primary_provider=primary_provider,
+                                    max_tokens=st.session_state.max_tokens,
+                                    temperature=st.session_state.temperature,
+                                    use_cache=not regenerate
+                                ))
+                            llm_span.set(response_chars=len(response))
+                            logger.info("Successfully received response from LLM")
+                        except Exception as llm_error:
+                            logger.error(f"LLM request failed: {str(llm_error)}")
+                            st.error(f"Error communicating with LLM service: {str(llm_error)}")
+                            raise
+                    
+                    # Regenerate only the sections that came back missing or malformed
+                    if config.get("analysis", {}).get("repair_sections", True):
+                        with tracing.span("repair") as repair_span:
+                            repair = repair_report(
+                                llm_manager,
+                                prompt_manager,
+                                response,
+                                company_info,
+                                frameworks,
+                                detail_level,
+                                primary_provider=primary_provider,
+                                fallback_providers=fallback_providers,
+                                max_tokens=st.session_state.max_tokens,
+                                temperature=st.session_state.temperature,
+                                use_cache=not regenerate
+                            )
+                            repair_span.set(repaired=len(repair.repaired), remaining=len(repair.remaining))
+                        if repair.repaired:
+                            response = repair.report
+                            st.info(
+                                f"Regenerated {len(repair.repaired)} missing or malformed section(s) "
+                                f"in {repair.latency:.0f}s: {', '.join(repair.repaired)}"
+                            )
+                            with st.expander("Repaired report", expanded=True):
+                                st.markdown(response)
+                        if repair.remaining:
+                            st.warning(f"Sections still incomplete: {', '.join(repair.remaining)}")
+                    llm_manager.similarity_cache.add(company_info, frameworks, detail_level, response)
 
                 # DOCX export
                 try:
-                    parsed = parse_llm_report(response, company_name)
-                    docx_formatter = DocxFormatter()
-                    docx_formatter.format_analysis(parsed)
-                    docx_buffer = io.BytesIO()
-                    docx_formatter.document.save(docx_buffer)
-                    docx_buffer.seek(0)
+                    with tracing.span("parse", report_chars=len(response)):
+                        parsed = parse_llm_report(response, report_company)
+                    with tracing.span("docx") as docx_span:
+                        docx_formatter = DocxFormatter()
+                        docx_formatter.format_analysis(parsed)
+                        docx_buffer = io.BytesIO()
+                        docx_formatter.document.save(docx_buffer)
+                        docx_span.set(bytes=docx_buffer.tell())
+                        docx_buffer.seek(0)
                     st.download_button(
                         label="Download Report as Word (.docx)",
                         data=docx_buffer,
-                        file_name=f"esg_analysis_{company_name.lower().replace(' ', '_')}.docx",
+                        file_name=f"esg_analysis_{report_company.lower().replace(' ', '_')}.docx",
                         mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
                     )
                 except Exception as docx_err:
@@ -268,9 +509,12 @@ if submitted:
                 st.download_button(
                     label="Download Report as Markdown",
                     data=response,
-                    file_name=f"esg_analysis_{company_name.lower().replace(' ', '_')}.md",
+                    file_name=f"esg_analysis_{report_company.lower().replace(' ', '_')}.md",
                     mime="text/markdown"
                 )
         except Exception as e:
+            trace.fail(e)
             logger.error(f"Error generating analysis: {str(e)}")
-            st.error("An error occurred while generating the analysis. Please try again.") 
\ No newline at end of file
+            st.error("An error occurred while generating the analysis. Please try again.")
+        finally:
+            tracer.finish(trace) 
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""
+End-to-end throughput benchmark against the local stub server.
+Runs N concurrent analyses through the full pipeline (prompt build -> LLM ->
+parse -> DOCX), one thread per analysis as Streamlit sessions do, and reports
+p50/p95/p99 per stage and analyses per minute. No API credits are used.
+
+Example: python -m benchmarks.run_benchmark --analyses 40 --concurrency 8 --mode stream
+"""
+
+import argparse
+import copy
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from benchmarks.stub_server import StubServer, add_stub_arguments, stub_settings
+from engine.llm_service import LLMServiceManager, ProviderType
+from engine.metrics import percentile
+from formatters.docx_formatter import DocxFormatter
+from prompts.enhanced_prompts import EnhancedPromptManager, assemble_report
+from standards.loader import StandardsLoader
+from utils.llm_report_parser import parse_llm_report
+
+STAGES = ("prompt", "llm", "parse", "docx", "total")
+
+SAMPLE_COMPANIES = [
+    {
+        "name": "SunHarvest",
+        "country": "Kenya",
+        "sector": "Infrastructure",
+        "subsector": "Solar Power",
+        "description": "Pay-as-you-go solar home systems for off-grid rural households, sold through local agents.",
+        "size": "120 employees"
+    },
+    {
+        "name": "AgriLink",
+        "country": "Côte d'Ivoire",
+        "sector": "Agriculture",
+        "subsector": "Agro-processing",
+        "description": "Cashew processing plant sourcing from 4,000 smallholder farmers with a mostly female workforce.",
+        "size": "350 employees"
+    },
+    {
+        "name": "MediCare Plus",
+        "country": "Senegal",
+        "sector": "Healthcare",
+        "subsector": "Healthcare Services",
+        "description": "Network of primary care clinics and pharmacies in peri-urban Dakar.",
+        "size": None
+    },
+]
+
+
+@dataclass
+class AnalysisTiming:
+    """Stage durations of one benchmarked analysis, in seconds."""
+    prompt: float = 0.0
+    llm: float = 0.0
+    parse: float = 0.0
+    docx: float = 0.0
+    total: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class BenchmarkResult:
+    """Latency percentiles per stage and overall throughput."""
+    analyses: int
+    failed: int
+    concurrency: int
+    wall_time: float
+    analyses_per_minute: float
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    stub: Dict[str, int] = field(default_factory=dict)
+
+
+def benchmark_settings(stub: StubServer, args: argparse.Namespace) -> Dict[str, Any]:
+    """App settings pointed at the stub, with response caches and persistent metrics off."""
+    settings = copy.deepcopy(LLMServiceManager._load_settings())
+    llm = settings.setdefault("llm", {})
+    llm["api_bases"] = stub.api_bases()
+    llm["metrics"] = {"store_path": None, "recent_size": max(500, args.analyses * 8)}
+    llm.setdefault("http_pool", {})["prewarm"] = False
+    llm["analysis_timeout"] = args.analysis_timeout
+    if not args.keep_rate_limits:
+        llm["rate_limits"] = {}
+    settings.setdefault("standards", {})["cache_enabled"] = False
+    settings.setdefault("app", {})["cache_dir"] = args.cache_dir
+    return settings
+
+
+def run_analysis(
+    index: int,
+    llm_manager: LLMServiceManager,
+    prompt_manager: EnhancedPromptManager,
+    provider: ProviderType,
+    mode: str,
+    max_tokens: int,
+    frameworks: List[str]
+) -> AnalysisTiming:
+    """Run one analysis through the same steps as the app and time each of them."""
+    timing = AnalysisTiming()
+    company = dict(SAMPLE_COMPANIES[index % len(SAMPLE_COMPANIES)])
+    # Distinct inputs, so requests are neither cached nor coalesced
+    company["name"] = f"{company['name']} #{index}"
+    company["description"] = f"{company['description']} (benchmark run {index})"
+    start = time.perf_counter()
+    try:
+        if mode == "sections":
+            section_prompts = prompt_manager.generate_section_prompts(company, frameworks, "standard")
+        else:
+            prompt_parts = prompt_manager.generate_prompt_parts(company, frameworks, "standard")
+        timing.prompt = time.perf_counter() - start
+
+        stage_start = time.perf_counter()
+        request = {"primary_provider": provider, "max_tokens": max_tokens, "use_cache": False}
+        if mode == "sections":
+            report = assemble_report(llm_manager.generate_sections(section_prompts, **request))
+        elif mode == "stream":
+            report = "".join(llm_manager.stream_response(
+                prompt=prompt_parts.suffix, prompt_prefix=prompt_parts.prefix, **request
+            ))
+        else:
+            report = llm_manager.generate_response(
+                prompt=prompt_parts.suffix, prompt_prefix=prompt_parts.prefix, **request
+            )
+        timing.llm = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        parsed = parse_llm_report(report, company["name"])
+        timing.parse = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        formatter = DocxFormatter()
+        formatter.format_analysis(parsed)
+        formatter.document.save(io.BytesIO())
+        timing.docx = time.perf_counter() - stage_start
+    except Exception as e:
+        timing.error = type(e).__name__
+        logger.warning(f"Analysis {index} failed: {str(e)}")
+    timing.total = time.perf_counter() - start
+    return timing
+
+
+def summarize(
+    timings: List[AnalysisTiming],
+    concurrency: int,
+    wall_time: float,
+    stub: Dict[str, int]
+) -> BenchmarkResult:
+    """Aggregate analysis timings into percentiles and throughput."""
+    succeeded = [t for t in timings if t.error is None]
+    errors: Dict[str, int] = {}
+    for t in timings:
+        if t.error:
+            errors[t.error] = errors.get(t.error, 0) + 1
+    stages = {}
+    for stage in STAGES:
+        values = [getattr(t, stage) for t in succeeded]
+        stages[stage] = {
+            "p50": round(percentile(values, 50) or 0.0, 3),
+            "p95": round(percentile(values, 95) or 0.0, 3),
+            "p99": round(percentile(values, 99) or 0.0, 3),
+            "max": round(max(values, default=0.0), 3)
+        }
+    return BenchmarkResult(
+        analyses=len(timings),
+        failed=len(timings) - len(succeeded),
+        concurrency=concurrency,
+        wall_time=round(wall_time, 2),
+        analyses_per_minute=round(len(succeeded) / wall_time * 60, 1) if wall_time else 0.0,
+        stages=stages,
+        errors=errors,
+        stub=stub
+    )
+
+
+def print_result(result: BenchmarkResult) -> None:
+    print(f"\n{result.analyses} analyses, concurrency {result.concurrency}, "
+          f"{result.failed} failed, {result.wall_time}s wall time")
+    print(f"Throughput: {result.analyses_per_minute} analyses/minute\n")
+    print(f"{'stage':<8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for stage, values in result.stages.items():
+        print(f"{stage:<8}" + "".join(f"{values[k]:>10.3f}" for k in ("p50", "p95", "p99", "max")))
+    if result.errors:
+        print(f"\nErrors: {result.errors}")
+    print(f"Stub server: {result.stub}")
+
+
+def main(argv: Optional[List[str]] = None) -> BenchmarkResult:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline against a local LLM stub")
+    parser.add_argument("--analyses", type=int, default=20, help="Number of analyses to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Analyses running at the same time")
+    parser.add_argument("--mode", choices=["stream", "single", "sections"], default="stream",
+                        help="Generation mode, as in the app")
+    parser.add_argument("--provider", choices=[p.value for p in ProviderType], default="openai")
+    parser.add_argument("--max-tokens", type=int, default=4000)
+    parser.add_argument("--frameworks", default="ifc,2x", help="Comma-separated ESG frameworks")
+    parser.add_argument("--analysis-timeout", type=float, default=600)
+    parser.add_argument("--keep-rate-limits", action="store_true",
+                        help="Apply the configured client-side rate limits")
+    parser.add_argument("--cache-dir", default="cache/benchmark")
+    parser.add_argument("--json", dest="json_path", help="Also write the result to this JSON file")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # The stub accepts any key; never send real credentials to it
+    for key in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "FIREWORKS_API_KEY"):
+        os.environ[key] = "stub-key"
+
+    with StubServer(stub_settings(args)) as stub:
+        settings = benchmark_settings(stub, args)
+        llm_manager = LLMServiceManager(settings=settings)
+        prompt_manager = EnhancedPromptManager(StandardsLoader(),
+                                               retrieval=settings.get("standards", {}).get("retrieval"))
+        frameworks = [f.strip() for f in args.frameworks.split(",") if f.strip()]
+        provider = ProviderType(args.provider)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            timings = list(pool.map(
+                lambda i: run_analysis(i, llm_manager, prompt_manager, provider, args.mode,
+                                       args.max_tokens, frameworks),
+                range(args.analyses)
+            ))
+        wall_time = time.perf_counter() - start
+        llm_manager.close()
+        result = summarize(timings, args.concurrency, wall_time, stub.stats.snapshot())
+
+    print_result(result)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(asdict(result), f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    main()
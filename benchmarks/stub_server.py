@@ -0,0 +1,410 @@
+"""
+Local stand-in for the OpenAI and Anthropic chat completion APIs.
+Serves canned ESG reports with configurable time to first token, token rate and
+429/5xx injection, streamed or not, so the pipeline can be load-tested without
+spending API credits. Point the providers at it with llm.api_bases.
+
+Run standalone with: python -m benchmarks.stub_server --port 8900
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from prompts.enhanced_prompts import REPORT_SECTIONS, REPORT_TITLE
+
+# Tokens sent per streamed chunk
+CHUNK_TOKENS = 8
+
+SECTION_BODIES = {
+    "summary": (
+        "The company is a growth-stage business with a clear impact thesis and moderate E&S exposure. "
+        "Key risks relate to labour conditions in the supply chain and waste management at end of life."
+    ),
+    "es_classification": (
+        "Category B: limited adverse environmental and social risks that are few in number, site-specific "
+        "and largely reversible, and readily addressed through mitigation measures."
+    ),
+    "ifc_analysis": (
+        "PS1 requires a proportionate ESMS. PS2 applies to the direct workforce and contractors. "
+        "PS3 is relevant for battery handling and e-waste."
+    ),
+    "stakeholder": (
+        "Customers, employees, local distributors and municipal authorities are the main stakeholders. "
+        "A grievance mechanism exists but is not yet tracked."
+    ),
+    "impact": (
+        "The business expands access to essential services for low-income households and creates formal jobs, "
+        "with a material share held by women."
+    ),
+    "dd_checklist": (
+        "Request the ESMS manual, the HR policy, the supplier code of conduct and the e-waste take-back records."
+    ),
+}
+
+TABLE_ROWS = [
+    ("Labour and working conditions", "Medium", "Adopt an HR policy aligned with PS2"),
+    ("Resource efficiency and waste", "Medium", "Formalise battery take-back and recycling"),
+    ("Community health and safety", "Low", "Include product safety in customer training"),
+    ("Governance", "Low", "Appoint an E&S officer reporting to the board"),
+]
+
+
+def canned_report(variant: int = 0) -> str:
+    """Return a complete ESG report in the format requested by the master prompt."""
+    rows = TABLE_ROWS[variant % len(TABLE_ROWS):] + TABLE_ROWS[:variant % len(TABLE_ROWS)]
+    table = "\n".join(
+        ["| Topic | Risk | Action |", "|---|---|---|"]
+        + [f"| {topic} | {risk} | {action} |" for topic, risk, action in rows]
+    )
+    parts = [REPORT_TITLE]
+    for section, heading in REPORT_SECTIONS:
+        parts.append(f"## {heading}\n\n{SECTION_BODIES[section]}\n\n{table}")
+    return "\n\n".join(parts) + "\n"
+
+
+CANNED_REPORTS = [canned_report(variant) for variant in range(len(TABLE_ROWS))]
+
+
+@dataclass
+class StubSettings:
+    """Latency, throughput and fault injection of the stub server."""
+    ttft_median: float = 0.5  # Median seconds before the first token (log-normal)
+    ttft_sigma: float = 0.5  # Spread of the time to first token
+    tokens_per_second: float = 80.0  # Output token rate after the first token (0 = instant)
+    rate_limit_rate: float = 0.0  # Fraction of requests answered with 429
+    server_error_rate: float = 0.0  # Fraction of requests answered with 500/502/503
+    retry_after: float = 1.0  # Retry-After sent with 429 responses, in seconds
+    seed: Optional[int] = None
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into pseudo-tokens (words with their trailing whitespace)."""
+    tokens, start = [], 0
+    for i in range(1, len(text)):
+        if text[i - 1].isspace() and not text[i].isspace():
+            tokens.append(text[start:i])
+            start = i
+    tokens.append(text[start:])
+    return tokens
+
+
+def prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimate prompt tokens at four characters per token."""
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            chars += sum(len(block.get("text", "")) for block in content if isinstance(block, dict))
+        else:
+            chars += len(content or "")
+    return max(1, chars // 4)
+
+
+class StubStats:
+    """Request counters of a stub server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"requests": 0, "streamed": 0, "rate_limited": 0, "server_errors": 0}
+
+    def add(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_StubHTTPServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"stub: {format % args}")
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            api = "openai"
+        elif self.path.endswith("/messages"):
+            api = "anthropic"
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        stub = self.server.stub
+        stub.stats.add("requests")
+        fault = stub.draw_fault()
+        if fault:
+            self._send_fault(api, fault)
+            return
+
+        tokens = split_tokens(stub.draw_report())
+        max_tokens = body.get("max_tokens") or len(tokens)
+        truncated = max_tokens < len(tokens)
+        tokens = tokens[:max_tokens]
+        usage = (prompt_tokens(body.get("messages", [])), len(tokens))
+        time.sleep(stub.draw_ttft())
+
+        if body.get("stream"):
+            stub.stats.add("streamed")
+            events = self._openai_stream(body, tokens, usage, truncated) if api == "openai" \
+                else self._anthropic_stream(body, tokens, usage, truncated)
+            self._send_stream(events, stub.settings.tokens_per_second)
+        else:
+            if stub.settings.tokens_per_second:
+                time.sleep(len(tokens) / stub.settings.tokens_per_second)
+            text = "".join(tokens)
+            payload = self._openai_message(body, text, usage, truncated) if api == "openai" \
+                else self._anthropic_message(body, text, usage, truncated)
+            self._send_json(200, payload)
+
+    # Responses
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_fault(self, api: str, status: int) -> None:
+        kind = "rate_limit_error" if status == 429 else "api_error"
+        message = f"Injected {status} from stub server"
+        payload = {"error": {"message": message, "type": kind}}
+        if api == "anthropic":
+            payload = {"type": "error", "error": {"type": kind, "message": message}}
+        headers = {"Retry-After": str(self.server.stub.settings.retry_after)} if status == 429 else None
+        self._send_json(status, payload, headers)
+
+    def _send_stream(self, events: Iterator[Tuple[int, str]], tokens_per_second: float) -> None:
+        """Write server-sent events with chunked encoding, pacing them by their token count."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token_count, event in events:
+            if token_count and tokens_per_second:
+                time.sleep(token_count / tokens_per_second)
+            data = event.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    @staticmethod
+    def _chunks(tokens: List[str]) -> Iterator[List[str]]:
+        for i in range(0, len(tokens), CHUNK_TOKENS):
+            yield tokens[i:i + CHUNK_TOKENS]
+
+    # OpenAI protocol
+
+    @staticmethod
+    def _openai_message(body: Dict, text: str, usage: Tuple[int, int], truncated: bool) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "length" if truncated else "stop"
+            }],
+            "usage": {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)}
+        }
+
+    def _openai_stream(
+        self, body: Dict, tokens: List[str], usage: Tuple[int, int], truncated: bool
+    ) -> Iterator[Tuple[int, str]]:
+        base = {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub")
+        }
+
+        def event(payload: Dict[str, Any]) -> str:
+            return f"data: {json.dumps({**base, **payload})}\n\n"
+
+        for chunk in self._chunks(tokens):
+            delta = {"role": "assistant", "content": "".join(chunk)}
+            yield len(chunk), event({"choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        finish_reason = "length" if truncated else "stop"
+        yield 0, event({"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield 0, event({"choices": [], "usage": {
+                "prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)
+            }})
+        yield 0, "data: [DONE]\n\n"
+
+    # Anthropic protocol
+
+    @staticmethod
+    def _anthropic_message(body: Dict, text: str, usage: Tuple[int, int], truncated: bool) -> Dict[str, Any]:
+        return {
+            "id": f"msg_stub_{uuid.uuid4().hex[:12]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "stub"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "max_tokens" if truncated else "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": usage[0], "output_tokens": usage[1]}
+        }
+
+    def _anthropic_stream(
+        self, body: Dict, tokens: List[str], usage: Tuple[int, int], truncated: bool
+    ) -> Iterator[Tuple[int, str]]:
+        def event(name: str, payload: Dict[str, Any]) -> str:
+            return f"event: {name}\ndata: {json.dumps({'type': name, **payload})}\n\n"
+
+        message = self._anthropic_message(body, "", (usage[0], 1), truncated)
+        message.update(content=[], stop_reason=None)
+        yield 0, event("message_start", {"message": message})
+        yield 0, event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        for chunk in self._chunks(tokens):
+            yield len(chunk), event("content_block_delta", {
+                "index": 0, "delta": {"type": "text_delta", "text": "".join(chunk)}
+            })
+        yield 0, event("content_block_stop", {"index": 0})
+        yield 0, event("message_delta", {
+            "delta": {"stop_reason": "max_tokens" if truncated else "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": usage[1]}
+        })
+        yield 0, event("message_stop", {})
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubServer"
+
+
+class StubServer:
+    """OpenAI/Anthropic-compatible chat completion server on a background thread."""
+
+    def __init__(self, settings: Optional[StubSettings] = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or StubSettings()
+        self.stats = StubStats()
+        self._random = random.Random(self.settings.seed)
+        self._random_lock = threading.Lock()
+        self._httpd = _StubHTTPServer((host, port), _Handler)
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def api_bases(self) -> Dict[str, str]:
+        """Return llm.api_bases pointing every provider at this server."""
+        return {"openai": f"{self.url}/v1", "anthropic": self.url, "deepseek": f"{self.url}/v1"}
+
+    def draw_fault(self) -> Optional[int]:
+        """Return the injected error status for a request, if any."""
+        with self._random_lock:
+            draw = self._random.random()
+            if draw < self.settings.rate_limit_rate:
+                self.stats.add("rate_limited")
+                return 429
+            if draw < self.settings.rate_limit_rate + self.settings.server_error_rate:
+                self.stats.add("server_errors")
+                return self._random.choice((500, 502, 503))
+        return None
+
+    def draw_ttft(self) -> float:
+        """Draw a time to first token from the log-normal distribution."""
+        if self.settings.ttft_median <= 0:
+            return 0.0
+        with self._random_lock:
+            return self.settings.ttft_median * self._random.lognormvariate(0, self.settings.ttft_sigma)
+
+    def draw_report(self) -> str:
+        with self._random_lock:
+            return self._random.choice(CANNED_REPORTS)
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def start(self) -> "StubServer":
+        """Serve on a daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="llm-stub-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Stub LLM server listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the StubSettings options to a command line parser."""
+    defaults = StubSettings()
+    parser.add_argument("--ttft-median", type=float, default=defaults.ttft_median,
+                        help="Median seconds to first token")
+    parser.add_argument("--ttft-sigma", type=float, default=defaults.ttft_sigma,
+                        help="Log-normal spread of the time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second,
+                        help="Output token rate (0 for instant responses)")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate,
+                        help="Fraction of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=defaults.server_error_rate,
+                        help="Fraction of requests answered with 5xx")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after,
+                        help="Retry-After of 429 responses in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+
+
+def stub_settings(args: argparse.Namespace) -> StubSettings:
+    """Build StubSettings from parsed add_stub_arguments options."""
+    return StubSettings(
+        ttft_median=args.ttft_median,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a local OpenAI/Anthropic-compatible stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer(stub_settings(args), host=args.host, port=args.port)
+    print(f"Serving on {server.url}; set llm.api_bases to {json.dumps(server.api_bases())}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
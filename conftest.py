@@ -0,0 +1,4 @@
+import os
+
+# Use litellm's bundled model cost map instead of fetching it over the network
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
@@ -0,0 +1,186 @@
+"""
+Provider health tracking and circuit breaking for LLM providers.
+Lets the service manager skip providers that are failing instead of paying the
+full retry cycle on every request during an incident.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+class CircuitState(Enum):
+    """States of a provider circuit breaker."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class ProviderHealth:
+    """Point-in-time health snapshot of a provider."""
+    provider: str
+    state: str
+    requests: int
+    error_rate: float
+    avg_latency: Optional[float]
+    consecutive_failures: int
+    retry_in: Optional[float]
+
+    def to_dict(self) -> Dict:
+        """Return the snapshot as a plain dictionary."""
+        return asdict(self)
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for a single provider."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        error_rate_threshold: float = 0.5,
+        window: int = 20,
+        min_requests: int = 5,
+        cooldown: float = 60.0
+    ):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent, moving to half-open after the cooldown."""
+        with self._lock:
+            now = time.time()
+            if self.state == CircuitState.CLOSED:
+                return True
+            if self.state == CircuitState.OPEN:
+                if now - self.opened_at < self.cooldown:
+                    return False
+                self.state = CircuitState.HALF_OPEN
+                self.probe_started_at = None
+            # Half-open: let a single probe through (or a new one if the last went missing)
+            if self.probe_started_at is None or now - self.probe_started_at >= self.cooldown:
+                self.probe_started_at = now
+                return True
+            return False
+
+    def record_success(self, latency: float) -> None:
+        """Record a successful request, closing the circuit after a successful probe."""
+        with self._lock:
+            self._outcomes.append((True, latency))
+            self.consecutive_failures = 0
+            if self.state != CircuitState.CLOSED:
+                self.state = CircuitState.CLOSED
+                self.opened_at = None
+                self.probe_started_at = None
+
+    def record_failure(self, latency: float) -> bool:
+        """Record a failed request; returns True if this opened the circuit."""
+        with self._lock:
+            self._outcomes.append((False, latency))
+            self.consecutive_failures += 1
+            if self.state == CircuitState.HALF_OPEN or (
+                self.state == CircuitState.CLOSED and self._should_open()
+            ):
+                self.state = CircuitState.OPEN
+                self.opened_at = time.time()
+                self.probe_started_at = None
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back a half-open probe slot whose request ended without a verdict on the provider."""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self.probe_started_at = None
+
+    def _should_open(self) -> bool:
+        """Decide whether the failure pattern warrants opening the circuit."""
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        if len(self._outcomes) < self.min_requests:
+            return False
+        return self._error_rate() >= self.error_rate_threshold
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    def snapshot(self, provider: str) -> ProviderHealth:
+        """Return a health snapshot for display."""
+        with self._lock:
+            latencies = [latency for ok, latency in self._outcomes if ok]
+            retry_in = None
+            if self.state == CircuitState.OPEN:
+                retry_in = max(0.0, self.cooldown - (time.time() - self.opened_at))
+            return ProviderHealth(
+                provider=provider,
+                state=self.state.value,
+                requests=len(self._outcomes),
+                error_rate=round(self._error_rate(), 3),
+                avg_latency=round(sum(latencies) / len(latencies), 2) if latencies else None,
+                consecutive_failures=self.consecutive_failures,
+                retry_in=round(retry_in, 1) if retry_in is not None else None
+            )
+
+
+class ProviderHealthRegistry:
+    """Circuit breakers and rolling health statistics for every provider."""
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = settings or {}
+        self.enabled = self.settings.get("enabled", True)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(
+                    failure_threshold=self.settings.get("failure_threshold", 3),
+                    error_rate_threshold=self.settings.get("error_rate_threshold", 0.5),
+                    window=self.settings.get("window", 20),
+                    min_requests=self.settings.get("min_requests", 5),
+                    cooldown=self.settings.get("cooldown", 60)
+                )
+            return self._breakers[provider]
+
+    def allow_request(self, provider: str) -> bool:
+        """Return whether the provider's circuit lets a request through."""
+        if not self.enabled:
+            return True
+        return self._breaker(provider).allow_request()
+
+    def record(self, provider: str, success: bool, latency: float) -> None:
+        """Record the outcome of a request to a provider."""
+        breaker = self._breaker(provider)
+        if success:
+            breaker.record_success(latency)
+        elif breaker.record_failure(latency) and self.enabled:
+            logger.warning(
+                f"Circuit opened for {provider} after {breaker.consecutive_failures} failures; "
+                f"skipping it for {breaker.cooldown}s"
+            )
+
+    def release(self, provider: str) -> None:
+        """Record that a request ended without a verdict (cancelled or rejected as a client error)."""
+        self._breaker(provider).release()
+
+    def snapshot(self) -> List[ProviderHealth]:
+        """Return health snapshots for every provider seen so far."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return [breaker.snapshot(provider) for provider, breaker in sorted(breakers.items())]
@@ -0,0 +1,96 @@
+"""
+Shared HTTP connection pool for LLM requests.
+One sync and one async httpx client with keep-alive (and HTTP/2 when the h2
+package is installed) are shared by every provider call and Streamlit session,
+so TLS handshakes are paid once per connection instead of once per analysis.
+"""
+
+import asyncio
+import importlib.util
+import ssl
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+import litellm
+from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler, HTTPHandler
+from loguru import logger
+
+
+def http2_available() -> bool:
+    """Return whether httpx can negotiate HTTP/2 (requires the h2 package)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+@lru_cache()
+def shared_ssl_context() -> ssl.SSLContext:
+    """Load the CA bundle once for every pool in the process."""
+    return httpx.create_ssl_context()
+
+
+class HTTPClientPool:
+    """Pooled keep-alive httpx clients shared by all LLM providers."""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 120.0,
+        http2: bool = True
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2 and http2_available()
+        if http2 and not self.http2:
+            logger.info("h2 is not installed, LLM connections use HTTP/1.1")
+        ssl_context = shared_ssl_context()
+        self._transport = httpx.HTTPTransport(verify=ssl_context, limits=self.limits, http2=self.http2)
+        self._atransport = httpx.AsyncHTTPTransport(verify=ssl_context, limits=self.limits, http2=self.http2)
+        self.client = httpx.Client(transport=self._transport, follow_redirects=True)
+        self.aclient = httpx.AsyncClient(transport=self._atransport, follow_redirects=True)
+        self._handler = HTTPHandler(client=self.client)
+        self._ahandler = AsyncHTTPHandler(transport=self._atransport)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "HTTPClientPool":
+        """Create a pool from the llm.http_pool settings."""
+        return cls(
+            max_connections=settings.get("max_connections", 100),
+            max_keepalive_connections=settings.get("max_keepalive_connections", 20),
+            keepalive_expiry=settings.get("keepalive_expiry", 120),
+            http2=settings.get("http2", True)
+        )
+
+    def install(self) -> None:
+        """Make litellm's OpenAI SDK clients use the pooled connections."""
+        litellm.client_session = self.client
+        litellm.aclient_session = self.aclient
+
+    def handler(self, asynchronous: bool = False) -> Any:
+        """Return the litellm HTTP handler to pass as `client` for HTTP-handler providers."""
+        return self._ahandler if asynchronous else self._handler
+
+    async def awarm(self, urls: Iterable[str]) -> None:
+        """Open keep-alive connections to the provider hosts ahead of the first request."""
+        async def warm(url: str) -> None:
+            try:
+                await self.aclient.head(url, timeout=10)
+            except httpx.HTTPError as e:
+                logger.debug(f"Could not pre-connect to {url}: {str(e)}")
+
+        await asyncio.gather(*(warm(url) for url in urls))
+
+    def close(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Close both clients; the async one on the loop that used it, if given."""
+        if litellm.client_session is self.client:
+            litellm.client_session = None
+        if litellm.aclient_session is self.aclient:
+            litellm.aclient_session = None
+        self.client.close()
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.aclient.aclose(), loop).result()
+        else:
+            asyncio.run(self.aclient.aclose())
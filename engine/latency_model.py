@@ -0,0 +1,107 @@
+"""
+Rolling latency model per provider and model.
+Fits latency = overhead + seconds_per_token * completion_tokens over recent
+successful requests, so each request can get a timeout sized to its max_tokens
+and the UI can show an estimated time to completion.
+"""
+
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from statistics import median
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+@dataclass
+class LatencyFit:
+    """Fitted latency of one model."""
+    overhead: float
+    seconds_per_token: float
+    samples: int
+
+    def predict(self, completion_tokens: int) -> float:
+        """Predicted seconds to produce the given number of completion tokens."""
+        return self.overhead + self.seconds_per_token * completion_tokens
+
+
+class LatencyModel:
+    """Per provider/model latency model built from RequestMetrics."""
+
+    def __init__(
+        self,
+        window: int = 200,
+        min_samples: int = 5,
+        timeout_multiplier: float = 2.0,
+        min_timeout: float = 15.0,
+        max_timeout: float = 600.0
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._samples: Dict[Tuple[str, str], Deque[Tuple[int, float]]] = defaultdict(
+            lambda: deque(maxlen=self.window)
+        )
+        self._fits: Dict[Tuple[str, str], Optional[LatencyFit]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, metrics: Any) -> None:
+        """Add a successful request's completion tokens and latency."""
+        if not metrics.success or metrics.completion_tokens <= 0:
+            return
+        key = (metrics.provider, metrics.model)
+        with self._lock:
+            self._samples[key].append((metrics.completion_tokens, metrics.latency))
+            self._fits.pop(key, None)
+
+    def fit(self, provider: str, model: str) -> Optional[LatencyFit]:
+        """Return the fitted model, or None without enough samples."""
+        key = (provider, model)
+        with self._lock:
+            if key not in self._fits:
+                self._fits[key] = self._fit(list(self._samples.get(key, ())))
+            return self._fits[key]
+
+    def _fit(self, samples: List[Tuple[int, float]]) -> Optional[LatencyFit]:
+        if len(samples) < self.min_samples:
+            return None
+        tokens = [t for t, _ in samples]
+        latencies = [l for _, l in samples]
+        mean_tokens = sum(tokens) / len(tokens)
+        mean_latency = sum(latencies) / len(latencies)
+        variance = sum((t - mean_tokens) ** 2 for t in tokens)
+        if variance > 0:
+            slope = sum((t - mean_tokens) * (l - mean_latency) for t, l in samples) / variance
+            overhead = mean_latency - slope * mean_tokens
+            if slope > 0 and overhead >= 0:
+                return LatencyFit(overhead, slope, len(samples))
+        # Too little spread in output length for a regression: assume pure per-token cost
+        return LatencyFit(0.0, median(l / t for t, l in samples), len(samples))
+
+    def predict(self, provider: str, model: str, max_tokens: int) -> Optional[float]:
+        """Predicted duration of a request producing up to max_tokens, if known."""
+        fit = self.fit(provider, model)
+        return fit.predict(max_tokens) if fit else None
+
+    def timeout(self, provider: str, model: str, max_tokens: int, default: float) -> float:
+        """Per-request timeout: a multiple of the predicted duration, within bounds."""
+        predicted = self.predict(provider, model, max_tokens)
+        if predicted is None:
+            return default
+        return max(self.min_timeout, min(self.max_timeout, predicted * self.timeout_multiplier))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return the fitted parameters of every model with enough samples."""
+        with self._lock:
+            keys = list(self._samples)
+        snapshot = {}
+        for provider, model in keys:
+            fit = self.fit(provider, model)
+            if fit:
+                snapshot[f"{provider}/{model}"] = {
+                    "overhead": round(fit.overhead, 2),
+                    "ms_per_token": round(fit.seconds_per_token * 1000, 2),
+                    "samples": fit.samples
+                }
+        return snapshot
@@ -4,26 +4,37 @@ Includes robust error handling, provider fallback, and Streamlit Cloud integrati
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, List, Union, Any
+from typing import Dict, Optional, List, Union, Any, Awaitable, Iterator, Callable, Tuple
+import asyncio
+import threading
 import os
 import json
 import time
 import requests
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from enum import Enum
 import streamlit as st
 from loguru import logger
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type
-)
 from functools import lru_cache
+import yaml
 import litellm
-from litellm import completion
+from litellm import completion, acompletion
 from datetime import datetime
 
+from engine.response_cache import ResponseCache, make_cache_key
+from engine.similarity_cache import SimilarityCache
+from engine.health import ProviderHealthRegistry
+from engine.http_pool import HTTPClientPool
+from engine.latency_model import LatencyModel
+from engine.rate_limiter import RateLimiter
+from engine.retry import Deadline, DeadlineExceededError, RetryPolicy, aretry, retry_call
+from engine.single_flight import SingleFlight
+from engine.metrics import MetricsRegistry
+from engine.token_budget import PromptBudget, PromptTooLargeError, apply_budget
+from engine.token_budget import count_tokens as count_model_tokens
+from engine import tracing
+from utils.llm_report_parser import validate_llm_report
+
 # Configure logger
 logger.remove()
 logger.add(
@@ -50,12 +61,47 @@ class TimeoutError(ProviderError):
     """Raised when a request times out."""
     pass
 
+# Errors worth retrying on the same provider; anything else fails over immediately
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    TimeoutError,
+    litellm.Timeout,
+    litellm.APIConnectionError,
+    litellm.InternalServerError,
+    litellm.ServiceUnavailableError,
+    litellm.BadGatewayError
+)
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether an error counts against the provider's health, rather than the request's.
+
+    Retryable and server errors do; client errors (auth, bad request, context
+    window) and cancellations do not.
+    """
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
 class ProviderType(Enum):
     """Enum for supported LLM providers."""
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
     DEEPSEEK = "deepseek"
 
+CONFIG_PATH = "config/config.yaml"
+
+# API hosts whose connections are opened ahead of the first request
+PROVIDER_URLS = {
+    ProviderType.OPENAI: "https://api.openai.com",
+    ProviderType.ANTHROPIC: "https://api.anthropic.com",
+    ProviderType.DEEPSEEK: "https://api.fireworks.ai"
+}
+
+# Errors recorded for requests abandoned by the caller rather than failed by the provider
+REQUEST_CANCELLED = "Request cancelled"
+STREAM_CLOSED = "Stream closed by consumer"
+
 # Model name mappings
 MODEL_MAPPINGS = {
     # OpenAI models
@@ -81,6 +127,7 @@ class ProviderConfig:
     timeout: int = 60
     max_retries: int = 3
     retry_delay: int = 1
+    api_base: Optional[str] = None  # Override of the provider endpoint, e.g. a local stub server
 
 @dataclass
 class RequestMetrics:
@@ -95,12 +142,39 @@ class RequestMetrics:
     timestamp: datetime
     success: bool
     error: Optional[str] = None
+    cached_tokens: int = 0
+
+@dataclass
+class CascadeResult:
+    """Response from a cascade request and the tier that served it."""
+    text: str
+    tier: str
+    provider: str
+    model: str
+    escalated: bool
+    latency: float
+    saved_cost: float
+    saved_latency: Optional[float]
+    reasons: List[str] = field(default_factory=list)
 
 class LLMService(ABC):
     """Abstract base class for LLM services."""
     
-    def __init__(self, config: ProviderConfig):
+    # litellm provider whose protocol the service speaks
+    litellm_provider = "openai"
+    # Whether litellm takes the pooled HTTP handler as `client` for this provider
+    uses_http_handler = True
+    
+    def __init__(self, config: ProviderConfig, http_pool: Optional[HTTPClientPool] = None):
         self.config = config
+        self.http_pool = http_pool
+        self.metrics_listeners: List[Callable[[RequestMetrics], None]] = []
+        self.retry_policy = RetryPolicy(
+            max_retries=config.max_retries,
+            base_delay=config.retry_delay,
+            attempt_timeout=config.timeout,
+            retryable=RETRYABLE_ERRORS
+        )
         self._setup_client()
     
     @abstractmethod
@@ -113,28 +187,195 @@ class LLMService(ABC):
         self,
         prompt: str,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
     ) -> str:
         """Generate a response from the LLM."""
         pass
     
+    @abstractmethod
+    async def agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Generate a response from the LLM without blocking the event loop."""
+        pass
+    
     @abstractmethod
     def count_tokens(self, text: str) -> int:
         """Count the number of tokens in the text."""
         pass
     
-    def _handle_rate_limit(self, retry_count: int) -> None:
-        """Handle rate limit errors with exponential backoff."""
-        if retry_count >= self.config.max_retries:
-            raise RateLimitError("Maximum retry attempts reached")
+    def _build_messages(self, prompt: str, prompt_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Build the chat messages for a prompt.
+        
+        The static prefix is sent first and byte-for-byte unchanged, so providers
+        with automatic prefix caching can reuse it across analyses.
+        """
+        return [{"role": "user", "content": (prompt_prefix or "") + prompt}]
+    
+    def _completion_kwargs(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        timeout: Optional[float] = None,
+        asynchronous: bool = False
+    ) -> Dict[str, Any]:
+        """Build the litellm completion arguments shared by sync and async calls."""
+        kwargs = {
+            "model": self.config.model,
+            "messages": self._build_messages(prompt, prompt_prefix),
+            "temperature": temperature or self.config.temperature,
+            "max_tokens": max_tokens or self.config.max_tokens,
+            "timeout": timeout or self.config.timeout,
+            "max_retries": 0  # Retries are handled by engine.retry
+        }
+        if self.config.api_base:
+            # A custom endpoint speaks this provider's protocol whatever the model name
+            kwargs["api_base"] = self.config.api_base
+            kwargs["custom_llm_provider"] = self.litellm_provider
+        if self.http_pool and self.uses_http_handler:
+            kwargs["client"] = self.http_pool.handler(asynchronous)
+        return kwargs
+    
+    def _handle_response(self, response: Any, start_time: float) -> str:
+        """Log metrics for a successful completion and return its content."""
+        self._log_metrics(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens,
+            latency=time.time() - start_time,
+            success=True,
+            cached_tokens=self._cached_tokens(response.usage)
+        )
+        return response.choices[0].message.content
+    
+    @staticmethod
+    def _cached_tokens(usage: Any) -> int:
+        """Return the prompt tokens served from the provider's prefix cache."""
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        if not cached:
+            cached = getattr(usage, "cache_read_input_tokens", None)
+        return cached if isinstance(cached, int) else 0
+    
+    def _handle_error(self, error: Exception, start_time: float) -> Exception:
+        """Log metrics for a failed completion and map it to the exception to raise."""
+        self._log_metrics(
+            prompt_tokens=0,
+            completion_tokens=0,
+            total_tokens=0,
+            latency=time.time() - start_time,
+            success=False,
+            error=str(error)
+        )
+        if isinstance(error, litellm.RateLimitError):
+            mapped = RateLimitError(str(error))
+            mapped.__cause__ = error  # Keeps the Retry-After headers reachable
+            return mapped
+        return error
+    
+    def stream_response(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        """Stream the response text chunk by chunk as the LLM produces it."""
+        timeout = timeout or self.config.timeout
+        if deadline:
+            timeout = deadline.timeout(timeout)
+        start_time = time.time()
+        chunks: List[str] = []
+        usage = None
+        try:
+            response = completion(
+                **self._completion_kwargs(prompt, max_tokens, temperature, prompt_prefix, timeout),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in response:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    chunks.append(text)
+                    yield text
+        except GeneratorExit:
+            self._log_metrics(
+                prompt_tokens=0,
+                completion_tokens=0,
+                total_tokens=0,
+                latency=time.time() - start_time,
+                success=False,
+                error=STREAM_CLOSED
+            )
+            raise
+        except Exception as e:
+            raise self._handle_error(e, start_time)
         
-        delay = self.config.retry_delay * (2 ** retry_count)
-        logger.warning(f"Rate limit hit, retrying in {delay} seconds...")
-        time.sleep(delay)
+        cached_tokens = 0
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens
+            cached_tokens = self._cached_tokens(usage)
+        else:
+            prompt_tokens = self._safe_count_tokens((prompt_prefix or "") + prompt)
+            completion_tokens = self._safe_count_tokens("".join(chunks))
+        self._log_metrics(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            latency=time.time() - start_time,
+            success=True,
+            cached_tokens=cached_tokens
+        )
+    
+    def _safe_count_tokens(self, text: str) -> int:
+        """Count tokens for metrics, returning 0 if the tokenizer is unavailable."""
+        try:
+            return self.count_tokens(text)
+        except Exception:
+            return 0
+    
+    def _notify_metrics(self, metrics: RequestMetrics) -> None:
+        """Pass request metrics to every registered listener."""
+        for listener in self.metrics_listeners:
+            try:
+                listener(metrics)
+            except Exception as e:
+                logger.warning(f"Metrics listener failed: {str(e)}")
+    
+    def _handle_cancelled(self, start_time: float) -> None:
+        """Log metrics for a request cancelled before completion (e.g. a hedge loser)."""
+        self._log_metrics(
+            prompt_tokens=0,
+            completion_tokens=0,
+            total_tokens=0,
+            latency=time.time() - start_time,
+            success=False,
+            error=REQUEST_CANCELLED
+        )
 
 class OpenAIService(LLMService):
     """OpenAI LLM service implementation using litellm."""
     
+    # litellm builds OpenAI SDK clients itself; they use the pool installed as litellm.(a)client_session
+    uses_http_handler = False
+    
     def _setup_client(self) -> None:
         """Set up the OpenAI client."""
         try:
@@ -144,70 +385,63 @@ class OpenAIService(LLMService):
             logger.error(f"Failed to initialize OpenAI client: {str(e)}")
             raise
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type(RateLimitError)
-    )
     def generate_response(
         self,
         prompt: str,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
     ) -> str:
         """Generate a response using OpenAI's API via litellm."""
-        start_time = time.time()
-        try:
-            response = completion(
-                model=self.config.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature or self.config.temperature,
-                max_tokens=max_tokens or self.config.max_tokens,
-                timeout=self.config.timeout
-            )
-            
-            # Calculate metrics
-            prompt_tokens = response.usage.prompt_tokens
-            completion_tokens = response.usage.completion_tokens
-            total_tokens = response.usage.total_tokens
-            latency = time.time() - start_time
-            
-            # Log metrics
-            self._log_metrics(
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-                latency=latency,
-                success=True
-            )
-            
-            return response.choices[0].message.content
-            
-        except litellm.RateLimitError as e:
-            self._log_metrics(
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
-                latency=time.time() - start_time,
-                success=False,
-                error=str(e)
-            )
-            raise RateLimitError(str(e))
-        except Exception as e:
-            self._log_metrics(
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
-                latency=time.time() - start_time,
-                success=False,
-                error=str(e)
-            )
-            raise
+        def attempt(timeout: float) -> str:
+            start_time = time.time()
+            try:
+                response = completion(
+                    **self._completion_kwargs(prompt, max_tokens, temperature, prompt_prefix, timeout)
+                )
+            except Exception as e:
+                raise self._handle_error(e, start_time)
+            return self._handle_response(response, start_time)
+        
+        return retry_call(
+            attempt, self.retry_policy, deadline, label=f"{self.config.model} request", attempt_timeout=timeout
+        )
+    
+    async def agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Generate a response asynchronously using OpenAI's API via litellm."""
+        async def attempt(timeout: float) -> str:
+            start_time = time.time()
+            try:
+                response = await acompletion(
+                    **self._completion_kwargs(
+                        prompt, max_tokens, temperature, prompt_prefix, timeout, asynchronous=True
+                    )
+                )
+            except asyncio.CancelledError:
+                self._handle_cancelled(start_time)
+                raise
+            except Exception as e:
+                raise self._handle_error(e, start_time)
+            return self._handle_response(response, start_time)
+        
+        return await aretry(
+            attempt, self.retry_policy, deadline, label=f"{self.config.model} request", attempt_timeout=timeout
+        )
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens using litellm's tokenizer."""
+        """Count tokens using the model's cached litellm tokenizer."""
         try:
-            return litellm.token_counter(model=self.config.model, text=text)
+            return count_model_tokens(self.config.model, text)
         except Exception as e:
             logger.error(f"Error counting tokens: {str(e)}")
             raise
@@ -219,7 +453,8 @@ class OpenAIService(LLMService):
         total_tokens: int,
         latency: float,
         success: bool,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        cached_tokens: int = 0
     ) -> None:
         """Log request metrics."""
         metrics = RequestMetrics(
@@ -228,15 +463,17 @@ class OpenAIService(LLMService):
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=total_tokens,
-            cost=self._calculate_cost(prompt_tokens, completion_tokens),
+            cost=self._calculate_cost(prompt_tokens, completion_tokens, cached_tokens),
             latency=latency,
             timestamp=datetime.now(),
             success=success,
-            error=error
+            error=error,
+            cached_tokens=cached_tokens
         )
-        logger.info(f"Request metrics: {metrics}")
+        logger.debug(f"Request metrics: {metrics}")
+        self._notify_metrics(metrics)
 
-    def _calculate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+    def _calculate_cost(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
         """Calculate the cost of the request."""
         # OpenAI's pricing per 1K tokens (as of 2024)
         PRICING = {
@@ -249,13 +486,31 @@ class OpenAIService(LLMService):
         if model not in PRICING:
             return 0.0
             
-        prompt_cost = (prompt_tokens / 1000) * PRICING[model]["prompt"]
+        # Prompt tokens served from the prefix cache are billed at a discount
+        CACHED_PROMPT_RATE = 0.5  # Cached input tokens are billed at half price
+        uncached_tokens = max(prompt_tokens - cached_tokens, 0)
+        prompt_cost = (uncached_tokens / 1000) * PRICING[model]["prompt"]
+        prompt_cost += (cached_tokens / 1000) * PRICING[model]["prompt"] * CACHED_PROMPT_RATE
         completion_cost = (completion_tokens / 1000) * PRICING[model]["completion"]
         return prompt_cost + completion_cost
 
 class AnthropicService(LLMService):
     """Anthropic LLM service implementation using litellm."""
     
+    litellm_provider = "anthropic"
+    
+    def _build_messages(self, prompt: str, prompt_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Build the chat messages, marking the static prefix for Anthropic prompt caching."""
+        if not prompt_prefix:
+            return super()._build_messages(prompt)
+        return [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt_prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt}
+            ]
+        }]
+    
     def _setup_client(self) -> None:
         """Set up the Anthropic client."""
         try:
@@ -265,70 +520,63 @@ class AnthropicService(LLMService):
             logger.error(f"Failed to initialize Anthropic client: {str(e)}")
             raise
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type(RateLimitError)
-    )
     def generate_response(
         self,
         prompt: str,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
     ) -> str:
         """Generate a response using Anthropic's API via litellm."""
-        start_time = time.time()
-        try:
-            response = completion(
-                model=self.config.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature or self.config.temperature,
-                max_tokens=max_tokens or self.config.max_tokens,
-                timeout=self.config.timeout
-            )
-            
-            # Calculate metrics
-            prompt_tokens = response.usage.prompt_tokens
-            completion_tokens = response.usage.completion_tokens
-            total_tokens = response.usage.total_tokens
-            latency = time.time() - start_time
-            
-            # Log metrics
-            self._log_metrics(
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-                latency=latency,
-                success=True
-            )
-            
-            return response.choices[0].message.content
-            
-        except litellm.RateLimitError as e:
-            self._log_metrics(
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
-                latency=time.time() - start_time,
-                success=False,
-                error=str(e)
-            )
-            raise RateLimitError(str(e))
-        except Exception as e:
-            self._log_metrics(
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
-                latency=time.time() - start_time,
-                success=False,
-                error=str(e)
-            )
-            raise
+        def attempt(timeout: float) -> str:
+            start_time = time.time()
+            try:
+                response = completion(
+                    **self._completion_kwargs(prompt, max_tokens, temperature, prompt_prefix, timeout)
+                )
+            except Exception as e:
+                raise self._handle_error(e, start_time)
+            return self._handle_response(response, start_time)
+        
+        return retry_call(
+            attempt, self.retry_policy, deadline, label=f"{self.config.model} request", attempt_timeout=timeout
+        )
+    
+    async def agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Generate a response asynchronously using Anthropic's API via litellm."""
+        async def attempt(timeout: float) -> str:
+            start_time = time.time()
+            try:
+                response = await acompletion(
+                    **self._completion_kwargs(
+                        prompt, max_tokens, temperature, prompt_prefix, timeout, asynchronous=True
+                    )
+                )
+            except asyncio.CancelledError:
+                self._handle_cancelled(start_time)
+                raise
+            except Exception as e:
+                raise self._handle_error(e, start_time)
+            return self._handle_response(response, start_time)
+        
+        return await aretry(
+            attempt, self.retry_policy, deadline, label=f"{self.config.model} request", attempt_timeout=timeout
+        )
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens using litellm's tokenizer."""
+        """Count tokens using the model's cached litellm tokenizer."""
         try:
-            return litellm.token_counter(model=self.config.model, text=text)
+            return count_model_tokens(self.config.model, text)
         except Exception as e:
             logger.error(f"Error counting tokens: {str(e)}")
             raise
@@ -340,7 +588,8 @@ class AnthropicService(LLMService):
         total_tokens: int,
         latency: float,
         success: bool,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        cached_tokens: int = 0
     ) -> None:
         """Log request metrics."""
         metrics = RequestMetrics(
@@ -349,15 +598,17 @@ class AnthropicService(LLMService):
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=total_tokens,
-            cost=self._calculate_cost(prompt_tokens, completion_tokens),
+            cost=self._calculate_cost(prompt_tokens, completion_tokens, cached_tokens),
             latency=latency,
             timestamp=datetime.now(),
             success=success,
-            error=error
+            error=error,
+            cached_tokens=cached_tokens
         )
-        logger.info(f"Request metrics: {metrics}")
+        logger.debug(f"Request metrics: {metrics}")
+        self._notify_metrics(metrics)
 
-    def _calculate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+    def _calculate_cost(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
         """Calculate the cost of the request."""
         # Anthropic's pricing per 1K tokens (as of 2024)
         PRICING = {
@@ -370,13 +621,19 @@ class AnthropicService(LLMService):
         if model not in PRICING:
             return 0.0
             
-        prompt_cost = (prompt_tokens / 1000) * PRICING[model]["prompt"]
+        # Prompt tokens served from the prefix cache are billed at a discount
+        CACHED_PROMPT_RATE = 0.1  # Cache reads are billed at 10% of the input price
+        uncached_tokens = max(prompt_tokens - cached_tokens, 0)
+        prompt_cost = (uncached_tokens / 1000) * PRICING[model]["prompt"]
+        prompt_cost += (cached_tokens / 1000) * PRICING[model]["prompt"] * CACHED_PROMPT_RATE
         completion_cost = (completion_tokens / 1000) * PRICING[model]["completion"]
         return prompt_cost + completion_cost
 
 class DeepSeekService(LLMService):
     """DeepSeek LLM service implementation using litellm."""
     
+    litellm_provider = "fireworks_ai"
+    
     def _setup_client(self) -> None:
         """Set up the DeepSeek client."""
         try:
@@ -386,70 +643,63 @@ class DeepSeekService(LLMService):
             logger.error(f"Failed to initialize DeepSeek client: {str(e)}")
             raise
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type(RateLimitError)
-    )
     def generate_response(
         self,
         prompt: str,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
     ) -> str:
         """Generate a response using DeepSeek's API via litellm."""
-        start_time = time.time()
-        try:
-            response = completion(
-                model=self.config.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature or self.config.temperature,
-                max_tokens=max_tokens or self.config.max_tokens,
-                timeout=self.config.timeout
-            )
-            
-            # Calculate metrics
-            prompt_tokens = response.usage.prompt_tokens
-            completion_tokens = response.usage.completion_tokens
-            total_tokens = response.usage.total_tokens
-            latency = time.time() - start_time
-            
-            # Log metrics
-            self._log_metrics(
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-                latency=latency,
-                success=True
-            )
-            
-            return response.choices[0].message.content
-            
-        except litellm.RateLimitError as e:
-            self._log_metrics(
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
-                latency=time.time() - start_time,
-                success=False,
-                error=str(e)
-            )
-            raise RateLimitError(str(e))
-        except Exception as e:
-            self._log_metrics(
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
-                latency=time.time() - start_time,
-                success=False,
-                error=str(e)
-            )
-            raise
+        def attempt(timeout: float) -> str:
+            start_time = time.time()
+            try:
+                response = completion(
+                    **self._completion_kwargs(prompt, max_tokens, temperature, prompt_prefix, timeout)
+                )
+            except Exception as e:
+                raise self._handle_error(e, start_time)
+            return self._handle_response(response, start_time)
+        
+        return retry_call(
+            attempt, self.retry_policy, deadline, label=f"{self.config.model} request", attempt_timeout=timeout
+        )
+    
+    async def agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Generate a response asynchronously using DeepSeek's API via litellm."""
+        async def attempt(timeout: float) -> str:
+            start_time = time.time()
+            try:
+                response = await acompletion(
+                    **self._completion_kwargs(
+                        prompt, max_tokens, temperature, prompt_prefix, timeout, asynchronous=True
+                    )
+                )
+            except asyncio.CancelledError:
+                self._handle_cancelled(start_time)
+                raise
+            except Exception as e:
+                raise self._handle_error(e, start_time)
+            return self._handle_response(response, start_time)
+        
+        return await aretry(
+            attempt, self.retry_policy, deadline, label=f"{self.config.model} request", attempt_timeout=timeout
+        )
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens using litellm's tokenizer."""
+        """Count tokens using the model's cached litellm tokenizer."""
         try:
-            return litellm.token_counter(model=self.config.model, text=text)
+            return count_model_tokens(self.config.model, text)
         except Exception as e:
             logger.error(f"Error counting tokens: {str(e)}")
             raise
@@ -461,7 +711,8 @@ class DeepSeekService(LLMService):
         total_tokens: int,
         latency: float,
         success: bool,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        cached_tokens: int = 0
     ) -> None:
         """Log request metrics."""
         metrics = RequestMetrics(
@@ -470,15 +721,17 @@ class DeepSeekService(LLMService):
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=total_tokens,
-            cost=self._calculate_cost(prompt_tokens, completion_tokens),
+            cost=self._calculate_cost(prompt_tokens, completion_tokens, cached_tokens),
             latency=latency,
             timestamp=datetime.now(),
             success=success,
-            error=error
+            error=error,
+            cached_tokens=cached_tokens
         )
-        logger.info(f"Request metrics: {metrics}")
+        logger.debug(f"Request metrics: {metrics}")
+        self._notify_metrics(metrics)
 
-    def _calculate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+    def _calculate_cost(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
         """Calculate the cost of the request."""
         # DeepSeek's pricing per 1K tokens (as of 2024)
         PRICING = {
@@ -489,17 +742,173 @@ class DeepSeekService(LLMService):
         if model not in PRICING:
             return 0.0
             
-        prompt_cost = (prompt_tokens / 1000) * PRICING[model]["prompt"]
+        # Prompt tokens served from the prefix cache are billed at a discount
+        CACHED_PROMPT_RATE = 1.0  # No prefix caching discount
+        uncached_tokens = max(prompt_tokens - cached_tokens, 0)
+        prompt_cost = (uncached_tokens / 1000) * PRICING[model]["prompt"]
+        prompt_cost += (cached_tokens / 1000) * PRICING[model]["prompt"] * CACHED_PROMPT_RATE
         completion_cost = (completion_tokens / 1000) * PRICING[model]["completion"]
         return prompt_cost + completion_cost
 
 class LLMServiceManager:
     """Manager class for handling multiple LLM providers with fallback support."""
     
-    def __init__(self):
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
         self.providers: Dict[ProviderType, LLMService] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self.settings = settings if settings is not None else self._load_settings()
+        self.hedging_settings: Dict[str, Any] = self.settings.get("llm", {}).get("hedging", {})
+        self.budget_settings: Dict[str, Any] = self.settings.get("llm", {}).get("budget", {})
+        self.adaptive_timeouts = self.settings.get("llm", {}).get("adaptive_timeouts", {})
+        self.latency_model = LatencyModel(
+            window=self.adaptive_timeouts.get("window", 200),
+            min_samples=self.adaptive_timeouts.get("min_samples", 5),
+            timeout_multiplier=self.adaptive_timeouts.get("timeout_multiplier", 2.0),
+            min_timeout=self.adaptive_timeouts.get("min_timeout", 15),
+            max_timeout=self.adaptive_timeouts.get("max_timeout", 600)
+        )
+        self.health = ProviderHealthRegistry(self.settings.get("llm", {}).get("circuit_breaker", {}))
+        self.rate_limiter = RateLimiter(self.settings.get("llm", {}).get("rate_limits"))
+        self.single_flight = SingleFlight()
+        self.analysis_timeout: Optional[float] = self.settings.get("llm", {}).get("analysis_timeout")
+        self.cascade_settings: Dict[str, Any] = self.settings.get("llm", {}).get("cascade", {})
+        self._model_services: Dict[Tuple[ProviderType, str], LLMService] = {}
+        self._services_lock = threading.Lock()
+        self.coalesce_requests = self.settings.get("llm", {}).get("coalesce_requests", True)
+        self._initialize_http_pool()
+        self._initialize_metrics()
         self._load_config()
         self._initialize_providers()
+        self._warm_connections()
+        self._initialize_cache()
+    
+    @staticmethod
+    def _load_settings() -> Dict[str, Any]:
+        """Load application settings from the YAML configuration file."""
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                return yaml.safe_load(f) or {}
+        except Exception as e:
+            logger.warning(f"Could not load {CONFIG_PATH}, using defaults: {str(e)}")
+            return {}
+    
+    def _initialize_metrics(self) -> None:
+        """Initialize the metrics registry, its persistent store and optional exporter."""
+        metrics_settings = self.settings.get("llm", {}).get("metrics", {})
+        self.metrics = MetricsRegistry(
+            store_path=metrics_settings.get("store_path"),
+            recent_size=metrics_settings.get("recent_size", 500),
+            cancelled_errors=(REQUEST_CANCELLED, STREAM_CLOSED)
+        )
+        if metrics_settings.get("http_port"):
+            try:
+                self.metrics.start_http_server(
+                    metrics_settings["http_port"],
+                    host=metrics_settings.get("http_host", "127.0.0.1")
+                )
+            except OSError as e:
+                logger.error(f"Could not start metrics endpoint: {str(e)}")
+    
+    def _initialize_http_pool(self) -> None:
+        """Create the pooled HTTP clients shared by every provider call."""
+        self.http_pool: Optional[HTTPClientPool] = None
+        pool_settings = self.settings.get("llm", {}).get("http_pool", {})
+        if not pool_settings.get("enabled", True):
+            return
+        try:
+            self.http_pool = HTTPClientPool.from_settings(pool_settings)
+            self.http_pool.install()
+        except Exception as e:
+            logger.error(f"Failed to initialize HTTP connection pool, using litellm defaults: {str(e)}")
+            self.http_pool = None
+    
+    def _warm_connections(self) -> None:
+        """Open connections to the configured providers in the background."""
+        if not self.http_pool or not self.settings.get("llm", {}).get("http_pool", {}).get("prewarm"):
+            return
+        urls = [service.config.api_base or PROVIDER_URLS[provider] for provider, service in self.providers.items()]
+        asyncio.run_coroutine_threadsafe(self.http_pool.awarm(urls), self._get_loop())
+    
+    def close(self) -> None:
+        """Close the pooled HTTP connections, stop the event loop and close the stores."""
+        if self.http_pool:
+            self.http_pool.close(self._loop)
+            self.http_pool = None
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop, self._loop_thread = None, None
+        if loop is not None:
+            if loop.is_running():
+                try:
+                    asyncio.run_coroutine_threadsafe(_cancel_pending_tasks(), loop).result(timeout=5)
+                except Exception as e:
+                    logger.warning(f"Could not cancel pending tasks on close: {str(e)}")
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not None:
+                thread.join(timeout=5)
+            if not loop.is_running():
+                loop.close()
+        self.metrics.close()
+        self.response_cache.close()
+    
+    def _initialize_cache(self) -> None:
+        """Initialize the on-disk response cache from the app and standards settings."""
+        app_settings = self.settings.get("app", {})
+        standards_settings = self.settings.get("standards", {})
+        try:
+            self.response_cache = ResponseCache(
+                cache_dir=app_settings.get("cache_dir", "cache"),
+                ttl=standards_settings.get("cache_ttl", 86400),
+                size_limit_mb=app_settings.get("cache_size_limit_mb", 512),
+                enabled=standards_settings.get("cache_enabled", True)
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize response cache, caching disabled: {str(e)}")
+            self.response_cache = ResponseCache(enabled=False)
+        
+        analysis_settings = self.settings.get("analysis", {})
+        self.similarity_cache = SimilarityCache(
+            cache_dir=app_settings.get("cache_dir", "cache"),
+            threshold=analysis_settings.get("similarity_threshold", 0.7),
+            max_entries=analysis_settings.get("similarity_max_entries", 500),
+            enabled=standards_settings.get("cache_enabled", True)
+        )
+    
+    def _cache_key(
+        self,
+        prompt: str,
+        provider: ProviderType,
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        prompt_prefix: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """Build the response cache key for a request to a provider."""
+        if not self.response_cache.enabled:
+            return None
+        return self._request_key(prompt, provider, max_tokens, temperature, prompt_prefix, model)
+    
+    def _request_key(
+        self,
+        prompt: str,
+        provider: ProviderType,
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        prompt_prefix: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Optional[str]:
+        """Build the content-addressed key of a normalized request to a provider."""
+        if provider not in self.providers:
+            return None
+        service = self._service(provider, model)
+        return make_cache_key(
+            prompt=(prompt_prefix or "") + prompt,
+            model=service.config.model,
+            temperature=temperature or service.config.temperature,
+            max_tokens=max_tokens or service.config.max_tokens
+        )
     
     def _load_config(self) -> None:
         """Load configuration from environment variables and Streamlit secrets."""
@@ -541,17 +950,467 @@ class LLMServiceManager:
         """Initialize LLM providers."""
         for provider_type in ProviderType:
             if self.api_keys[provider_type]:
+                llm_settings = self.settings.get("llm", {})
                 config = ProviderConfig(
                     api_key=self.api_keys[provider_type],
-                    model=self.models[provider_type]
+                    model=self.models[provider_type],
+                    timeout=llm_settings.get("timeout", 60),
+                    max_retries=llm_settings.get("max_retries", 3),
+                    retry_delay=llm_settings.get("retry_delay", 1),
+                    api_base=(llm_settings.get("api_bases") or {}).get(provider_type.value)
                 )
                 
                 if provider_type == ProviderType.OPENAI:
-                    self.providers[provider_type] = OpenAIService(config)
+                    self.providers[provider_type] = OpenAIService(config, self.http_pool)
                 elif provider_type == ProviderType.ANTHROPIC:
-                    self.providers[provider_type] = AnthropicService(config)
+                    self.providers[provider_type] = AnthropicService(config, self.http_pool)
                 elif provider_type == ProviderType.DEEPSEEK:
-                    self.providers[provider_type] = DeepSeekService(config)
+                    self.providers[provider_type] = DeepSeekService(config, self.http_pool)
+                
+                self.providers[provider_type].metrics_listeners.append(self.latency_model.record)
+                self.providers[provider_type].metrics_listeners.append(self.metrics.record)
+                self.providers[provider_type].metrics_listeners.append(self._record_trace)
+    
+    def _service(self, provider: ProviderType, model: Optional[str] = None) -> LLMService:
+        """Return the provider's service, or one for another model of the same provider."""
+        service = self.providers[provider]
+        if not model:
+            return service
+        model = MODEL_MAPPINGS.get(model, model)
+        if model == service.config.model:
+            return service
+        with self._services_lock:
+            key = (provider, model)
+            if key not in self._model_services:
+                model_service = type(service)(replace(service.config, model=model), service.http_pool)
+                model_service.metrics_listeners.extend(service.metrics_listeners)
+                self._model_services[key] = model_service
+            return self._model_services[key]
+    
+    def _deadline(self, timeout: Optional[float] = None) -> Deadline:
+        """Start the end-to-end deadline of an analysis (llm.analysis_timeout by default)."""
+        return Deadline(timeout if timeout is not None else self.analysis_timeout)
+    
+    @staticmethod
+    def _limit(deadline: Optional[Deadline]) -> Optional[float]:
+        """Return the time left on a deadline as a timeout, or None if unbounded."""
+        if deadline is None or deadline.expires_at is None:
+            return None
+        return deadline.remaining()
+    
+    def _request_timeout(self, provider: ProviderType, service: LLMService, max_tokens: int) -> float:
+        """Per-attempt timeout sized to max_tokens from the model's observed latency."""
+        if not self.adaptive_timeouts.get("enabled", True):
+            return service.config.timeout
+        return self.latency_model.timeout(
+            provider.value, service.config.model, max_tokens, default=service.config.timeout
+        )
+    
+    def predict_duration(
+        self,
+        provider: ProviderType,
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None
+    ) -> Optional[float]:
+        """Predict how long one request producing up to max_tokens takes, if enough samples exist."""
+        if provider not in self.providers:
+            return None
+        service = self._service(provider, model)
+        max_tokens = max_tokens or service.config.max_tokens
+        if not max_tokens:
+            return None
+        return self.latency_model.predict(provider.value, service.config.model, max_tokens)
+    
+    def get_latency_model(self) -> Dict[str, Dict[str, float]]:
+        """Return the fitted latency model of every provider/model with enough samples."""
+        return self.latency_model.snapshot()
+    
+    def _allow(self, provider: ProviderType) -> bool:
+        """Ask the provider's circuit breaker for a slot, right before calling the provider."""
+        if self.health.allow_request(provider.value):
+            return True
+        logger.warning(f"Circuit open for {provider.value}, skipping...")
+        return False
+    
+    def _record_outcome(self, provider: ProviderType, latency: float, error: Optional[BaseException] = None) -> None:
+        """Record one provider call (all of its retries) in the provider health registry."""
+        if error is None:
+            self.health.record(provider.value, True, latency)
+        elif is_provider_failure(error):
+            self.health.record(provider.value, False, latency)
+        else:
+            self.health.release(provider.value)
+    
+    def _record_trace(self, metrics: RequestMetrics) -> None:
+        """Add request tokens and cost to the current tracing span, if any."""
+        span = tracing.current_span()
+        if span is None:
+            return
+        span.add(
+            requests=1,
+            prompt_tokens=metrics.prompt_tokens,
+            completion_tokens=metrics.completion_tokens,
+            cached_tokens=metrics.cached_tokens,
+            cost=metrics.cost
+        )
+        if not metrics.success:
+            span.add(failed_requests=1)
+    
+    def _available_providers(self, providers_to_try: List[ProviderType]) -> List[ProviderType]:
+        """Filter a fallback chain down to initialized providers.
+        
+        Circuit breakers are asked later, with _allow(), only for the providers actually called.
+        """
+        available = []
+        for provider in providers_to_try:
+            if provider not in self.providers:
+                logger.warning(f"Provider {provider.value} not initialized, skipping...")
+                continue
+            available.append(provider)
+        return available
+    
+    def _apply_budget(
+        self,
+        provider: ProviderType,
+        prompt: str,
+        max_tokens: Optional[int],
+        prompt_prefix: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> PromptBudget:
+        """Fit the prompt and max_tokens into the provider model's context window."""
+        service = self._service(provider, model)
+        try:
+            return apply_budget(
+                model=service.config.model,
+                prompt=prompt,
+                max_tokens=max_tokens or service.config.max_tokens,
+                overflow=self.budget_settings.get("overflow", "trim"),
+                reserve_tokens=self.budget_settings.get("reserve_tokens", 256),
+                min_completion_tokens=self.budget_settings.get("min_completion_tokens", 512),
+                prefix=prompt_prefix or ""
+            )
+        except PromptTooLargeError as e:
+            raise TokenLimitError(str(e))
+    
+    async def _acall_provider(
+        self,
+        provider: ProviderType,
+        prompt: str,
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        prompt_prefix: Optional[str] = None,
+        model: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """Budget the request, wait for rate limiter admission, then send it to one provider.
+        
+        Callers check the provider's circuit with _allow() first; the outcome is recorded here.
+        """
+        service = self._service(provider, model)
+        start_time = time.time()
+        try:
+            with tracing.span("llm.request", provider=provider.value, model=service.config.model) as span:
+                budget = self._apply_budget(provider, prompt, max_tokens, prompt_prefix, model)
+                span.set(max_tokens=budget.max_tokens)
+                with tracing.span("rate_limit"):
+                    await self.rate_limiter.acquire(
+                        provider.value,
+                        service.config.model,
+                        budget.prompt_tokens + budget.max_tokens,
+                        timeout=self._limit(deadline)
+                    )
+                start_time = time.time()
+                response = await service.agenerate_response(
+                    prompt=budget.prompt,
+                    max_tokens=budget.max_tokens,
+                    temperature=temperature,
+                    prompt_prefix=budget.prefix or None,
+                    deadline=deadline,
+                    timeout=self._request_timeout(provider, service, budget.max_tokens)
+                )
+                span.set(response_chars=len(response))
+        except BaseException as e:
+            self._record_outcome(provider, time.time() - start_time, e)
+            raise
+        self._record_outcome(provider, time.time() - start_time)
+        return response
+    
+    def get_provider_health(self) -> List[Dict[str, Any]]:
+        """Return circuit state, error rate and latency for every provider."""
+        health = {h.provider: h.to_dict() for h in self.health.snapshot()}
+        return [
+            health.get(provider.value, {
+                "provider": provider.value,
+                "state": "closed",
+                "requests": 0,
+                "error_rate": 0.0,
+                "avg_latency": None,
+                "consecutive_failures": 0,
+                "retry_in": None
+            })
+            for provider in self.providers
+        ]
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the manager's event loop, starting it on a daemon thread if needed."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="llm-service-loop",
+                    daemon=True
+                )
+                thread.start()
+                self._loop = loop
+                self._loop_thread = thread
+            return self._loop
+    
+    def _run_sync(self, coro: Awaitable[Any]) -> Any:
+        """Run a coroutine on the manager loop and block until it completes."""
+        return asyncio.run_coroutine_threadsafe(tracing.bind(coro), self._get_loop()).result()
+    
+    async def _run_on_loop(self, coro: Awaitable[Any]) -> Any:
+        """Await a coroutine on the manager loop from any event loop."""
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(tracing.bind(coro), loop))
+    
+    async def _agenerate(
+        self,
+        prompt: str,
+        primary_provider: ProviderType,
+        fallback_providers: Optional[List[ProviderType]],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """Generate on the manager loop, attaching to an identical request already in flight.
+        
+        model overrides the primary provider's configured model; fallbacks keep theirs.
+        """
+        request = dict(
+            prompt=prompt,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            hedge=hedge,
+            prompt_prefix=prompt_prefix,
+            deadline=deadline,
+            model=model
+        )
+        flight_key = (
+            self._request_key(prompt, primary_provider, max_tokens, temperature, prompt_prefix, model)
+            if self.coalesce_requests else None
+        )
+        if flight_key is None:
+            return await self._agenerate_with_fallback(**request)
+        fallback_chain = ",".join(p.value for p in fallback_providers or [])
+        if hedge is None:
+            hedge = self.hedging_settings.get("enabled", False)
+        # Callers bypassing the cache or hedging differently must not share a flight
+        return await self.single_flight.do(
+            f"{flight_key}:{fallback_chain}:cache={use_cache}:hedge={hedge}",
+            lambda: self._agenerate_with_fallback(**request)
+        )
+    
+    async def _agenerate_with_fallback(
+        self,
+        prompt: str,
+        primary_provider: ProviderType,
+        fallback_providers: Optional[List[ProviderType]],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """Try each provider in turn on the manager loop until one succeeds within the deadline."""
+        cache_key = (
+            self._cache_key(prompt, primary_provider, max_tokens, temperature, prompt_prefix, model)
+            if use_cache else None
+        )
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Response cache hit for {primary_provider.value}")
+                return cached
+        
+        providers_to_try = [primary_provider]
+        if fallback_providers:
+            providers_to_try.extend(fallback_providers)
+        
+        available = self._available_providers(providers_to_try)
+        
+        if hedge is None:
+            hedge = self.hedging_settings.get("enabled", False)
+        
+        response = None
+        last_error = None
+        if hedge and len(available) > 1:
+            primary = available.pop(0)
+            if self._allow(primary):
+                try:
+                    response = await self._ahedged_response(
+                        primary=primary,
+                        secondary=available[0],
+                        prompt=prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        prompt_prefix=prompt_prefix,
+                        deadline=deadline,
+                        primary_model=model if primary == primary_provider else None
+                    )
+                except Exception as e:
+                    last_error = e
+                available = available[1:]
+        
+        if response is None:
+            for provider in available:
+                if deadline is not None and deadline.expired():
+                    logger.error(f"Deadline exceeded, not trying {provider.value}")
+                    last_error = DeadlineExceededError(f"Deadline of {deadline.seconds}s exceeded")
+                    break
+                if not self._allow(provider):
+                    continue
+                try:
+                    response = await self._acall_provider(
+                        provider, prompt, max_tokens, temperature, prompt_prefix,
+                        model=model if provider == primary_provider else None,
+                        deadline=deadline
+                    )
+                    break
+                except Exception as e:
+                    last_error = e
+                    logger.error(f"Error with {provider.value}: {str(e)}")
+                    continue
+        
+        if response is None:
+            if last_error:
+                raise last_error
+            raise ProviderError("No available providers to handle the request")
+        
+        if cache_key:
+            self.response_cache.set(cache_key, response)
+        return response
+    
+    def _hedge_delay(self, provider: ProviderType, model: Optional[str] = None) -> float:
+        """Return how long to wait on a provider before sending a hedged request."""
+        delay = self.metrics.latency_percentile(
+            provider.value,
+            self._service(provider, model).config.model,
+            self.hedging_settings.get("percentile", 95),
+            min_samples=self.hedging_settings.get("min_samples", 5)
+        )
+        if delay is None:
+            delay = self.hedging_settings.get("default_delay", 30)
+        return max(delay, self.hedging_settings.get("min_delay", 1))
+    
+    async def _ahedged_response(
+        self,
+        primary: ProviderType,
+        secondary: ProviderType,
+        prompt: str,
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        prompt_prefix: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        primary_model: Optional[str] = None
+    ) -> str:
+        """Race the primary provider against a delayed hedge on the secondary.
+        
+        The secondary only receives the prompt once the primary has been slower
+        than its observed latency percentile (or has failed). The first success
+        wins and the other request is cancelled.
+        """
+        def start(provider: ProviderType, model: Optional[str] = None) -> asyncio.Task:
+            return asyncio.create_task(
+                self._acall_provider(provider, prompt, max_tokens, temperature, prompt_prefix, model, deadline)
+            )
+        
+        tasks = {start(primary, primary_model): primary}
+        started = list(tasks)
+        try:
+            delay = self._hedge_delay(primary, primary_model)
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                primary_task = next(iter(done))
+                if primary_task.exception() is None:
+                    return primary_task.result()
+                logger.error(f"Error with {primary.value}: {str(primary_task.exception())}")
+                tasks = {}
+            else:
+                logger.info(
+                    f"{primary.value} slower than {delay:.1f}s, hedging request to {secondary.value}"
+                )
+            if not self._allow(secondary):
+                return await started[0]
+            hedge_task = start(secondary)
+            started.append(hedge_task)
+            tasks[hedge_task] = secondary
+            
+            last_error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        logger.info(f"Hedged request served by {tasks[task].value}")
+                        return task.result()
+                    last_error = task.exception()
+                    logger.error(f"Error with {tasks[task].value}: {str(last_error)}")
+            raise last_error
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*started, return_exceptions=True)
+    
+    async def agenerate_response(
+        self,
+        prompt: str,
+        primary_provider: ProviderType = ProviderType.OPENAI,
+        fallback_providers: Optional[List[ProviderType]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        prompt_prefix: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Asynchronously generate a response with fallback options.
+        
+        The request always runs on the manager's own event loop, so callers on
+        any loop (or several concurrent analyses) share one set of connections.
+        Set use_cache=False to bypass the response cache and hedge=True to race
+        a slow primary provider against the first fallback (defaults to the
+        llm.hedging.enabled setting). A prompt_prefix is sent ahead of the
+        prompt unchanged so providers can serve it from their prompt cache.
+        Identical requests already in flight (from any caller, sync or async)
+        are joined rather than sent again. Retries and fallbacks stop once the
+        end-to-end timeout (default llm.analysis_timeout) has been used up.
+        """
+        deadline = self._deadline(timeout)
+        return await self._run_on_loop(self._agenerate(
+            prompt=prompt,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            hedge=hedge,
+            prompt_prefix=prompt_prefix,
+            deadline=deadline
+        ))
     
     def generate_response(
         self,
@@ -559,35 +1418,397 @@ class LLMServiceManager:
         primary_provider: ProviderType = ProviderType.OPENAI,
         fallback_providers: Optional[List[ProviderType]] = None,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        prompt_prefix: Optional[str] = None,
+        timeout: Optional[float] = None
     ) -> str:
         """Generate a response using the specified provider with fallback options."""
+        deadline = self._deadline(timeout)
+        return self._run_sync(self._agenerate(
+            prompt=prompt,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            hedge=hedge,
+            prompt_prefix=prompt_prefix,
+            deadline=deadline
+        ))
+
+    async def _agenerate_cascade(
+        self,
+        prompt: str,
+        primary_provider: ProviderType,
+        fallback_providers: Optional[List[ProviderType]],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        use_cache: bool = True,
+        prompt_prefix: Optional[str] = None,
+        required_sections: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None,
+        model: Optional[str] = None
+    ) -> CascadeResult:
+        """Try the provider's fast model first and escalate to the premium model if its report fails validation."""
+        fast_model = (self.cascade_settings.get("fast_models") or {}).get(primary_provider.value)
+        premium = self._service(primary_provider, model) if primary_provider in self.providers else None
+        reasons: List[str] = []
+        fast_latency = 0.0
+        fast_cost = 0.0
+        fast_called = False
+        prompt_tokens = completion_tokens = 0
+        start_time = time.time()
+        cache_key = text = None
+        if fast_model and premium:
+            cache_key = (
+                self._cache_key(prompt, primary_provider, max_tokens, temperature, prompt_prefix, fast_model)
+                if use_cache else None
+            )
+            text = self.response_cache.get(cache_key) if cache_key else None
+        if fast_model and premium and (text is not None or self._allow(primary_provider)):
+            fast = self._service(primary_provider, fast_model)
+            # Cache hits cost nothing either way, so only real fast-tier calls count as savings
+            fast_called = text is None
+            try:
+                if text is None:
+                    text = await self._acall_provider(
+                        primary_provider, prompt, max_tokens, temperature, prompt_prefix, fast_model, deadline
+                    )
+                validation = validate_llm_report(text, required_sections)
+                reasons = validation.reasons
+            except Exception as e:
+                logger.error(f"Fast tier {fast.config.model} failed: {str(e)}")
+                text, reasons = None, [f"error: {str(e)}"]
+            fast_latency = time.time() - start_time
+            
+            if text is not None and fast_called:
+                prompt_tokens = fast._safe_count_tokens((prompt_prefix or "") + prompt)
+                completion_tokens = fast._safe_count_tokens(text)
+                fast_cost = fast._calculate_cost(prompt_tokens, completion_tokens)
+            if not reasons:
+                saved_cost, saved_latency = 0.0, None
+                if fast_called:
+                    if cache_key:
+                        self.response_cache.set(cache_key, text)
+                    saved_cost = premium._calculate_cost(prompt_tokens, completion_tokens) - fast_cost
+                    premium_latency = self.metrics.latency_percentile(
+                        primary_provider.value, premium.config.model, 50
+                    )
+                    saved_latency = premium_latency - fast_latency if premium_latency is not None else None
+                result = CascadeResult(
+                    text=text,
+                    tier="fast",
+                    provider=primary_provider.value,
+                    model=fast.config.model,
+                    escalated=False,
+                    latency=fast_latency,
+                    saved_cost=saved_cost,
+                    saved_latency=saved_latency
+                )
+                self.metrics.record_cascade(result.tier, result.saved_cost, result.saved_latency)
+                logger.info(f"Cascade served by fast tier {fast.config.model} in {fast_latency:.1f}s")
+                return result
+            logger.info(f"Escalating to premium tier: {'; '.join(reasons)}")
+        
+        text = await self._agenerate(
+            prompt=prompt,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            prompt_prefix=prompt_prefix,
+            deadline=deadline,
+            model=model
+        )
+        escalated = bool(reasons)
+        result = CascadeResult(
+            text=text,
+            tier="premium",
+            provider=primary_provider.value,
+            model=premium.config.model if premium else "",
+            escalated=escalated,
+            latency=time.time() - start_time,
+            saved_cost=-fast_cost,
+            saved_latency=-fast_latency if escalated and fast_called else None,
+            reasons=reasons
+        )
+        self.metrics.record_cascade(result.tier, result.saved_cost, result.saved_latency)
+        return result
+    
+    async def agenerate_cascade(
+        self,
+        prompt: str,
+        primary_provider: ProviderType = ProviderType.OPENAI,
+        fallback_providers: Optional[List[ProviderType]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        prompt_prefix: Optional[str] = None,
+        required_sections: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None
+    ) -> CascadeResult:
+        """Generate with the cheap model of llm.cascade.fast_models first, escalating on failure.
+        
+        The fast tier's report is checked for the required section headings and
+        well-formed tables; if the check (or the request) fails, the premium
+        model answers through the usual fallback chain. The result records the
+        serving tier and the estimated cost and latency saved (negative when an
+        escalation wasted the fast attempt); fast-tier cache hits save nothing.
+        model is the premium tier's model (the provider's configured model by default).
+        """
+        return await self._run_on_loop(self._agenerate_cascade(
+            prompt=prompt,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            prompt_prefix=prompt_prefix,
+            required_sections=required_sections,
+            deadline=self._deadline(timeout),
+            model=model
+        ))
+    
+    def generate_cascade(
+        self,
+        prompt: str,
+        primary_provider: ProviderType = ProviderType.OPENAI,
+        fallback_providers: Optional[List[ProviderType]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        prompt_prefix: Optional[str] = None,
+        required_sections: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None
+    ) -> CascadeResult:
+        """Generate through the fast/premium model cascade and block until done."""
+        return self._run_sync(self._agenerate_cascade(
+            prompt=prompt,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            prompt_prefix=prompt_prefix,
+            required_sections=required_sections,
+            deadline=self._deadline(timeout),
+            model=model
+        ))
+
+    async def _agenerate_sections(
+        self,
+        section_prompts: Dict[str, str],
+        max_concurrency: int,
+        **request_kwargs: Any
+    ) -> Dict[str, str]:
+        """Generate sections concurrently with at most max_concurrency requests in flight."""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def generate_section(section: str, prompt: str) -> str:
+            with tracing.span("section", section=section):
+                async with semaphore:
+                    start_time = time.time()
+                    response = await self._agenerate(prompt=prompt, **request_kwargs)
+                    logger.info(f"Section {section} generated in {time.time() - start_time:.1f}s")
+                    return response
+        
+        results = await asyncio.gather(
+            *[generate_section(section, prompt) for section, prompt in section_prompts.items()],
+            return_exceptions=True
+        )
+        
+        sections = {}
+        errors = []
+        for section, result in zip(section_prompts, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Section {section} failed: {str(result)}")
+                errors.append(result)
+            else:
+                sections[section] = result
+        if errors and not sections:
+            raise errors[0]
+        return sections
+    
+    async def agenerate_sections(
+        self,
+        section_prompts: Dict[str, str],
+        primary_provider: ProviderType = ProviderType.OPENAI,
+        fallback_providers: Optional[List[ProviderType]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, str]:
+        """Generate report sections concurrently, returned in the order given.
+        
+        Each section goes through the same cache, fallback, hedging and rate
+        limiting as a single request; max_tokens applies per section. Sections
+        that fail are left out (and logged) unless every section fails. All
+        sections share one end-to-end timeout (default llm.analysis_timeout).
+        """
+        if max_concurrency is None:
+            max_concurrency = self.settings.get("analysis", {}).get("section_concurrency", 4)
+        return await self._run_on_loop(self._agenerate_sections(
+            section_prompts,
+            max_concurrency,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            hedge=hedge,
+            deadline=self._deadline(timeout)
+        ))
+    
+    def generate_sections(
+        self,
+        section_prompts: Dict[str, str],
+        primary_provider: ProviderType = ProviderType.OPENAI,
+        fallback_providers: Optional[List[ProviderType]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        hedge: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, str]:
+        """Generate report sections concurrently and block until all have finished."""
+        return self._run_sync(self.agenerate_sections(
+            section_prompts,
+            primary_provider=primary_provider,
+            fallback_providers=fallback_providers,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            use_cache=use_cache,
+            hedge=hedge,
+            max_concurrency=max_concurrency,
+            timeout=timeout
+        ))
+    
+    def stream_response(
+        self,
+        prompt: str,
+        primary_provider: ProviderType = ProviderType.OPENAI,
+        fallback_providers: Optional[List[ProviderType]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        prompt_prefix: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        """Stream a response chunk by chunk with fallback options.
+        
+        Fallback to the next provider only happens before the first chunk is
+        received, and not once the end-to-end timeout has been used up; an
+        error mid-stream is raised to the caller. A cached response is
+        returned as a single chunk.
+        """
+        deadline = self._deadline(timeout)
+        cache_key = (
+            self._cache_key(prompt, primary_provider, max_tokens, temperature, prompt_prefix)
+            if use_cache else None
+        )
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Response cache hit for {primary_provider.value}")
+                yield cached
+                return
+        
         providers_to_try = [primary_provider]
         if fallback_providers:
             providers_to_try.extend(fallback_providers)
         
         last_error = None
-        for provider in providers_to_try:
-            if provider not in self.providers:
-                logger.warning(f"Provider {provider.value} not initialized, skipping...")
+        for provider in self._available_providers(providers_to_try):
+            if deadline.expired():
+                logger.error(f"Deadline exceeded, not trying {provider.value}")
+                last_error = DeadlineExceededError(f"Deadline of {deadline.seconds}s exceeded")
+                break
+            if not self._allow(provider):
                 continue
-            
+            service = self.providers[provider]
             try:
-                return self.providers[provider].generate_response(
-                    prompt=prompt,
-                    max_tokens=max_tokens,
-                    temperature=temperature
+                budget = self._apply_budget(provider, prompt, max_tokens, prompt_prefix)
+                self.rate_limiter.acquire_blocking(
+                    provider.value,
+                    service.config.model,
+                    budget.prompt_tokens + budget.max_tokens,
+                    timeout=self._limit(deadline)
                 )
+            except (TokenLimitError, DeadlineExceededError) as e:
+                self._record_outcome(provider, 0.0, e)
+                last_error = e
+                logger.error(f"Error with {provider.value}: {str(e)}")
+                continue
+            start_time = time.time()
+            stream = service.stream_response(
+                prompt=budget.prompt,
+                max_tokens=budget.max_tokens,
+                temperature=temperature,
+                prompt_prefix=budget.prefix or None,
+                deadline=deadline,
+                timeout=self._request_timeout(provider, service, budget.max_tokens)
+            )
+            try:
+                first_chunk = next(stream)
+            except StopIteration:
+                self._record_outcome(provider, time.time() - start_time)
+                return
             except Exception as e:
+                self._record_outcome(provider, time.time() - start_time, e)
                 last_error = e
                 logger.error(f"Error with {provider.value}: {str(e)}")
                 continue
+            
+            chunks = [first_chunk]
+            try:
+                yield first_chunk
+                for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            except BaseException as e:
+                self._record_outcome(provider, time.time() - start_time, e)
+                raise
+            self._record_outcome(provider, time.time() - start_time)
+            
+            if cache_key:
+                self.response_cache.set(cache_key, "".join(chunks))
+            return
         
         if last_error:
             raise last_error
         raise ProviderError("No available providers to handle the request")
 
+async def _cancel_pending_tasks() -> None:
+    """Cancel every other task on the running loop and wait for them to finish."""
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
 @lru_cache()
 def get_llm_manager() -> LLMServiceManager:
     """Get or create the LLM service manager instance."""
-    return LLMServiceManager() 
\ No newline at end of file
+    return LLMServiceManager()
+
+def reset_llm_manager() -> None:
+    """Drop the shared manager so the next get_llm_manager() call builds a new one.
+    
+    The old manager's connections, event loop and stores are closed once analyses
+    still using it have had llm.analysis_timeout (or 10 minutes) to finish.
+    """
+    if not get_llm_manager.cache_info().currsize:
+        return
+    old_manager = get_llm_manager()
+    get_llm_manager.cache_clear()
+    closer = threading.Timer(old_manager.analysis_timeout or 600, old_manager.close)
+    closer.daemon = True
+    closer.start()
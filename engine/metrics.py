@@ -0,0 +1,378 @@
+"""
+In-process metrics registry for LLM requests.
+Aggregates request metrics into latency histograms, token/cost counters and error
+counts per provider and model, keeps a ring buffer of recent requests, persists
+every request to an append-only SQLite store and exports Prometheus text format.
+Rows are written to SQLite in batches from a writer thread, so recording a
+request never blocks the event loop on disk I/O.
+"""
+
+import queue
+import sqlite3
+import threading
+from collections import defaultdict, deque
+from dataclasses import asdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+# Latency histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 90, 120, 180, 300)
+
+METRIC_PREFIX = "esg_llm"
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values, or None if it is empty."""
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed buckets."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add an observation."""
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsStore:
+    """Append-only SQLite store of individual request metrics, written in batches by a background thread."""
+
+    COLUMNS = (
+        "timestamp", "provider", "model", "prompt_tokens", "completion_tokens",
+        "total_tokens", "cost", "latency", "success", "error", "cached_tokens"
+    )
+
+    # Most rows written in one transaction
+    BATCH_SIZE = 100
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS request_metrics ("
+            "timestamp TEXT, provider TEXT, model TEXT, prompt_tokens INTEGER, "
+            "completion_tokens INTEGER, total_tokens INTEGER, cost REAL, latency REAL, "
+            "success INTEGER, error TEXT, cached_tokens INTEGER)"
+        )
+        # Stores created before cached tokens were tracked lack the column
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(request_metrics)")}
+        if "cached_tokens" not in existing:
+            self._conn.execute("ALTER TABLE request_metrics ADD COLUMN cached_tokens INTEGER DEFAULT 0")
+        self._conn.commit()
+        self._queue: "queue.Queue[Optional[List[Any]]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="llm-metrics-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Queue one request for the writer thread."""
+        self._queue.put([row.get(column) for column in self.COLUMNS])
+
+    def _write_loop(self) -> None:
+        """Write queued rows, batching whatever has accumulated into one transaction."""
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    with self._lock:
+                        self._conn.executemany(
+                            f"INSERT INTO request_metrics ({', '.join(self.COLUMNS)}) "
+                            f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                            rows
+                        )
+                        self._conn.commit()
+            except Exception as e:
+                logger.warning(f"Failed to persist {len(rows)} request metrics: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def flush(self) -> None:
+        """Block until every queued row has been written."""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the remaining rows, stop the writer thread and close the database."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    def query(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Return stored requests, optionally only those after a timestamp."""
+        self.flush()
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM request_metrics"
+        params: Tuple = ()
+        if since is not None:
+            sql += " WHERE timestamp >= ?"
+            params = (since.isoformat(),)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY timestamp", params).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+
+class MetricsRegistry:
+    """Aggregated LLM request metrics per provider and model."""
+
+    def __init__(
+        self,
+        store_path: Optional[str] = None,
+        recent_size: int = 500,
+        cancelled_errors: Iterable[str] = ()
+    ):
+        self.cancelled_errors = set(cancelled_errors)
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent_size)
+        self._requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._tokens: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._cost: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._errors: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._latency: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._cascade_requests: Dict[str, int] = defaultdict(int)
+        self._cascade_saved_cost = 0.0
+        self._cascade_saved_latency = 0.0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.store: Optional[MetricsStore] = None
+        if store_path:
+            try:
+                self.store = MetricsStore(store_path)
+            except Exception as e:
+                logger.error(f"Could not open metrics store {store_path}: {str(e)}")
+
+    def _status(self, metrics: Any) -> str:
+        if metrics.success:
+            return "success"
+        if metrics.error in self.cancelled_errors:
+            return "cancelled"
+        return "error"
+
+    def record(self, metrics: Any) -> None:
+        """Record a RequestMetrics instance."""
+        row = asdict(metrics)
+        row["timestamp"] = metrics.timestamp.isoformat()
+        status = self._status(metrics)
+        row["status"] = status
+        key = (metrics.provider, metrics.model)
+        with self._lock:
+            self._requests[key + (status,)] += 1
+            self._tokens[key + ("prompt",)] += metrics.prompt_tokens
+            self._tokens[key + ("completion",)] += metrics.completion_tokens
+            self._tokens[key + ("cached",)] += metrics.cached_tokens
+            self._cost[key] += metrics.cost
+            if status == "success":
+                self._latency[key].observe(metrics.latency)
+            elif status == "error":
+                error_type = (metrics.error or "unknown").split(":")[0][:60]
+                self._errors[key + (error_type,)] += 1
+            self.recent.append(row)
+        if self.store is not None:
+            self.store.append(row)
+
+    def close(self) -> None:
+        """Stop the metrics endpoint and write and close the persistent store."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def record_cascade(self, tier: str, saved_cost: float, saved_latency: Optional[float]) -> None:
+        """Record which cascade tier served a request and the estimated savings."""
+        with self._lock:
+            self._cascade_requests[tier] += 1
+            self._cascade_saved_cost += saved_cost
+            self._cascade_saved_latency += saved_latency or 0.0
+
+    def cascade_summary(self) -> Dict[str, Any]:
+        """Return requests per cascade tier and the cumulative estimated savings."""
+        with self._lock:
+            return {
+                "requests": dict(self._cascade_requests),
+                "saved_cost": round(self._cascade_saved_cost, 4),
+                "saved_latency": round(self._cascade_saved_latency, 1)
+            }
+
+    def latency_percentile(
+        self,
+        provider: str,
+        model: str,
+        pct: float,
+        min_samples: int = 1
+    ) -> Optional[float]:
+        """Return a latency percentile of recent successful requests to a model."""
+        with self._lock:
+            latencies = [
+                row["latency"] for row in self.recent
+                if row["provider"] == provider and row["model"] == model and row["status"] == "success"
+            ]
+        if len(latencies) < max(min_samples, 1):
+            return None
+        return percentile(latencies, pct)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Summarize recent requests per provider and model (latency percentiles, cost, errors)."""
+        with self._lock:
+            recent = list(self.recent)
+        grouped: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        for row in recent:
+            grouped[(row["provider"], row["model"])].append(row)
+        summary = []
+        for (provider, model), rows in sorted(grouped.items()):
+            latencies = [r["latency"] for r in rows if r["status"] == "success"]
+            errors = sum(1 for r in rows if r["status"] == "error")
+            prompt_tokens = sum(r["prompt_tokens"] for r in rows)
+            cached_tokens = sum(r.get("cached_tokens", 0) for r in rows)
+            p50 = percentile(latencies, 50)
+            p95 = percentile(latencies, 95)
+            summary.append({
+                "provider": provider,
+                "model": model,
+                "requests": len(rows),
+                "error_rate": round(errors / len(rows), 3),
+                "p50_latency": round(p50, 2) if p50 is not None else None,
+                "p95_latency": round(p95, 2) if p95 is not None else None,
+                "tokens": sum(r["total_tokens"] for r in rows),
+                "cached_tokens": cached_tokens,
+                "cache_read_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+                "cost": round(sum(r["cost"] for r in rows), 4)
+            })
+        return summary
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                f"# HELP {METRIC_PREFIX}_requests_total LLM requests by outcome.",
+                f"# TYPE {METRIC_PREFIX}_requests_total counter"
+            ]
+            for (provider, model, status), value in sorted(self._requests.items()):
+                lines.append(
+                    f"{METRIC_PREFIX}_requests_total"
+                    f"{_labels(provider=provider, model=model, status=status)} {value}"
+                )
+            lines += [
+                f"# HELP {METRIC_PREFIX}_tokens_total Tokens consumed by type.",
+                f"# TYPE {METRIC_PREFIX}_tokens_total counter"
+            ]
+            for (provider, model, token_type), value in sorted(self._tokens.items()):
+                lines.append(
+                    f"{METRIC_PREFIX}_tokens_total"
+                    f"{_labels(provider=provider, model=model, type=token_type)} {value}"
+                )
+            lines += [
+                f"# HELP {METRIC_PREFIX}_cost_usd_total Estimated cost in USD.",
+                f"# TYPE {METRIC_PREFIX}_cost_usd_total counter"
+            ]
+            for (provider, model), value in sorted(self._cost.items()):
+                lines.append(
+                    f"{METRIC_PREFIX}_cost_usd_total{_labels(provider=provider, model=model)} {value:.6f}"
+                )
+            lines += [
+                f"# HELP {METRIC_PREFIX}_errors_total Failed LLM requests by error type.",
+                f"# TYPE {METRIC_PREFIX}_errors_total counter"
+            ]
+            for (provider, model, error_type), value in sorted(self._errors.items()):
+                lines.append(
+                    f"{METRIC_PREFIX}_errors_total"
+                    f"{_labels(provider=provider, model=model, error=error_type)} {value}"
+                )
+            lines += [
+                f"# HELP {METRIC_PREFIX}_cascade_requests_total Cascade requests by serving tier.",
+                f"# TYPE {METRIC_PREFIX}_cascade_requests_total counter"
+            ]
+            for tier, value in sorted(self._cascade_requests.items()):
+                lines.append(f"{METRIC_PREFIX}_cascade_requests_total{_labels(tier=tier)} {value}")
+            lines += [
+                f"# HELP {METRIC_PREFIX}_cascade_saved_cost_usd_total Estimated cost saved by the cascade (negative when escalations cost more).",
+                f"# TYPE {METRIC_PREFIX}_cascade_saved_cost_usd_total gauge",
+                f"{METRIC_PREFIX}_cascade_saved_cost_usd_total {self._cascade_saved_cost:.6f}",
+                f"# HELP {METRIC_PREFIX}_cascade_saved_latency_seconds_total Estimated latency saved by the cascade.",
+                f"# TYPE {METRIC_PREFIX}_cascade_saved_latency_seconds_total gauge",
+                f"{METRIC_PREFIX}_cascade_saved_latency_seconds_total {self._cascade_saved_latency:.3f}"
+            ]
+            lines += [
+                f"# HELP {METRIC_PREFIX}_request_latency_seconds Latency of successful LLM requests.",
+                f"# TYPE {METRIC_PREFIX}_request_latency_seconds histogram"
+            ]
+            for (provider, model), histogram in sorted(self._latency.items()):
+                name = f"{METRIC_PREFIX}_request_latency_seconds"
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(
+                        f"{name}_bucket{_labels(provider=provider, model=model, le=bound)} {count}"
+                    )
+                lines.append(
+                    f"{name}_bucket{_labels(provider=provider, model=model, le='+Inf')} {histogram.count}"
+                )
+                lines.append(f"{name}_sum{_labels(provider=provider, model=model)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_labels(provider=provider, model=model)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> None:
+        """Serve /metrics in Prometheus format from a daemon thread."""
+        if self._server is not None:
+            return
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(
+            target=self._server.serve_forever,
+            name="llm-metrics-server",
+            daemon=True
+        ).start()
+        logger.info(f"Serving LLM metrics on http://{host}:{port}/metrics")
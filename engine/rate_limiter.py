@@ -0,0 +1,180 @@
+"""
+Client-side rate limiting for LLM providers.
+Token buckets for requests per minute (RPM) and tokens per minute (TPM) are kept
+per provider and model and shared by every session using the service manager,
+so concurrent analyses queue in arrival order instead of stampeding into 429s.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+from engine.retry import DeadlineExceededError
+
+
+class TokenBucket:
+    """Token bucket refilled continuously up to its capacity."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        """Return seconds until the bucket holds the requested amount."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        """Take tokens from the bucket (callers check time_until first)."""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Fair RPM/TPM limiter keyed on provider and model.
+
+    Limits come from the llm.rate_limits setting, e.g.::
+
+        openai:
+          rpm: 500
+          tpm: 30000
+          models:
+            gpt-4: {rpm: 200, tpm: 10000}
+
+    Providers without limits are not throttled.
+    """
+
+    def __init__(self, limits: Optional[Dict] = None, poll_interval: float = 0.05):
+        self.limits = limits or {}
+        self.poll_interval = poll_interval
+        self._buckets: Dict[Tuple[str, str], Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._queues: Dict[Tuple[str, str], Deque[object]] = {}
+        self._lock = threading.Lock()
+
+    def _limits_for(self, provider: str, model: str) -> Optional[Dict[str, float]]:
+        provider_limits = self.limits.get(provider)
+        if not provider_limits:
+            return None
+        model_limits = (provider_limits.get("models") or {}).get(model, {})
+        rpm = model_limits.get("rpm", provider_limits.get("rpm"))
+        tpm = model_limits.get("tpm", provider_limits.get("tpm"))
+        if not rpm and not tpm:
+            return None
+        return {"rpm": rpm, "tpm": tpm}
+
+    def _get_buckets(self, key: Tuple[str, str]) -> Optional[Tuple[Optional[TokenBucket], Optional[TokenBucket]]]:
+        if key not in self._buckets:
+            limits = self._limits_for(*key)
+            if limits is None:
+                return None
+            rpm, tpm = limits["rpm"], limits["tpm"]
+            self._buckets[key] = (
+                TokenBucket(rpm, rpm / 60) if rpm else None,
+                TokenBucket(tpm, tpm / 60) if tpm else None
+            )
+            self._queues[key] = deque()
+        return self._buckets[key]
+
+    def _enqueue(self, key: Tuple[str, str]) -> Optional[object]:
+        with self._lock:
+            if self._get_buckets(key) is None:
+                return None
+            ticket = object()
+            self._queues[key].append(ticket)
+            return ticket
+
+    def _dequeue(self, key: Tuple[str, str], ticket: object) -> None:
+        with self._lock:
+            try:
+                self._queues[key].remove(ticket)
+            except ValueError:
+                pass
+
+    def _try_admit(self, key: Tuple[str, str], ticket: object, tokens: int) -> float:
+        """Admit the ticket if it is first in line and capacity allows; else return a wait."""
+        with self._lock:
+            queue = self._queues[key]
+            if queue[0] is not ticket:
+                return self.poll_interval
+            requests_bucket, tokens_bucket = self._buckets[key]
+            wait = max(
+                requests_bucket.time_until(1) if requests_bucket else 0.0,
+                tokens_bucket.time_until(tokens) if tokens_bucket else 0.0
+            )
+            if wait > 0:
+                return min(wait, 1.0)
+            if requests_bucket:
+                requests_bucket.consume(1)
+            if tokens_bucket:
+                tokens_bucket.consume(tokens)
+            queue.popleft()
+            return 0.0
+
+    async def acquire(self, provider: str, model: str, tokens: int, timeout: Optional[float] = None) -> float:
+        """Wait asynchronously for admission; returns the time spent queued.
+
+        Raises DeadlineExceededError if not admitted within timeout seconds.
+        """
+        key = (provider, model)
+        ticket = self._enqueue(key)
+        if ticket is None:
+            return 0.0
+        start = time.monotonic()
+        try:
+            while True:
+                wait = self._try_admit(key, ticket, tokens)
+                if wait == 0:
+                    break
+                self._check_timeout(provider, model, start, timeout)
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._dequeue(key, ticket)
+            raise
+        return self._log_wait(provider, model, time.monotonic() - start)
+
+    def acquire_blocking(self, provider: str, model: str, tokens: int, timeout: Optional[float] = None) -> float:
+        """Block the calling thread until admitted; returns the time spent queued.
+
+        Raises DeadlineExceededError if not admitted within timeout seconds.
+        """
+        key = (provider, model)
+        ticket = self._enqueue(key)
+        if ticket is None:
+            return 0.0
+        start = time.monotonic()
+        try:
+            while True:
+                wait = self._try_admit(key, ticket, tokens)
+                if wait == 0:
+                    break
+                self._check_timeout(provider, model, start, timeout)
+                time.sleep(wait)
+        except BaseException:
+            self._dequeue(key, ticket)
+            raise
+        return self._log_wait(provider, model, time.monotonic() - start)
+
+    @staticmethod
+    def _check_timeout(provider: str, model: str, start: float, timeout: Optional[float]) -> None:
+        if timeout is not None and time.monotonic() - start >= timeout:
+            raise DeadlineExceededError(f"Rate limiter did not admit {provider}/{model} request within {timeout:.1f}s")
+
+    @staticmethod
+    def _log_wait(provider: str, model: str, waited: float) -> float:
+        if waited >= 1:
+            logger.info(f"Rate limiter queued {provider}/{model} request for {waited:.1f}s")
+        return waited
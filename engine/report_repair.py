@@ -0,0 +1,73 @@
+"""
+Targeted repair of generated reports.
+Finds required sections that are missing, empty or have malformed tables and
+regenerates only those sections, splicing them back into the report instead of
+paying for a full regeneration.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from loguru import logger
+
+from prompts.enhanced_prompts import REPORT_SECTIONS, splice_section
+from utils.llm_report_parser import find_defective_sections
+
+
+@dataclass
+class RepairResult:
+    """A report after targeted repair."""
+    report: str
+    repaired: List[str] = field(default_factory=list)
+    remaining: Dict[str, str] = field(default_factory=dict)
+    latency: float = 0.0
+
+
+def find_sections_to_repair(report: str) -> Dict[str, str]:
+    """Map the section keys that need regenerating to the reason."""
+    defects = find_defective_sections(report, [heading for _, heading in REPORT_SECTIONS])
+    return {section: defects[heading] for section, heading in REPORT_SECTIONS if heading in defects}
+
+
+def repair_report(
+    llm_manager: Any,
+    prompt_manager: Any,
+    report: str,
+    company_info: Dict,
+    selected_frameworks: List[str],
+    detail_level: str = "standard",
+    **request_kwargs: Any
+) -> RepairResult:
+    """Regenerate only the defective sections of a report and splice them in.
+
+    request_kwargs are passed to llm_manager.generate_sections (provider,
+    max_tokens, temperature, ...). Sections that still fail are reported in
+    RepairResult.remaining; the original text is kept for them.
+    """
+    defects = find_sections_to_repair(report)
+    if not defects:
+        return RepairResult(report=report)
+
+    logger.info(f"Repairing report sections: {', '.join(f'{s} ({r})' for s, r in defects.items())}")
+    start_time = time.time()
+    try:
+        prompts = prompt_manager.generate_repair_prompts(
+            company_info=company_info,
+            selected_frameworks=selected_frameworks,
+            report=report,
+            sections=list(defects),
+            detail_level=detail_level
+        )
+        sections = llm_manager.generate_sections(prompts, **request_kwargs)
+    except Exception as e:
+        logger.error(f"Report repair failed: {str(e)}")
+        return RepairResult(report=report, remaining=defects, latency=time.time() - start_time)
+
+    for section, text in sections.items():
+        report = splice_section(report, section, text)
+    remaining = find_sections_to_repair(report)
+    repaired = [section for section in sections if section not in remaining]
+    latency = time.time() - start_time
+    logger.info(f"Repaired {len(repaired)} of {len(defects)} sections in {latency:.1f}s")
+    return RepairResult(report=report, repaired=repaired, remaining=remaining, latency=latency)
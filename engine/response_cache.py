@@ -0,0 +1,116 @@
+"""
+Persistent on-disk cache for LLM responses.
+Responses are content-addressed by the normalized request so that re-running the
+same analysis with the same model settings does not pay for a new completion.
+"""
+
+import hashlib
+import json
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+
+from diskcache import Cache
+from loguru import logger
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so that insignificant whitespace does not change its key."""
+    text = unicodedata.normalize("NFC", prompt).replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def make_cache_key(
+    prompt: str,
+    model: str,
+    temperature: Optional[float],
+    max_tokens: Optional[int]
+) -> str:
+    """Build a content-addressed key for an LLM request."""
+    payload = json.dumps(
+        {
+            "prompt": normalize_prompt(prompt),
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk LLM response cache with TTL and size-based eviction."""
+
+    def __init__(
+        self,
+        cache_dir: str = "cache",
+        ttl: Optional[int] = 86400,
+        size_limit_mb: int = 512,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cache: Optional[Cache] = None
+        if enabled:
+            directory = Path(cache_dir) / "llm_responses"
+            self._cache = Cache(
+                str(directory),
+                size_limit=size_limit_mb * 1024 * 1024,
+                eviction_policy="least-recently-used"
+            )
+            logger.info(f"LLM response cache enabled at {directory}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss."""
+        if self._cache is None:
+            return None
+        try:
+            value = self._cache.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response under a key."""
+        if self._cache is None or not value:
+            return
+        try:
+            self._cache.set(key, value, expire=self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def close(self) -> None:
+        """Close the on-disk cache; later lookups miss and writes are dropped."""
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current on-disk size."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": len(self._cache) if self._cache is not None else 0,
+            "size_bytes": self._cache.volume() if self._cache is not None else 0
+        }
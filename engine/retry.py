@@ -0,0 +1,171 @@
+"""
+Deadline-aware retries for LLM requests.
+One retry engine for every provider: jittered exponential backoff from the
+provider configuration, Retry-After headers honored, and no retry attempted when
+it could not finish before the analysis deadline.
+"""
+
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the time budget for a request or analysis has run out."""
+    pass
+
+
+class Deadline:
+    """Point in time by which an operation has to finish (None means no deadline)."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> float:
+        """Return the seconds left, or infinity without a deadline."""
+        if self.expires_at is None:
+            return math.inf
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Return whether the deadline has passed."""
+        return self.remaining() <= 0
+
+    def timeout(self, default: float) -> float:
+        """Clamp a per-attempt timeout to the time left."""
+        return min(default, self.remaining())
+
+    def check(self, what: str = "request") -> None:
+        """Raise DeadlineExceededError if the deadline has passed."""
+        if self.expired():
+            raise DeadlineExceededError(f"Deadline of {self.seconds}s exceeded before {what}")
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Read the Retry-After delay from an error (or the error it wraps), if any."""
+    while error is not None:
+        headers = getattr(error, "headers", None)
+        if not headers:
+            headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers:
+            headers = {str(k).lower(): v for k, v in dict(headers).items()}
+            if headers.get("retry-after-ms"):
+                try:
+                    return float(headers["retry-after-ms"]) / 1000
+                except ValueError:
+                    pass
+            value = headers.get("retry-after")
+            if value:
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    try:
+                        retry_at = parsedate_to_datetime(value)
+                        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+                    except (TypeError, ValueError):
+                        pass
+        error = error.__cause__
+    return None
+
+
+class RetryPolicy:
+    """Which errors to retry, how often and how long to wait between attempts."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        attempt_timeout: float = 60.0,
+        max_delay: float = 60.0,
+        min_attempt_time: float = 5.0,
+        retryable: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.attempt_timeout = attempt_timeout
+        self.max_delay = max_delay
+        self.min_attempt_time = min_attempt_time
+        self.retryable = retryable
+
+    def backoff(self, retry: int) -> float:
+        """Exponential backoff with equal jitter for the given retry number (0-based)."""
+        cap = min(self.max_delay, self.base_delay * (2 ** retry))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def next_delay(self, retry: int, error: BaseException, deadline: Deadline) -> Optional[float]:
+        """Return how long to wait before retrying, or None if no retry should be made."""
+        if retry >= self.max_retries or not isinstance(error, self.retryable):
+            return None
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = self.backoff(retry)
+        if delay + self.min_attempt_time > deadline.remaining():
+            logger.warning(
+                f"Not retrying: waiting {delay:.1f}s would leave less than {self.min_attempt_time}s "
+                f"before the deadline"
+            )
+            return None
+        return delay
+
+
+async def aretry(
+    attempt: Callable[[float], Awaitable[T]],
+    policy: RetryPolicy,
+    deadline: Optional[Deadline] = None,
+    label: str = "request",
+    attempt_timeout: Optional[float] = None
+) -> T:
+    """Await attempt(timeout) until it succeeds, retrying per the policy within the deadline.
+
+    attempt_timeout overrides the policy's per-attempt timeout for this call.
+    """
+    deadline = deadline or Deadline()
+    attempt_timeout = attempt_timeout or policy.attempt_timeout
+    retry = 0
+    while True:
+        deadline.check(label)
+        try:
+            return await attempt(deadline.timeout(attempt_timeout))
+        except Exception as e:
+            delay = policy.next_delay(retry, e, deadline)
+            if delay is None:
+                raise
+            retry += 1
+            logger.warning(f"{label} failed ({str(e)}), retry {retry}/{policy.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def retry_call(
+    attempt: Callable[[float], T],
+    policy: RetryPolicy,
+    deadline: Optional[Deadline] = None,
+    label: str = "request",
+    attempt_timeout: Optional[float] = None
+) -> T:
+    """Call attempt(timeout) until it succeeds, retrying per the policy within the deadline.
+
+    attempt_timeout overrides the policy's per-attempt timeout for this call.
+    """
+    deadline = deadline or Deadline()
+    attempt_timeout = attempt_timeout or policy.attempt_timeout
+    retry = 0
+    while True:
+        deadline.check(label)
+        try:
+            return attempt(deadline.timeout(attempt_timeout))
+        except Exception as e:
+            delay = policy.next_delay(retry, e, deadline)
+            if delay is None:
+                raise
+            retry += 1
+            logger.warning(f"{label} failed ({str(e)}), retry {retry}/{policy.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
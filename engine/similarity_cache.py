@@ -0,0 +1,189 @@
+"""
+Near-duplicate lookup of previous company analyses.
+Company information is vectorized with TF-IDF and compared against a persisted
+sparse matrix of past requests, so a re-screen with a lightly edited description
+can be offered the prior report instead of paying for a new one. Company names
+are not part of the match, so a hit for another company is only ever offered,
+never used in place of a new report.
+"""
+
+import json
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import linear_kernel
+
+COMPANY_FIELDS = ("sector", "subsector", "country", "description")
+
+
+def company_text(company_info: Dict[str, Any]) -> str:
+    """Join the company fields that determine an analysis into one document."""
+    return "\n".join(str(company_info.get(field) or "") for field in COMPANY_FIELDS).strip()
+
+
+def analysis_signature(frameworks: List[str], detail_level: str) -> str:
+    """Identify the report variant; only reports of the same variant are comparable."""
+    return f"{','.join(sorted(frameworks))}|{detail_level}"
+
+
+@dataclass
+class SimilarAnalysis:
+    """A previous analysis similar to the current request."""
+    company_name: str
+    created_at: datetime
+    score: float
+    report: str
+
+    def is_same_company(self, company_name: str) -> bool:
+        """Whether the previous analysis was made for the named company."""
+        return " ".join(self.company_name.split()).casefold() == " ".join(company_name.split()).casefold()
+
+
+class SimilarityCache:
+    """TF-IDF similarity index of previous analyses, persisted under the cache directory."""
+
+    def __init__(
+        self,
+        cache_dir: str = "cache",
+        threshold: float = 0.7,
+        max_entries: int = 500,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.directory = Path(cache_dir) / "similar_analyses"
+        self.entries: List[Dict[str, Any]] = []
+        self._vectorizer: Optional[TfidfVectorizer] = None
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._lock = threading.Lock()
+        if enabled:
+            self._load()
+
+    def _load(self) -> None:
+        """Load the persisted entries, vectorizer and matrix if present."""
+        try:
+            entries_path = self.directory / "entries.json"
+            if not entries_path.exists():
+                return
+            with open(entries_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            with open(self.directory / "vectorizer.pkl", "rb") as f:
+                vectorizer = pickle.load(f)
+            matrix = sparse.load_npz(self.directory / "matrix.npz")
+            if matrix.shape[0] != len(entries):
+                raise ValueError("matrix and entries are out of sync")
+            self.entries, self._vectorizer, self._matrix = entries, vectorizer, matrix
+            logger.info(f"Loaded {len(entries)} previous analyses for similarity lookup")
+        except Exception as e:
+            logger.warning(f"Could not load similarity index, starting empty: {str(e)}")
+
+    def _save(self) -> None:
+        """Persist the index, replacing each file atomically."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        def write(name: str, writer) -> None:
+            tmp_path = self.directory / f"{name}.tmp"
+            writer(tmp_path)
+            os.replace(tmp_path, self.directory / name)
+
+        def write_entries(path: Path) -> None:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+
+        def write_vectorizer(path: Path) -> None:
+            with open(path, "wb") as f:
+                pickle.dump(self._vectorizer, f)
+
+        def write_matrix(path: Path) -> None:
+            with open(path, "wb") as f:
+                sparse.save_npz(f, self._matrix)
+
+        write("vectorizer.pkl", write_vectorizer)
+        write("matrix.npz", write_matrix)
+        write("entries.json", write_entries)
+
+    def _fit(self) -> None:
+        """Refit the vectorizer and matrix on the current entries."""
+        vectorizer = TfidfVectorizer(stop_words="english", ngram_range=(1, 2), sublinear_tf=True)
+        matrix = vectorizer.fit_transform([entry["text"] for entry in self.entries])
+        self._vectorizer, self._matrix = vectorizer, sparse.csr_matrix(matrix)
+
+    def lookup(
+        self,
+        company_info: Dict[str, Any],
+        frameworks: List[str],
+        detail_level: str
+    ) -> Optional[SimilarAnalysis]:
+        """Return the most similar previous analysis at or above the threshold."""
+        text = company_text(company_info)
+        if not self.enabled or not text:
+            return None
+        signature = analysis_signature(frameworks, detail_level)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[0] != len(self.entries):
+                return None
+            scores = linear_kernel(self._vectorizer.transform([text]), self._matrix).ravel()
+            candidates = [i for i, entry in enumerate(self.entries) if entry["signature"] == signature]
+            if not candidates:
+                return None
+            best = max(candidates, key=lambda i: scores[i])
+            score = float(scores[best])
+            entry = self.entries[best]
+        if score < self.threshold:
+            return None
+        logger.info(f"Found similar analysis of {entry['company_name']} (similarity {score:.2f})")
+        return SimilarAnalysis(
+            company_name=entry["company_name"],
+            created_at=datetime.fromisoformat(entry["created_at"]),
+            score=score,
+            report=entry["report"]
+        )
+
+    def add(
+        self,
+        company_info: Dict[str, Any],
+        frameworks: List[str],
+        detail_level: str,
+        report: str
+    ) -> None:
+        """Index a generated report, replacing any entry for identical inputs."""
+        text = company_text(company_info)
+        if not self.enabled or not text or not report:
+            return
+        entry = {
+            "company_name": company_info.get("name") or "",
+            "text": text,
+            "signature": analysis_signature(frameworks, detail_level),
+            "created_at": datetime.now().isoformat(),
+            "report": report
+        }
+        with self._lock:
+            self.entries = [
+                e for e in self.entries
+                if not (e["text"] == entry["text"] and e["signature"] == entry["signature"])
+            ]
+            self.entries.append(entry)
+            self.entries = self.entries[-self.max_entries:]
+            try:
+                self._fit()
+                self._save()
+            except Exception as e:
+                logger.error(f"Failed to update similarity index: {str(e)}")
+
+    def clear(self) -> None:
+        """Remove all indexed analyses."""
+        with self._lock:
+            self.entries = []
+            self._vectorizer = None
+            self._matrix = None
+            for name in ("entries.json", "vectorizer.pkl", "matrix.npz"):
+                (self.directory / name).unlink(missing_ok=True)
@@ -0,0 +1,61 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+Concurrent callers with the same request key share one underlying call and all
+receive its result or error, so duplicate analyses are only paid for once.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from loguru import logger
+
+
+class _Flight:
+    """An in-flight call and the number of callers waiting on it."""
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key on one event loop.
+
+    Not thread-safe: every call must be made from the loop that owns it (the
+    LLM service manager runs all requests on its own loop).
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls currently running."""
+        return len(self._flights)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call(), or the identical call already in flight under key.
+
+        The shared call is cancelled only once every waiting caller has been
+        cancelled.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced identical in-flight request ({flight.waiters} already waiting)")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
@@ -0,0 +1,153 @@
+"""
+Pre-flight token budgeting for LLM requests.
+Counts prompt tokens with a tokenizer loaded once per model, clamps max_tokens to
+what is left of the model's context window and trims or rejects prompts that do
+not fit before any network round-trip is made.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import litellm
+from loguru import logger
+
+try:
+    from litellm.utils import _select_tokenizer
+except ImportError:  # pragma: no cover - older/newer litellm without the helper
+    _select_tokenizer = None
+
+# (context window, maximum output tokens) per litellm model name
+CONTEXT_WINDOWS: Dict[str, Tuple[int, int]] = {
+    "gpt-4-turbo-preview": (128000, 4096),
+    "gpt-4": (8192, 8192),
+    "gpt-3.5-turbo": (16385, 4096),
+    "anthropic/claude-3-opus-20240229": (200000, 4096),
+    "anthropic/claude-3-sonnet-20240229": (200000, 4096),
+    "anthropic/claude-3-haiku-20240307": (200000, 4096),
+    "fireworks_ai/accounts/fireworks/models/deepseek-r1-basic": (128000, 8192),
+}
+
+DEFAULT_CONTEXT_WINDOW = (8192, 4096)
+
+TRUNCATION_NOTICE = "\n\n[Context truncated to fit the model's context window]"
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a prompt cannot fit in the model's context window."""
+    pass
+
+
+@dataclass
+class PromptBudget:
+    """Result of the pre-flight budget check for one request."""
+    prompt: str
+    prompt_tokens: int
+    max_tokens: int
+    context_window: int
+    trimmed: bool = False
+    prefix: str = ""
+
+
+@lru_cache(maxsize=32)
+def get_tokenizer(model: str) -> Optional[dict]:
+    """Load the tokenizer litellm uses for a model, once per model."""
+    if _select_tokenizer is None:
+        return None
+    try:
+        return _select_tokenizer(model=model)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model}: {str(e)}")
+        return None
+
+
+def encode(model: str, text: str) -> List[int]:
+    """Encode text with the model's cached tokenizer."""
+    return litellm.encode(model=model, text=text, custom_tokenizer=get_tokenizer(model))
+
+
+def count_tokens(model: str, text: str) -> int:
+    """Count the tokens in a text for a model."""
+    if get_tokenizer(model) is None:
+        return litellm.token_counter(model=model, text=text)
+    return len(encode(model, text))
+
+
+def get_context_window(model: str) -> Tuple[int, int]:
+    """Return (context window, max output tokens) for a model."""
+    if model in CONTEXT_WINDOWS:
+        return CONTEXT_WINDOWS[model]
+    try:
+        info = litellm.get_model_info(model)
+        context = info.get("max_input_tokens") or info.get("max_tokens")
+        output = info.get("max_output_tokens") or info.get("max_tokens")
+        if context and output:
+            return int(context), int(output)
+    except Exception:
+        pass
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def truncate_to_tokens(model: str, text: str, max_tokens: int) -> str:
+    """Keep the first max_tokens tokens of a text."""
+    tokens = encode(model, text)
+    if len(tokens) <= max_tokens:
+        return text
+    return litellm.decode(model=model, tokens=tokens[:max_tokens], custom_tokenizer=get_tokenizer(model))
+
+
+def apply_budget(
+    model: str,
+    prompt: str,
+    max_tokens: Optional[int],
+    overflow: str = "trim",
+    reserve_tokens: int = 256,
+    min_completion_tokens: int = 512,
+    prefix: str = ""
+) -> PromptBudget:
+    """Fit a request into the model's context window.
+
+    max_tokens is clamped to the model's output limit and to the space left after
+    the prompt. If fewer than min_completion_tokens would remain, the prompt is
+    trimmed from the end (overflow="trim") or PromptTooLargeError is raised
+    (overflow="reject"). When a static prefix is sent ahead of the prompt, the
+    end of the prefix is trimmed instead so the request-specific part is kept.
+    """
+    context_window, max_output = get_context_window(model)
+    prompt_tokens = count_tokens(model, prefix + prompt)
+    trimmed = False
+
+    prompt_limit = context_window - reserve_tokens - min_completion_tokens
+    if prompt_tokens > prompt_limit:
+        if overflow != "trim" or prompt_limit <= 0:
+            raise PromptTooLargeError(
+                f"Prompt has {prompt_tokens} tokens but {model} accepts at most {prompt_limit} "
+                f"while leaving {min_completion_tokens} tokens for the response"
+            )
+        notice_tokens = count_tokens(model, TRUNCATION_NOTICE)
+        if prefix:
+            prefix_limit = prompt_limit - notice_tokens - count_tokens(model, prompt)
+            if prefix_limit <= 0:
+                raise PromptTooLargeError(
+                    f"Prompt without its prefix does not fit in {prompt_limit} tokens for {model}"
+                )
+            prefix = truncate_to_tokens(model, prefix, prefix_limit) + TRUNCATION_NOTICE
+        else:
+            prompt = truncate_to_tokens(model, prompt, prompt_limit - notice_tokens) + TRUNCATION_NOTICE
+        logger.warning(f"Trimmed prompt from {prompt_tokens} to ~{prompt_limit} tokens for {model}")
+        prompt_tokens = count_tokens(model, prefix + prompt)
+        trimmed = True
+
+    remaining = context_window - prompt_tokens - reserve_tokens
+    budget = min(max_tokens or max_output, max_output, remaining)
+    if max_tokens and budget < max_tokens:
+        logger.info(f"Clamped max_tokens from {max_tokens} to {budget} for {model}")
+
+    return PromptBudget(
+        prompt=prompt,
+        prompt_tokens=prompt_tokens,
+        max_tokens=budget,
+        context_window=context_window,
+        trimmed=trimmed,
+        prefix=prefix
+    )
@@ -0,0 +1,286 @@
+"""
+Lightweight tracing of the analysis pipeline.
+Each analysis is a trace of nested spans (start/stop times plus attributes such as
+model, tokens and bytes). The current span travels in a context variable, including
+onto the LLM manager's event loop, and finished traces go to pluggable exporters
+(in-memory for the sidebar waterfall, JSONL for offline analysis).
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Deque, Dict, Iterator, List, Optional, Protocol
+
+import yaml
+from loguru import logger
+
+CONFIG_PATH = "config/config.yaml"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=_new_id)
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    _trace: Optional["_Trace"] = field(default=None, repr=False)
+    _token: Optional[Token] = field(default=None, repr=False)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        """Set attributes, replacing existing values."""
+        self.attributes.update(attributes)
+
+    def add(self, **counters: float) -> None:
+        """Add to numeric attributes (e.g. tokens over several requests)."""
+        if self._trace is None:
+            return
+        with self._trace.lock:
+            for name, value in counters.items():
+                self.attributes[name] = self.attributes.get(name, 0) + value
+
+    def fail(self, error: BaseException) -> None:
+        """Mark the span as failed."""
+        self.error = f"{type(error).__name__}: {str(error)}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration": round(self.duration, 6),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class _Trace:
+    """Spans collected for one root span."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self.lock:
+            self.spans.append(span)
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost open span of the current context, if tracing."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span.
+
+    Outside a trace the yielded span is detached and nothing is recorded, so
+    library code can be instrumented unconditionally.
+    """
+    parent = _current_span.get()
+    trace = parent._trace if parent is not None else None
+    child = Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else "",
+        parent_id=parent.span_id if parent is not None else None,
+        attributes=dict(attributes),
+        _trace=trace
+    )
+    if trace is not None:
+        trace.add(child)
+    token = _current_span.set(child) if trace is not None else None
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        child.end = time.time()
+        if token is not None:
+            _current_span.reset(token)
+
+
+def bind(coro: Awaitable[Any]) -> Awaitable[Any]:
+    """Run a coroutine under the caller's current span, e.g. on another thread's loop."""
+    parent = _current_span.get()
+    if parent is None:
+        return coro
+
+    async def run() -> Any:
+        token = _current_span.set(parent)
+        try:
+            return await coro
+        finally:
+            _current_span.reset(token)
+
+    return run()
+
+
+class Exporter(Protocol):
+    def export(self, trace: Dict[str, Any]) -> None:
+        ...
+
+
+class InMemoryExporter:
+    """Keeps the last traces for display."""
+
+    def __init__(self, max_traces: int = 20):
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def traces(self) -> List[Dict[str, Any]]:
+        """Return the kept traces, newest first."""
+        with self._lock:
+            return list(reversed(self._traces))
+
+
+class JsonlExporter:
+    """Appends one JSON line per finished trace."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        line = json.dumps(trace, default=str, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    """Starts traces and hands finished ones to the exporters."""
+
+    def __init__(self, exporters: Optional[List[Exporter]] = None, enabled: bool = True):
+        self.exporters: List[Exporter] = list(exporters or [])
+        self.enabled = enabled
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "Tracer":
+        """Create a tracer from the tracing settings."""
+        exporters: List[Exporter] = [InMemoryExporter(settings.get("keep_last", 20))]
+        if settings.get("jsonl_path"):
+            try:
+                exporters.append(JsonlExporter(settings["jsonl_path"]))
+            except OSError as e:
+                logger.error(f"Could not open trace file {settings['jsonl_path']}: {str(e)}")
+        return cls(exporters, enabled=settings.get("enabled", True))
+
+    @property
+    def memory(self) -> Optional[InMemoryExporter]:
+        """Return the in-memory exporter, if any."""
+        return next((e for e in self.exporters if isinstance(e, InMemoryExporter)), None)
+
+    def start_trace(self, name: str, **attributes: Any) -> Span:
+        """Start a trace and make its root span current; end it with finish()."""
+        root = Span(name=name, trace_id=uuid.uuid4().hex, attributes=dict(attributes))
+        if self.enabled:
+            root._trace = _Trace(root.trace_id)
+            root._trace.add(root)
+            root._token = _current_span.set(root)
+        return root
+
+    def finish(self, root: Span) -> None:
+        """End a trace started with start_trace() and export it."""
+        if root.end is not None:
+            return
+        root.end = time.time()
+        if root._token is not None:
+            _current_span.reset(root._token)
+            root._token = None
+        if root._trace is None:
+            return
+        with root._trace.lock:
+            spans = sorted((s.to_dict() for s in root._trace.spans), key=lambda s: s["start"])
+        trace = {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "start": root.start,
+            "duration": round(root.duration, 6),
+            "attributes": root.attributes,
+            "error": root.error,
+            "spans": spans
+        }
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                logger.warning(f"Trace exporter {type(exporter).__name__} failed: {str(e)}")
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Context manager form of start_trace()/finish()."""
+        root = self.start_trace(name, **attributes)
+        try:
+            yield root
+        except BaseException as e:
+            root.fail(e)
+            raise
+        finally:
+            self.finish(root)
+
+
+def waterfall(trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten a trace into depth-first rows with offsets from the trace start."""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in trace["spans"]:
+        children.setdefault(s["parent_id"], []).append(s)
+
+    rows: List[Dict[str, Any]] = []
+
+    def visit(parent_id: Optional[str], depth: int) -> None:
+        for s in children.get(parent_id, []):
+            rows.append({
+                "name": s["name"],
+                "depth": depth,
+                "offset": round(s["start"] - trace["start"], 6),
+                "duration": s["duration"],
+                "attributes": s["attributes"],
+                "error": s["error"]
+            })
+            visit(s["span_id"], depth + 1)
+
+    visit(None, 0)
+    return rows
+
+
+@lru_cache()
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer configured from the tracing settings."""
+    try:
+        with open(CONFIG_PATH, "r") as f:
+            settings = (yaml.safe_load(f) or {}).get("tracing", {})
+    except Exception as e:
+        logger.warning(f"Could not load {CONFIG_PATH}, tracing in memory only: {str(e)}")
+        settings = {}
+    return Tracer.from_settings(settings)
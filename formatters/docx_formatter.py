@@ -111,11 +111,6 @@ class DocxFormatter:
         
         # Climate Impact
         self._add_heading("Climate Impact Assessment", level=2)
-        climate_table = self._add_table(
-            5, 2,
-            ['Aspect', 'Assessment']
-        )
-        
         climate_aspects = [
             ('Climate Solutions', 'climate_solutions'),
             ('Vulnerability', 'vulnerability'),
@@ -123,6 +118,10 @@ class DocxFormatter:
             ('Carbon Footprint', 'carbon_footprint'),
             ('Decoupling Potential', 'decoupling')
         ]
+        climate_table = self._add_table(
+            len(climate_aspects) + 1, 2,
+            ['Aspect', 'Assessment']
+        )
         
         for i, (label, key) in enumerate(climate_aspects):
             row = climate_table.rows[i + 1]
@@ -139,11 +138,6 @@ class DocxFormatter:
         
         # Impact Thesis Alignment
         self._add_heading("Impact Thesis Alignment", level=1)
-        impact_table = self._add_table(
-            6, 2,
-            ['Impact Area', 'Alignment Assessment']
-        )
-        
         impact_areas = [
             ('Local Entrepreneurship', 'local_entrepreneurship'),
             ('Decent Jobs', 'decent_jobs'),
@@ -152,6 +146,10 @@ class DocxFormatter:
             ('Resilience', 'resilience'),
             ('Overall Impact', 'overall_impact')
         ]
+        impact_table = self._add_table(
+            len(impact_areas) + 1, 2,
+            ['Impact Area', 'Alignment Assessment']
+        )
         
         for i, (label, key) in enumerate(impact_areas):
             row = impact_table.rows[i + 1]
@@ -7,6 +7,9 @@ for generating structured ESG & Impact pre-investment analysis reports.
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+from standards.retrieval import ScoredCriterion, format_selection
+from utils.llm_report_parser import REPORT_SECTIONS, find_section_spans
+
 # Icons and visual elements
 ICONS = {
     "high_risk": "🔴",
@@ -29,8 +32,8 @@ RISK_COLORS = {
     "Cat C": "green",
 }
 
-# Master prompt template
-MASTER_PROMPT_TEMPLATE = """
+# Master prompt instructions: static across analyses so providers can cache this prefix
+MASTER_PROMPT_INSTRUCTIONS = """
 You are an expert ESG & Impact analyst for an African impact investment fund (IPAE3).
 Your task is to generate a structured ESG & Impact pre-investment analysis report.
 
@@ -148,13 +151,6 @@ For Impact Analysis:
 - Assess alignment with IPAE3's impact goals
 - Document evidence for each assessment
 
-# COMPANY INFORMATION
-Company Name: {company_name}
-Sector: {sector}
-Subsector: {subsector}
-Country: {country}
-Company Description: {company_description}
-
 # REFERENCE FRAMEWORKS
 - IFC Performance Standards
 - IFC EHS Guidelines
@@ -163,6 +159,19 @@ Company Description: {company_description}
 - IPAE3 Impact Framework
 """
 
+# Company-specific part of the master prompt, sent after the static prefix
+COMPANY_INFORMATION_TEMPLATE = """
+# COMPANY INFORMATION
+Company Name: {company_name}
+Sector: {sector}
+Subsector: {subsector}
+Country: {country}
+Company Description: {company_description}
+"""
+
+# Master prompt template
+MASTER_PROMPT_TEMPLATE = MASTER_PROMPT_INSTRUCTIONS + COMPANY_INFORMATION_TEMPLATE
+
 # Section-specific sub-prompts
 SUMMARY_DASHBOARD_PROMPT = """
 Generate a concise, visual summary dashboard for {company_name} that includes:
@@ -255,6 +264,55 @@ Generate a due diligence action checklist for {company_name}:
 4. Include timeline recommendations
 """
 
+REPORT_TITLE = "# ACTIONABLE INSIGHTS REPORT"
+
+# Wrapper for section-by-section generation: each section is requested on its own
+SECTION_PROMPT_TEMPLATE = """
+You are an expert ESG & Impact analyst for an African impact investment fund (IPAE3).
+You are writing ONE section of a structured ESG & Impact pre-investment analysis report.
+The other sections are written separately, so do not repeat them.
+
+# COMPANY INFORMATION
+Company Name: {company_name}
+Sector: {sector}
+Subsector: {subsector}
+Country: {country}
+Company Description: {company_description}
+
+# SECTION TO WRITE: {heading}
+{section_prompt}
+Start your answer with the heading "## {heading}" and write only this section.
+Use Markdown tables, icons and color-coding where they make the section clearer.
+"""
+
+# Appended to a section prompt when repairing that section of an existing report
+REPAIR_CONTEXT_TEMPLATE = """
+
+# SURROUNDING REPORT CONTEXT
+The rest of the report has already been written. Keep this section consistent with it
+(risk category, standards, priorities) and do not repeat it.
+
+## Preceding section
+{before}
+
+## Following section
+{after}
+"""
+
+# Characters of each neighbouring section included as repair context
+REPAIR_CONTEXT_CHARS = 2000
+
+@dataclass
+class PromptParts:
+    """A prompt split into a static, cacheable prefix and a company-specific suffix."""
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        """The full prompt, prefix first."""
+        return self.prefix + self.suffix
+
 @dataclass
 class PromptContext:
     """Context data for prompt generation."""
@@ -266,6 +324,16 @@ class PromptContext:
     operations: Optional[str] = None
     additional_context: Optional[Dict] = None
 
+def generate_company_information(context: PromptContext) -> str:
+    """Generate the company-specific part of the master prompt."""
+    return COMPANY_INFORMATION_TEMPLATE.format(
+        company_name=context.company_name,
+        sector=context.sector,
+        subsector=context.subsector,
+        country=context.country,
+        company_description=context.company_description
+    )
+
 def generate_master_prompt(context: PromptContext) -> str:
     """Generate the master prompt with the provided context."""
     return MASTER_PROMPT_TEMPLATE.format(
@@ -298,12 +366,74 @@ def generate_section_prompt(section: str, context: PromptContext) -> str:
         operations=context.operations or "Not specified"
     )
 
+def _with_heading(heading: str, text: str) -> str:
+    """Make sure a generated section starts with its report heading."""
+    text = text.strip()
+    if not text.lstrip("#").strip().upper().startswith(heading.upper()):
+        text = f"## {heading}\n\n{text}"
+    return text
+
+def assemble_report(sections: Dict[str, str]) -> str:
+    """Assemble separately generated sections into one report in report order."""
+    parts = [REPORT_TITLE]
+    for section, heading in REPORT_SECTIONS:
+        text = (sections.get(section) or "").strip()
+        if not text:
+            continue
+        parts.append(_with_heading(heading, text))
+    return "\n\n".join(parts)
+
+def splice_section(report: str, section: str, text: str) -> str:
+    """Replace a section of a report, or insert it in report order if it is missing."""
+    headings = dict(REPORT_SECTIONS)
+    if section not in headings:
+        raise ValueError(f"Unknown section: {section}")
+    heading = headings[section]
+    block = _with_heading(heading, text) + "\n\n"
+    spans = find_section_spans(report, [h for _, h in REPORT_SECTIONS])
+    if heading in spans:
+        start, end = spans[heading]
+        return report[:start] + block + report[end:].lstrip("\n")
+    order = [h for _, h in REPORT_SECTIONS]
+    following = [spans[h][0] for h in order[order.index(heading) + 1:] if h in spans]
+    if following:
+        return report[:following[0]] + block + report[following[0]:]
+    return report.rstrip() + "\n\n" + block.rstrip() + "\n"
+
 class EnhancedPromptManager:
     """Manager class for handling enhanced prompts and their generation."""
     
-    def __init__(self, standards_loader):
-        """Initialize the prompt manager with a standards loader."""
+    def __init__(self, standards_loader, retrieval: Optional[Dict] = None):
+        """
+        Initialize the prompt manager with a standards loader.
+        
+        Args:
+            standards_loader: Source of the framework criteria
+            retrieval: standards.retrieval settings; when enabled, prompts carry only the
+                top criteria for the company instead of the full IFC standards
+        """
         self.standards_loader = standards_loader
+        self.retrieval = retrieval or {}
+    
+    def _relevant_criteria(self, context: PromptContext, selected_frameworks: List[str]) -> str:
+        """Render the criteria of the selected frameworks most relevant to the company."""
+        selection = self.standards_loader.retrieve_criteria(
+            " ".join(filter(None, [context.sector, context.subsector, context.company_description])),
+            selected_frameworks,
+            top_k=self.retrieval.get("top_k_per_pillar", 5),
+            token_budget=self.retrieval.get("token_budget")
+        )
+        if not selection:
+            return ""
+        source_chars = self.retrieval.get("source_chars", 0)
+        
+        def excerpt(result: ScoredCriterion) -> Optional[str]:
+            # The standard paragraphs the criterion's section points to
+            return self.standards_loader.get_criterion_text(result.framework, result.criterion, source_chars)
+        
+        return "\n\nMost Relevant Standards Criteria:\n" + format_selection(
+            selection, excerpt if source_chars else None
+        )
 
     def generate_analysis_prompt(self, company_info: Dict, selected_frameworks: List[str], detail_level: str = "standard") -> str:
         """
@@ -317,6 +447,23 @@ class EnhancedPromptManager:
         Returns:
             str: Formatted prompt for the LLM
         """
+        return self.generate_prompt_parts(company_info, selected_frameworks, detail_level).text
+
+    def generate_prompt_parts(self, company_info: Dict, selected_frameworks: List[str], detail_level: str = "standard") -> PromptParts:
+        """
+        Generate the analysis prompt as a static prefix and a company-specific suffix.
+        
+        The prefix (instructions and standards context) is identical for every
+        analysis with the same frameworks, so it can be cached by the provider.
+        
+        Args:
+            company_info: Dictionary containing company details
+            selected_frameworks: List of selected ESG frameworks
+            detail_level: Level of detail for the analysis ("standard" or "detailed")
+            
+        Returns:
+            PromptParts: Cacheable prefix and variable suffix
+        """
         context = PromptContext(
             company_name=company_info["name"],
             sector=company_info["sector"],
@@ -330,11 +477,106 @@ class EnhancedPromptManager:
             }
         )
         
-        # Generate the master prompt
-        prompt = generate_master_prompt(context)
+        # Static instructions first, then framework-specific context
+        prefix = MASTER_PROMPT_INSTRUCTIONS
+        suffix = generate_company_information(context)
+        if self.retrieval.get("enabled"):
+            # Company-specific, so it goes after the cacheable prefix
+            suffix += self._relevant_criteria(context, selected_frameworks)
+        elif "ifc" in selected_frameworks:
+            prefix += "\n\nIFC Standards Context:\n" + self.standards_loader.get_ifc_standards()
+        
+        return PromptParts(prefix=prefix, suffix=suffix)
+
+    def generate_section_prompts(
+        self,
+        company_info: Dict,
+        selected_frameworks: List[str],
+        detail_level: str = "standard"
+    ) -> Dict[str, str]:
+        """
+        Generate one self-contained prompt per report section, in report order.
         
-        # Add framework-specific context if needed
-        if "ifc" in selected_frameworks:
-            prompt += "\n\nIFC Standards Context:\n" + self.standards_loader.get_ifc_standards()
+        Args:
+            company_info: Dictionary containing company details
+            selected_frameworks: List of selected ESG frameworks
+            detail_level: Level of detail for the analysis ("standard" or "detailed")
+            
+        Returns:
+            Dict[str, str]: Section key to prompt, ordered as in the report
+        """
+        context = PromptContext(
+            company_name=company_info["name"],
+            sector=company_info["sector"],
+            subsector=company_info.get("subsector", ""),
+            country=company_info["country"],
+            company_description=company_info["description"],
+            operations=company_info.get("size", ""),
+            additional_context={
+                "frameworks": selected_frameworks,
+                "detail_level": detail_level
+            }
+        )
+        
+        prompts = {}
+        for section, heading in REPORT_SECTIONS:
+            prompt = SECTION_PROMPT_TEMPLATE.format(
+                company_name=context.company_name,
+                sector=context.sector,
+                subsector=context.subsector,
+                country=context.country,
+                company_description=context.company_description,
+                heading=heading,
+                section_prompt=generate_section_prompt(section, context)
+            )
+            if section == "ifc_analysis" and self.retrieval.get("enabled"):
+                prompt += self._relevant_criteria(context, selected_frameworks)
+            elif section == "ifc_analysis" and "ifc" in selected_frameworks:
+                prompt += "\n\nIFC Standards Context:\n" + self.standards_loader.get_ifc_standards()
+            prompts[section] = prompt
+        
+        return prompts
+
+    def generate_repair_prompts(
+        self,
+        company_info: Dict,
+        selected_frameworks: List[str],
+        report: str,
+        sections: List[str],
+        detail_level: str = "standard"
+    ) -> Dict[str, str]:
+        """
+        Generate prompts that rewrite only the given sections of an existing report.
+        
+        Each prompt is the section's own prompt plus the neighbouring sections of
+        the report, so the rewritten section stays consistent with the rest.
+        
+        Args:
+            company_info: Dictionary containing company details
+            selected_frameworks: List of selected ESG frameworks
+            report: The report being repaired
+            sections: Section keys (see REPORT_SECTIONS) to regenerate
+            detail_level: Level of detail for the analysis ("standard" or "detailed")
+            
+        Returns:
+            Dict[str, str]: Section key to repair prompt, ordered as in the report
+        """
+        section_prompts = self.generate_section_prompts(company_info, selected_frameworks, detail_level)
+        order = [heading for _, heading in REPORT_SECTIONS]
+        spans = find_section_spans(report, order)
+        headings = dict(REPORT_SECTIONS)
         
-        return prompt 
\ No newline at end of file
+        prompts = {}
+        for section, _ in REPORT_SECTIONS:
+            if section not in sections:
+                continue
+            index = order.index(headings[section])
+            before = [h for h in order[:index] if h in spans]
+            after = [h for h in order[index + 1:] if h in spans]
+            before_text = report[slice(*spans[before[-1]])][-REPAIR_CONTEXT_CHARS:] if before else "(none)"
+            after_text = report[slice(*spans[after[0]])][:REPAIR_CONTEXT_CHARS] if after else "(none)"
+            prompts[section] = section_prompts[section] + REPAIR_CONTEXT_TEMPLATE.format(
+                before=before_text.strip(),
+                after=after_text.strip()
+            )
+        return prompts
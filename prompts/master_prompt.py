@@ -28,23 +28,12 @@ class PromptManager:
     ) -> str:
         """Generate the main analysis prompt."""
         
-        # Load selected standards
-        standards = {
-            fw: self.standards_loader.load_standard(fw)
-            for fw in selected_frameworks
-        }
-        
-        # Extract criteria by pillar
+        # Criteria of the selected standards by pillar, from the loader's indexes
         criteria_by_pillar = {
-            pillar: []
+            pillar: self.standards_loader.find_criteria(selected_frameworks, pillar=pillar)
             for pillar in ['E', 'S', 'G']
         }
         
-        for standard in standards.values():
-            if standard:
-                for criterion in standard.criteria:
-                    criteria_by_pillar[criterion.pillar].append(criterion)
-        
         # Generate the prompt template
         template = Template("""
 You are an expert ESG and Impact analyst specializing in pre-investment analysis. Your task is to analyze the following company information and provide a comprehensive ESG and Impact assessment based on the specified frameworks.
@@ -38,7 +38,7 @@ setup(
             "mypy>=1.8.0",
         ],
         "llm": [
-            "litellm>=1.30.7",
+            "litellm>=1.105.1,<2",
         ],
         "pdf": [
             "PyPDF2>=3.0.1",
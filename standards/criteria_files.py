@@ -0,0 +1,138 @@
+"""
+Discovery and normalization of the criteria YAML files under standards/.
+Framework directories hold several criteria files in two schemas: the English
+one (title/pillar/keywords/priority/description, under a `criteria:` key) and the
+French one (titre/pilier/mots_cles/priorité/note, as a top-level list). Some
+files mix both, a header mapping followed by a list, which is not valid YAML as
+a whole, so files are read block by block. Every record is mapped to the
+English schema and records sharing an id are merged.
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from loguru import logger
+
+KEY_ALIASES = {
+    "titre": "title",
+    "pilier": "pillar",
+    "mots_cles": "keywords",
+    "mots_clés": "keywords",
+    "priorité": "priority",
+    "priorite": "priority",
+    "note": "description",
+    "paragraphe": "paragraph"
+}
+
+# Pillar labels used across the files, including 2X dimensions (gender lens, so social)
+PILLARS = {
+    "e": "E", "environment": "E", "environmental": "E", "environnement": "E",
+    "s": "S", "social": "S", "employment": "S", "leadership": "S",
+    "entrepreneurship & ownership": "S", "products & services": "S", "supply chain": "S",
+    "portfolio": "S", "basic 2x esg": "S",
+    "g": "G", "governance": "G", "gouvernance": "G", "governance & accountability": "G",
+    "stratégie": "G", "strategy": "G", "transversal": "G"
+}
+
+PRIORITIES = {
+    "critique": "critical", "critical": "critical",
+    "élevée": "high", "elevee": "high", "haute": "high", "high": "high",
+    "moyenne": "medium", "medium": "medium",
+    "faible": "low", "basse": "low", "low": "low"
+}
+
+_TOP_LEVEL_ITEM = re.compile(r"^-(\s|$)")
+_TOP_LEVEL_KEY = re.compile(r"^[^\s#-][^:]*:")
+
+
+def discover_criteria_files(framework_dir: Path) -> List[Path]:
+    """Return a framework's criteria files, its `<framework>.yaml` first."""
+    files = sorted(framework_dir.glob("*.yaml"), key=lambda p: p.name.lower())
+    primary = framework_dir / f"{framework_dir.name.lower()}.yaml"
+    return sorted(files, key=lambda p: p != primary)
+
+
+def _yaml_blocks(text: str) -> List[str]:
+    """Split a file where it switches between a top-level mapping and a top-level list."""
+    blocks: List[Tuple[str, List[str]]] = []
+    for line in text.splitlines():
+        kind = "list" if _TOP_LEVEL_ITEM.match(line) else "map" if _TOP_LEVEL_KEY.match(line) else None
+        if kind and (not blocks or blocks[-1][0] != kind):
+            blocks.append((kind, []))
+        if blocks:
+            blocks[-1][1].append(line)
+    return ["\n".join(lines) for _, lines in blocks]
+
+
+def read_criteria_file(path: Path) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Read a criteria file into its metadata (name, version) and raw criterion records."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    metadata: Dict[str, Any] = {}
+    records: List[Dict[str, Any]] = []
+    for block in _yaml_blocks(text):
+        try:
+            data = yaml.safe_load(block)
+        except yaml.YAMLError as e:
+            logger.error(f"Skipping unreadable block in {path}: {str(e)}")
+            continue
+        if isinstance(data, dict):
+            records.extend(data.get("criteria") or [])
+            metadata.update({k: v for k, v in data.items() if k != "criteria"})
+        elif isinstance(data, list):
+            records.extend(data)
+    return metadata, [r for r in records if isinstance(r, dict)]
+
+
+def normalize_criterion(record: Dict[str, Any], source: str = "") -> Optional[Dict[str, Any]]:
+    """Map an English or French criterion record to the StandardCriterion fields."""
+    fields = {KEY_ALIASES.get(str(key).strip().lower(), str(key).strip().lower()): value
+              for key, value in record.items()}
+    if not fields.get("id"):
+        logger.warning(f"Skipping criterion without id in {source}")
+        return None
+
+    pillar = str(fields.get("pillar") or "").strip()
+    priority = str(fields.get("priority") or "").strip()
+    keywords = fields.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = [k.strip() for k in keywords.split(",")]
+    if pillar and pillar.lower() not in PILLARS:
+        logger.warning(f"Unknown pillar '{pillar}' for {fields['id']} in {source}")
+    paragraph = fields.get("paragraph")
+
+    return {
+        "id": str(fields["id"]).strip(),
+        "title": str(fields.get("title") or "").strip(),
+        "pillar": PILLARS.get(pillar.lower(), pillar.upper()),
+        "section": str(fields.get("section") or "").strip(),
+        "keywords": [str(k).strip() for k in keywords if str(k).strip()],
+        "priority": PRIORITIES.get(priority.lower(), priority.lower() or "medium"),
+        "description": str(fields.get("description") or "").strip(),
+        "paragraph": int(paragraph) if isinstance(paragraph, int) or str(paragraph).isdigit() else None
+    }
+
+
+def merge_criteria(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge records sharing an id, in first-seen order.
+
+    The first record's values win; later ones fill in empty fields and add keywords.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        existing = merged.get(record["id"])
+        if existing is None:
+            merged[record["id"]] = dict(record, keywords=list(record["keywords"]))
+            continue
+        for field, value in record.items():
+            if field == "keywords":
+                seen = {k.lower() for k in existing["keywords"]}
+                existing["keywords"].extend(k for k in value if k.lower() not in seen)
+            elif not existing.get(field) and value:
+                existing[field] = value
+    for criterion in merged.values():
+        criterion["title"] = criterion["title"] or criterion["id"]
+        criterion["description"] = criterion["description"] or criterion["title"]
+    return list(merged.values())
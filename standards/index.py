@@ -0,0 +1,105 @@
+"""
+Immutable lookup indexes over the criteria of a loaded ESG standard.
+Built once per framework, they answer pillar, priority, section and keyword
+queries (and combinations of them) by set intersection instead of rescanning
+every criterion on each prompt build.
+"""
+
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    from standards.loader import ESGStandard, StandardCriterion
+
+Filter = Optional[Union[str, Iterable[str]]]
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(value: str) -> str:
+    """Normalize an index key: case-insensitive, single-spaced."""
+    return " ".join(value.lower().split())
+
+
+def keyword_terms(keyword: str) -> Set[str]:
+    """Index terms for a keyword: the whole phrase and each of its words."""
+    phrase = normalize(keyword)
+    return {phrase, *_WORD.findall(phrase)} if phrase else set()
+
+
+def _freeze(buckets: Dict[str, Set[int]]) -> Mapping[str, FrozenSet[int]]:
+    return MappingProxyType({key: frozenset(positions) for key, positions in buckets.items()})
+
+
+@dataclass(frozen=True)
+class CriteriaIndex:
+    """Read-only indexes over one framework's criteria, by position in the standard."""
+    framework: str
+    criteria: Tuple["StandardCriterion", ...]
+    by_id: Mapping[str, int]
+    by_pillar: Mapping[str, FrozenSet[int]]
+    by_priority: Mapping[str, FrozenSet[int]]
+    by_section: Mapping[str, FrozenSet[int]]
+    by_keyword: Mapping[str, FrozenSet[int]]
+
+    @classmethod
+    def build(cls, framework: str, standard: "ESGStandard") -> "CriteriaIndex":
+        """Index every criterion of a standard."""
+        pillars: Dict[str, Set[int]] = {}
+        priorities: Dict[str, Set[int]] = {}
+        sections: Dict[str, Set[int]] = {}
+        keywords: Dict[str, Set[int]] = {}
+        for position, criterion in enumerate(standard.criteria):
+            pillars.setdefault(criterion.pillar.upper(), set()).add(position)
+            priorities.setdefault(normalize(criterion.priority), set()).add(position)
+            sections.setdefault(normalize(criterion.section), set()).add(position)
+            for keyword in criterion.keywords:
+                for term in keyword_terms(keyword):
+                    keywords.setdefault(term, set()).add(position)
+        return cls(
+            framework=framework,
+            criteria=tuple(standard.criteria),
+            by_id=MappingProxyType({c.id: position for position, c in enumerate(standard.criteria)}),
+            by_pillar=_freeze(pillars),
+            by_priority=_freeze(priorities),
+            by_section=_freeze(sections),
+            by_keyword=_freeze(keywords)
+        )
+
+    def select(
+        self,
+        pillar: Filter = None,
+        priority: Filter = None,
+        section: Filter = None,
+        keyword: Filter = None
+    ) -> List["StandardCriterion"]:
+        """Return criteria matching every given filter, in standard order.
+
+        Each filter takes one value or several; several values match any of them.
+        Keywords match a whole keyword phrase or one of its words.
+        """
+        matches: Optional[FrozenSet[int]] = None
+        for index, values, key in (
+            (self.by_pillar, pillar, str.upper),
+            (self.by_priority, priority, normalize),
+            (self.by_section, section, normalize),
+            (self.by_keyword, keyword, normalize)
+        ):
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            positions = frozenset().union(*(index.get(key(value), frozenset()) for value in values))
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return []
+        if matches is None:
+            return list(self.criteria)
+        return [self.criteria[position] for position in sorted(matches)]
+
+    def get(self, criterion_id: str) -> Optional["StandardCriterion"]:
+        """Return a criterion by id."""
+        position = self.by_id.get(criterion_id)
+        return self.criteria[position] if position is not None else None
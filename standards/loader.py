@@ -3,13 +3,20 @@ Standards loader module for ESG frameworks.
 Handles loading and parsing of ESG standards from YAML and Markdown files.
 """
 
-import os
+import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional
-import yaml
+from typing import Dict, Iterable, List, Optional, Tuple
 from loguru import logger
 from pydantic import BaseModel
 
+from standards.criteria_files import discover_criteria_files, merge_criteria, normalize_criterion, read_criteria_file
+from standards.index import CriteriaIndex, Filter
+from standards.retrieval import CriteriaRetriever, ScoredCriterion
+from standards.sections import SectionIndex, SectionIndexStore
+from standards.snapshot import Snapshot, fingerprints, load_entry, load_snapshot, save_snapshot
+
 class StandardCriterion(BaseModel):
     """Model for a single criterion in an ESG standard."""
     id: str
@@ -17,8 +24,9 @@ class StandardCriterion(BaseModel):
     pillar: str  # E, S, or G
     section: str
     keywords: List[str]
-    priority: str  # critical, high, medium
+    priority: str  # critical, high, medium, low
     description: str
+    paragraph: Optional[int] = None  # Paragraph of the standard document, when known
 
 class ESGStandard(BaseModel):
     """Model for an ESG standard framework."""
@@ -29,74 +37,260 @@ class ESGStandard(BaseModel):
 class StandardsLoader:
     """Handles loading and parsing of ESG standards."""
     
-    def __init__(self, standards_dir: str = "standards"):
+    # Known frameworks, in display order; other directories with criteria files follow
+    FRAMEWORKS = ['ifc', '2x', 'internal']
+    
+    # Full-text standard documents, relative to the standards directory
+    SECTION_DOCUMENTS = {
+        'ifc': 'ifc/IFC-standards.md',
+        'internal': 'internal/IPAE3-esg-impact.md'
+    }
+    
+    # Retrievers kept for distinct framework selections
+    MAX_RETRIEVERS = 8
+    
+    def __init__(
+        self,
+        standards_dir: str = "standards",
+        snapshot_path: Optional[str] = None,
+        section_index_dir: Optional[str] = None,
+        max_cached_criteria: Optional[int] = None
+    ):
+        """
+        Args:
+            standards_dir: Directory with one subdirectory per framework
+            snapshot_path: Compiled snapshot of all frameworks, rebuilt when a source
+                file changes; None parses the YAML files on every first access
+            section_index_dir: Where section indexes of the standard documents are
+                persisted; None keeps them in memory only
+            max_cached_criteria: Criteria kept in memory across loaded frameworks; the
+                least recently used frameworks are dropped beyond it (None = no limit)
+        """
         self.standards_dir = Path(standards_dir)
-        self._standards_cache: Dict[str, ESGStandard] = {}
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.max_cached_criteria = max_cached_criteria
+        self.sections = SectionIndexStore(section_index_dir)
+        self._standards_cache: "OrderedDict[str, ESGStandard]" = OrderedDict()
+        self._indexes: Dict[str, CriteriaIndex] = {}
+        self._retrievers: "OrderedDict[Tuple[str, ...], CriteriaRetriever]" = OrderedDict()
+        self._snapshot: Optional[Snapshot] = None
+        self._snapshot_checked = False
+        self._lock = threading.RLock()
+    
+    def available_frameworks(self) -> List[str]:
+        """List the frameworks that have criteria files, known frameworks first."""
+        found = sorted(
+            path.name for path in self.standards_dir.iterdir()
+            if path.is_dir() and discover_criteria_files(path)
+        ) if self.standards_dir.is_dir() else []
+        return [fw for fw in self.FRAMEWORKS if fw in found] + [fw for fw in found if fw not in self.FRAMEWORKS]
         
     def load_standard(self, framework: str) -> Optional[ESGStandard]:
-        """Load a specific ESG framework."""
-        if framework in self._standards_cache:
-            return self._standards_cache[framework]
-            
+        """Load a specific ESG framework, parsing it on first access."""
+        with self._lock:
+            standard = self._standards_cache.get(framework)
+            if standard is not None:
+                self._standards_cache.move_to_end(framework)
+                return standard
+            if self.snapshot_path and not self._snapshot_checked:
+                self._load_snapshot()
+            standard = None
+            if self._snapshot is not None and framework in self._snapshot:
+                standard = load_entry(self._snapshot, framework)
+            if standard is None:
+                standard = self._parse_standard(framework)
+            if standard is not None:
+                self._cache(framework, standard)
+            return standard
+    
+    def _cache(self, framework: str, standard: ESGStandard) -> None:
+        """Keep a framework, dropping the least recently used ones over the criteria limit."""
+        self._standards_cache[framework] = standard
+        if self.max_cached_criteria is None:
+            return
+        cached = sum(len(s.criteria) for s in self._standards_cache.values())
+        while cached > self.max_cached_criteria and len(self._standards_cache) > 1:
+            evicted, dropped = self._standards_cache.popitem(last=False)
+            cached -= len(dropped.criteria)
+            self._indexes.pop(evicted, None)
+            for key in [key for key in self._retrievers if evicted in key]:
+                del self._retrievers[key]
+            logger.debug(f"Dropped framework {evicted} from the standards cache")
+    
+    def _load_snapshot(self) -> None:
+        """Read the snapshot, rebuilding it first if it is missing or stale."""
+        self._snapshot_checked = True
+        self._snapshot = load_snapshot(self.snapshot_path, self.standards_dir)
+        if self._snapshot is not None:
+            return
+        try:
+            sources = fingerprints(self.standards_dir)
+            standards = {}
+            for framework in self.available_frameworks():
+                standard = self._parse_standard(framework)
+                if standard is not None:
+                    standards[framework] = standard
+            save_snapshot(self.snapshot_path, sources, standards)
+            logger.info(f"Wrote standards snapshot {self.snapshot_path} ({len(standards)} frameworks)")
+        except Exception as e:
+            logger.error(f"Error building standards snapshot: {str(e)}")
+            return
+        self._snapshot = load_snapshot(self.snapshot_path, self.standards_dir)
+    
+    def _parse_standard(self, framework: str) -> Optional[ESGStandard]:
+        """Parse and validate a framework from all of its criteria files."""
         try:
             framework_dir = self.standards_dir / framework
-            yaml_path = framework_dir / f"{framework.lower()}.yaml"
-            md_path = framework_dir / f"{framework.upper()}-standards.md"
+            paths = discover_criteria_files(framework_dir) if framework_dir.is_dir() else []
+            if not paths:
+                logger.error(f"No criteria files for framework {framework} in {framework_dir}")
+                return None
             
-            logger.info(f"Loading framework {framework} from {yaml_path} and {md_path}")
+            logger.info(f"Loading framework {framework} from {len(paths)} criteria files")
+            metadata = {}
+            records = []
+            for path in paths:
+                file_metadata, raw_criteria = read_criteria_file(path)
+                for key, value in file_metadata.items():
+                    metadata.setdefault(key, value)
+                records.extend(filter(None, (normalize_criterion(c, str(path)) for c in raw_criteria)))
             
-            if not yaml_path.exists() or not md_path.exists():
-                logger.error(f"Missing files for framework {framework}")
-                logger.error(f"YAML path exists: {yaml_path.exists()}")
-                logger.error(f"MD path exists: {md_path.exists()}")
-                return None
-                
-            with open(yaml_path, 'r', encoding='utf-8') as f:
-                yaml_data = yaml.safe_load(f)
-                
-            with open(md_path, 'r', encoding='utf-8') as f:
-                md_content = f.read()
-                
-            # Create standard object
-            standard = ESGStandard(
-                name=yaml_data['name'],
-                version=yaml_data['version'],
-                criteria=[
-                    StandardCriterion(
-                        id=c['id'],
-                        title=c['title'],
-                        pillar=c['pillar'],
-                        section=c['section'],
-                        keywords=c['keywords'],
-                        priority=c['priority'],
-                        description=c['description']
-                    )
-                    for c in yaml_data['criteria']
-                ]
+            return ESGStandard(
+                name=str(metadata.get('name', framework.upper())),
+                version=str(metadata.get('version', '')),
+                criteria=[StandardCriterion(**c) for c in merge_criteria(records)]
             )
             
-            self._standards_cache[framework] = standard
-            return standard
-            
         except Exception as e:
             logger.error(f"Error loading framework {framework}: {str(e)}")
             return None
             
     def get_all_standards(self) -> Dict[str, ESGStandard]:
         """Load all available ESG frameworks."""
-        frameworks = ['ifc', '2x', 'internal']
-        return {
-            fw: self.load_standard(fw)
-            for fw in frameworks
-            if self.load_standard(fw) is not None
-        }
+        standards = {fw: self.load_standard(fw) for fw in self.available_frameworks()}
+        return {fw: standard for fw, standard in standards.items() if standard is not None}
+    
+    def get_index(self, framework: str) -> Optional[CriteriaIndex]:
+        """Get the criteria indexes of a framework, built on first use."""
+        with self._lock:
+            index = self._indexes.get(framework)
+            if index is None:
+                standard = self.load_standard(framework)
+                if standard is None:
+                    return None
+                index = self._indexes.setdefault(framework, CriteriaIndex.build(framework, standard))
+            return index
         
     def get_criteria_by_pillar(self, framework: str, pillar: str) -> List[StandardCriterion]:
         """Get all criteria for a specific pillar in a framework."""
-        standard = self.load_standard(framework)
-        if not standard:
-            return []
-        return [c for c in standard.criteria if c.pillar == pillar]
+        return self.find_criteria([framework], pillar=pillar)
+    
+    def find_criteria(
+        self,
+        frameworks: Optional[Iterable[str]] = None,
+        pillar: Filter = None,
+        priority: Filter = None,
+        section: Filter = None,
+        keyword: Filter = None
+    ) -> List[StandardCriterion]:
+        """
+        Find criteria matching every given filter across frameworks.
+        
+        Args:
+            frameworks: Frameworks to search, in order (all known frameworks by default)
+            pillar: Pillar(s), e.g. "E" or ["E", "S"]
+            priority: Priority level(s), e.g. ["critical", "high"]
+            section: Section title(s)
+            keyword: Keyword(s), matching a whole keyword or one of its words
+            
+        Returns:
+            List[StandardCriterion]: Matches, by framework then standard order
+        """
+        results: List[StandardCriterion] = []
+        for framework in (self.available_frameworks() if frameworks is None else frameworks):
+            index = self.get_index(framework)
+            if index is not None:
+                results.extend(index.select(pillar=pillar, priority=priority, section=section, keyword=keyword))
+        return results
+
+    def get_retriever(self, frameworks: Optional[Iterable[str]] = None) -> CriteriaRetriever:
+        """Get the BM25 retriever over the criteria of some frameworks (all by default), built on first use."""
+        key = tuple(sorted(set(self.available_frameworks() if frameworks is None else frameworks)))
+        with self._lock:
+            retriever = self._retrievers.get(key)
+            if retriever is not None:
+                self._retrievers.move_to_end(key)
+                return retriever
+            standards = {fw: self.load_standard(fw) for fw in key}
+            retriever = CriteriaRetriever(
+                (framework, criterion)
+                for framework, standard in standards.items() if standard is not None
+                for criterion in standard.criteria
+            )
+            if all(fw in self._standards_cache for fw in key):
+                # Not kept if building it evicted one of its own frameworks
+                self._retrievers[key] = retriever
+                while len(self._retrievers) > self.MAX_RETRIEVERS:
+                    self._retrievers.popitem(last=False)
+            return retriever
+    
+    def retrieve_criteria(
+        self,
+        query: str,
+        frameworks: Optional[Iterable[str]] = None,
+        top_k: int = 5,
+        token_budget: Optional[int] = None
+    ) -> Dict[str, List[ScoredCriterion]]:
+        """
+        Select the criteria most relevant to a company, per pillar.
+        
+        Args:
+            query: Company sector, subsector and description
+            frameworks: Frameworks to select from (all by default)
+            top_k: Maximum criteria per pillar
+            token_budget: Maximum estimated tokens for all selected criteria
+            
+        Returns:
+            Dict[str, List[ScoredCriterion]]: Pillar to selected criteria, best first
+        """
+        return self.get_retriever(frameworks).retrieve(query, top_k=top_k, token_budget=token_budget)
+
+    def get_section_index(self, framework: str) -> Optional[SectionIndex]:
+        """Get the heading index of a framework's standard document, if it has one."""
+        document = self.SECTION_DOCUMENTS.get(framework)
+        if document is None:
+            return None
+        return self.sections.get(self.standards_dir / document)
+    
+    def get_criterion_text(
+        self,
+        framework: str,
+        criterion: StandardCriterion,
+        max_chars: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Get the standard text that a criterion's section points to.
+        
+        Args:
+            framework: Framework of the criterion
+            criterion: Criterion whose section to read (IFC ids such as IFC-PS1-005
+                restrict the lookup to that Performance Standard)
+            max_chars: Truncate the text to about this many characters
+            
+        Returns:
+            Optional[str]: The section with its paragraphs, or None if it cannot be found
+        """
+        index = self.get_section_index(framework)
+        if index is None:
+            return None
+        standard = re.search(r"PS(\d+)", criterion.id)
+        within = f"PS{standard.group(1)}" if standard else None
+        node = index.resolve(criterion.section, within=within)
+        if node is None and criterion.paragraph is not None:
+            node = index.paragraph(criterion.paragraph, within=within)
+        if node is None:
+            return None
+        return index.read(node, max_bytes=max_chars)
 
     def get_ifc_standards(self) -> str:
         """Get IFC standards in a formatted string."""
@@ -0,0 +1,246 @@
+"""
+Relevance-ranked selection of standard criteria for a company.
+Criteria are scored with BM25 over their title, keywords, section heading
+and description against the company's sector, subsector and description,
+boosted by priority, and the best ones per pillar are kept under a token
+budget so prompts carry only the criteria that matter for the analysis.
+
+Many criteria are written in French while company descriptions are usually in
+English, so words are accent-folded and French ESG terms are mapped to their
+English equivalent on both sides.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from standards.loader import StandardCriterion
+
+_WORD = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the their this to with
+au aux avec dans de des du en et la le les par pour sur un une
+a au aux avec ce ces dans de des du en est et la le les leur ou par pour qui sur un une
+company business provides provide based services service
+""".split())
+
+# French terms (accent-folded, after plural stemming) and English variants, to one English term
+GLOSSARY = {
+    "femme": "women", "woman": "women", "female": "women", "fille": "girl", "genre": "gender",
+    "sexe": "gender", "travailleur": "worker", "employe": "employee", "emploi": "employment",
+    "travail": "labor", "labour": "labor", "oeuvre": "workforce", "enfant": "child",
+    "children": "child", "force": "forced", "syndicat": "union", "licenciement": "retrenchment",
+    "egalite": "equality", "recrutement": "recruitment", "harcelement": "harassment",
+    "droit": "right", "humain": "human", "sante": "health", "securite": "safety",
+    "urgence": "emergency", "maladie": "disease", "formation": "training",
+    "communaute": "community", "prenante": "stakeholder", "grief": "grievance",
+    "plainte": "complaint", "deplacement": "displacement", "reinstallation": "resettlement",
+    "indemnisation": "compensation", "subsistance": "livelihood", "revenu": "income",
+    "logement": "housing", "terre": "land", "autochtone": "indigenous",
+    "patrimoine": "heritage", "culturel": "cultural", "fournisseur": "supplier",
+    "approvisionnement": "supply", "chaine": "chain", "eau": "water", "hydrique": "water",
+    "irrigation": "water", "dechet": "waste", "dangereux": "hazardous",
+    "dangereuse": "hazardous", "matiere": "material", "produit": "product",
+    "chimique": "chemical", "phytosanitaire": "pesticide", "gaz": "gas", "serre": "greenhouse",
+    "ges": "greenhouse", "climat": "climate", "climatique": "climate", "energie": "energy",
+    "renouvelable": "renewable", "efficacite": "efficiency", "ressource": "resource",
+    "rejet": "discharge", "biodiversite": "biodiversity", "espece": "species",
+    "envahissante": "invasive", "exotique": "alien", "protegee": "protected",
+    "naturel": "natural", "naturelle": "natural", "ecosystemique": "ecosystem",
+    "attenuation": "mitigation", "evitement": "avoidance", "conception": "design",
+    "equipement": "equipment", "gouvernance": "governance", "strategie": "strategy",
+    "politique": "policy", "gestion": "management", "suivi": "monitoring",
+    "evaluation": "assessment", "risque": "risk", "conformite": "compliance",
+    "conseil": "board", "propriete": "ownership", "actionnariat": "ownership",
+    "fondatrice": "founder", "entrepreneure": "entrepreneur", "donnee": "data",
+    "qualite": "quality", "portefeuille": "portfolio", "pret": "loan",
+    "transparence": "transparency", "divulgation": "disclosure", "consentement": "consent",
+    "solar": "renewable", "electricity": "energy", "power": "energy"
+}
+
+# Term weights per field: keywords are the most deliberate signal
+FIELD_WEIGHTS = (("keywords", 3), ("title", 2), ("section", 2), ("description", 1))
+
+PRIORITY_BOOST = {"critical": 1.5, "high": 1.2, "medium": 1.0, "low": 0.8}
+
+PILLAR_NAMES = {"E": "Environmental", "S": "Social", "G": "Governance"}
+
+
+def _pillar_order(pillars: Iterable[str]) -> List[str]:
+    """E, S, G first, then any other pillar alphabetically."""
+    order = list(PILLAR_NAMES)
+    return sorted(pillars, key=lambda p: (order.index(p) if p in order else len(order), p))
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents, so "Déchets" and "dechets" are the same word."""
+    text = unicodedata.normalize("NFKD", text.lower().replace("œ", "oe"))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded words without stopwords, with a light plural stemming and French terms in English."""
+    tokens = []
+    for word in _WORD.findall(fold(text)):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(GLOSSARY.get(word, word))
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for budgeting."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class ScoredCriterion:
+    """A criterion with its relevance score for one query."""
+    framework: str
+    criterion: "StandardCriterion"
+    score: float
+
+
+class CriteriaRetriever:
+    """BM25 index over the criteria of one or more frameworks."""
+
+    def __init__(
+        self,
+        criteria: Iterable[Tuple[str, "StandardCriterion"]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        priority_boost: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            criteria: (framework, criterion) pairs to index
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            priority_boost: Score multiplier per priority level
+        """
+        self.k1 = k1
+        self.b = b
+        self.priority_boost = priority_boost or PRIORITY_BOOST
+        self.documents: List[Tuple[str, "StandardCriterion"]] = list(criteria)
+        self._term_counts: List[Counter] = []
+        self._lengths: List[int] = []
+        document_frequency: Counter = Counter()
+        for _, criterion in self.documents:
+            counts: Counter = Counter()
+            for field, weight in FIELD_WEIGHTS:
+                value = getattr(criterion, field)
+                text = " ".join(value) if isinstance(value, list) else value
+                for token in tokenize(text):
+                    counts[token] += weight
+            self._term_counts.append(counts)
+            self._lengths.append(sum(counts.values()))
+            document_frequency.update(counts.keys())
+        count = len(self.documents)
+        self._average_length = (sum(self._lengths) / count) if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def score(self, query: str) -> List[ScoredCriterion]:
+        """Score every criterion against a query, best first."""
+        terms = Counter(tokenize(query))
+        results = []
+        for position, (framework, criterion) in enumerate(self.documents):
+            counts = self._term_counts[position]
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / (self._average_length or 1))
+            relevance = 0.0
+            for term in terms:
+                frequency = counts.get(term)
+                if frequency:
+                    relevance += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            boost = self.priority_boost.get(criterion.priority.lower(), 1.0)
+            results.append(ScoredCriterion(framework, criterion, relevance * boost))
+        results.sort(key=lambda r: (-r.score, -self.priority_boost.get(r.criterion.priority.lower(), 1.0)))
+        return results
+
+    def retrieve(
+        self,
+        query: str,
+        frameworks: Optional[Iterable[str]] = None,
+        top_k: int = 5,
+        token_budget: Optional[int] = None,
+        always_include: Iterable[str] = ("critical",)
+    ) -> Dict[str, List[ScoredCriterion]]:
+        """
+        Return the most relevant criteria per pillar.
+
+        Criteria that share no term with the query are left out unless their
+        priority is in always_include. Pillars take turns picking their next
+        best criterion until each has top_k or the token budget is spent.
+
+        Args:
+            query: Company text (sector, subsector, description)
+            frameworks: Frameworks to select from (all indexed frameworks by default)
+            top_k: Maximum criteria per pillar
+            token_budget: Maximum estimated tokens for all selected criteria
+            always_include: Priorities kept even without a matching term
+
+        Returns:
+            Dict[str, List[ScoredCriterion]]: Pillar to selected criteria, best first
+        """
+        allowed = set(frameworks) if frameworks is not None else None
+        always = {p.lower() for p in always_include}
+        candidates: Dict[str, List[ScoredCriterion]] = {}
+        for result in self.score(query):
+            if allowed is not None and result.framework not in allowed:
+                continue
+            if result.score <= 0 and result.criterion.priority.lower() not in always:
+                continue
+            candidates.setdefault(result.criterion.pillar.upper(), []).append(result)
+
+        selected: Dict[str, List[ScoredCriterion]] = {pillar: [] for pillar in candidates}
+        remaining = token_budget
+        for rank in range(top_k):
+            for pillar in _pillar_order(candidates):
+                if rank >= len(candidates[pillar]):
+                    continue
+                result = candidates[pillar][rank]
+                cost = estimate_tokens(format_criterion(result.framework, result.criterion))
+                if remaining is not None:
+                    if cost > remaining:
+                        continue
+                    remaining -= cost
+                selected[pillar].append(result)
+        return {pillar: results for pillar, results in selected.items() if results}
+
+
+def format_criterion(framework: str, criterion: "StandardCriterion") -> str:
+    """Render a criterion as a prompt line."""
+    return (
+        f"- [{framework.upper()}] {criterion.id}: {criterion.title} ({criterion.priority} priority)\n"
+        f"  {criterion.description}"
+    )
+
+
+def format_selection(
+    selection: Dict[str, List[ScoredCriterion]],
+    excerpt: Optional[Callable[[ScoredCriterion], Optional[str]]] = None
+) -> str:
+    """Render selected criteria grouped by pillar, each optionally followed by an excerpt."""
+    blocks = []
+    for pillar in _pillar_order(selection):
+        lines = []
+        for result in selection[pillar]:
+            line = format_criterion(result.framework, result.criterion)
+            text = excerpt(result) if excerpt else None
+            if text:
+                line += "\n" + "\n".join(f"    > {row}" for row in text.splitlines() if row.strip())
+            lines.append(line)
+        lines = "\n".join(lines)
+        blocks.append(f"{PILLAR_NAMES.get(pillar, pillar)} ({pillar}):\n{lines}")
+    return "\n\n".join(blocks)
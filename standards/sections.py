@@ -0,0 +1,241 @@
+"""
+Section-addressable index over the Markdown standard documents.
+A document is parsed once into a heading tree (e.g. PS1 -> Requirements ->
+Policy -> paragraph 6) with the byte range of every node, and the tree is
+persisted next to the other caches. Callers then read exactly the bytes of
+the section a criterion points to instead of loading the whole document.
+"""
+
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from standards.snapshot import Fingerprint, fingerprint
+
+INDEX_FORMAT = 1
+
+_HEADING = re.compile(rb"^(#{1,6})[ \t]+(.*?)[ \t#]*\r?$")
+_FENCE = re.compile(rb"^\s*(```|~~~)")
+_PARAGRAPH = re.compile(r"^(\d+)\.?$")
+_STANDARD = re.compile(r"^(?:PS|Performance Standard)\s*(\d+)\b", re.IGNORECASE)
+_NUMBERED = re.compile(r"^(\d+(?:\.\d+)+)\.?\s+(.*)$")
+
+
+def normalize(title: str) -> str:
+    """Normalize a heading for lookups: case-insensitive, single-spaced, no trailing colon."""
+    return " ".join(title.lower().split()).rstrip(":")
+
+
+def heading_keys(title: str) -> List[str]:
+    """Lookup keys of a heading: its title plus codes such as "ps1", "3.8.2" or "§6"."""
+    title = title.strip()
+    keys = [normalize(title)]
+    paragraph = _PARAGRAPH.match(title)
+    if paragraph:
+        return [f"§{paragraph.group(1)}"]
+    standard = _STANDARD.match(title)
+    if standard:
+        keys.append(f"ps{standard.group(1)}")
+    numbered = _NUMBERED.match(title)
+    if numbered:
+        keys.extend([numbered.group(1), normalize(numbered.group(2))])
+    return keys
+
+
+@dataclass
+class SectionNode:
+    """One heading of a document and the byte range of its whole subtree."""
+    title: str
+    level: int
+    paragraph: bool
+    parent: Optional[int]
+    start: int  # Start of the heading line
+    body: int  # Start of the text after the heading
+    end: int  # End of the last descendant
+
+
+def parse_sections(data: bytes) -> List[SectionNode]:
+    """Build the heading tree of a Markdown document.
+
+    Numbered paragraphs written as headings ("### 6.") belong to the preceding
+    named heading of the same level rather than being its siblings.
+    """
+    nodes: List[SectionNode] = []
+    stack: List[int] = []
+    offset = 0
+    in_fence = False
+    for line in data.splitlines(keepends=True):
+        line_start, offset = offset, offset + len(line)
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _HEADING.match(line.rstrip(b"\n"))
+        if not match:
+            continue
+        title = match.group(2).decode("utf-8", errors="replace").strip()
+        node = SectionNode(
+            title=title,
+            level=len(match.group(1)),
+            paragraph=bool(_PARAGRAPH.match(title)),
+            parent=None,
+            start=line_start,
+            body=offset,
+            end=len(data)
+        )
+        while stack:
+            top = nodes[stack[-1]]
+            if top.level < node.level or (top.level == node.level and node.paragraph and not top.paragraph):
+                break
+            top.end = line_start
+            stack.pop()
+        node.parent = stack[-1] if stack else None
+        nodes.append(node)
+        stack.append(len(nodes) - 1)
+    return nodes
+
+
+class SectionIndex:
+    """Heading tree of one document with O(1) lookups by title or code."""
+
+    def __init__(self, path: Path, nodes: List[SectionNode]):
+        self.path = path
+        self.nodes = nodes
+        self._keys: Dict[str, List[int]] = {}
+        for position, node in enumerate(nodes):
+            for key in heading_keys(node.title):
+                self._keys.setdefault(key, []).append(position)
+
+    def ancestors(self, node: SectionNode) -> List[SectionNode]:
+        """Return a node's ancestors, nearest first."""
+        result = []
+        while node.parent is not None:
+            node = self.nodes[node.parent]
+            result.append(node)
+        return result
+
+    def path_of(self, node: SectionNode) -> str:
+        """Return the heading path of a node, e.g. "PS1 ... > Requirements > Policy"."""
+        return " > ".join(n.title for n in reversed([node] + self.ancestors(node)))
+
+    def _within(self, node: SectionNode, scope: Optional[str]) -> bool:
+        if scope is None:
+            return True
+        keys = set(heading_keys(scope))
+        return any(keys & set(heading_keys(a.title)) for a in [node] + self.ancestors(node))
+
+    def find(self, title: str, within: Optional[str] = None) -> List[SectionNode]:
+        """Return the nodes with this title or code, optionally under a given ancestor."""
+        positions = dict.fromkeys(i for key in heading_keys(title) for i in self._keys.get(key, []))
+        return [self.nodes[i] for i in sorted(positions) if self._within(self.nodes[i], within)]
+
+    def paragraph(self, number: int, within: Optional[str] = None) -> Optional[SectionNode]:
+        """Return numbered paragraph `number`, e.g. paragraph(6, within="PS1")."""
+        matches = self.find(f"{number}.", within)
+        return matches[0] if matches else None
+
+    def resolve(self, section: str, within: Optional[str] = None) -> Optional[SectionNode]:
+        """
+        Find the node a criterion's section refers to.
+
+        Understands plain titles ("Management Programs"), numbered prefixes
+        ("3.8.2 SCREENING") and sub-headings joined by " - "
+        ("3.8.2 MONITORING - For employees").
+        """
+        numbered = _NUMBERED.match(section.strip())
+        scope = within
+        if numbered:
+            scope, section = numbered.group(1), numbered.group(2)
+        *parents, title = [part.strip() for part in section.split(" - ")]
+        candidates = [
+            node for node in self.find(title, scope)
+            if all(any(normalize(p) in heading_keys(a.title) for a in self.ancestors(node)) for p in parents)
+        ]
+        if not candidates and numbered:
+            # Criteria often shorten the numbered heading or name a part of it
+            prefix = normalize(title)
+            candidates = [
+                node for node in self.find(scope, within)
+                if any(key.startswith(prefix) for key in heading_keys(node.title))
+            ] or self.find(scope, within)
+        return candidates[0] if candidates else None
+
+    def read(self, node: SectionNode, include_heading: bool = True, max_bytes: Optional[int] = None) -> str:
+        """Read a node's text, with its sub-sections, straight from the document."""
+        start = node.start if include_heading else node.body
+        length = node.end - start if max_bytes is None else min(node.end - start, max_bytes)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(length).decode("utf-8", errors="ignore").strip()
+
+
+class SectionIndexStore:
+    """Builds section indexes on first use and persists them, rebuilding when a document changes."""
+
+    def __init__(self, index_dir: Optional[str] = None):
+        self.index_dir = Path(index_dir) if index_dir else None
+        self._indexes: Dict[Path, SectionIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> Optional[SectionIndex]:
+        """Return the section index of a Markdown document, or None if it does not exist."""
+        path = Path(path)
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is None:
+                if not path.is_file():
+                    return None
+                index = self._load(path) or self._build(path)
+                self._indexes[path] = index
+            return index
+
+    def _index_path(self, path: Path) -> Optional[Path]:
+        if self.index_dir is None:
+            return None
+        return self.index_dir / (path.as_posix().replace("/", "__") + ".json")
+
+    def _load(self, path: Path) -> Optional[SectionIndex]:
+        index_path = self._index_path(path)
+        if index_path is None or not index_path.exists():
+            return None
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            mtime_ns, size, digest = data["source"]
+            stat = path.stat()
+            if data["format"] != INDEX_FORMAT:
+                return None
+            if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size) and fingerprint(path)[2] != digest:
+                logger.info(f"{path} changed, rebuilding its section index")
+                return None
+            return SectionIndex(path, [SectionNode(**node) for node in data["nodes"]])
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable section index {index_path}: {str(e)}")
+            return None
+
+    def _build(self, path: Path) -> SectionIndex:
+        source: Fingerprint = fingerprint(path)
+        with open(path, "rb") as f:
+            nodes = parse_sections(f.read())
+        index = SectionIndex(path, nodes)
+        index_path = self._index_path(path)
+        if index_path is not None:
+            try:
+                index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({
+                        "format": INDEX_FORMAT,
+                        "source": source,
+                        "nodes": [asdict(node) for node in nodes]
+                    }, f)
+                os.replace(tmp_path, index_path)
+            except OSError as e:
+                logger.warning(f"Could not persist section index {index_path}: {str(e)}")
+        logger.info(f"Indexed {len(nodes)} sections of {path}")
+        return index
@@ -0,0 +1,157 @@
+"""
+Compiled binary snapshot of parsed ESG standards.
+All frameworks are validated once and pickled, each on its own, into a single
+versioned file together with a fingerprint (mtime, size, SHA-256) of every YAML/Markdown
+source under the standards directory. A fresh process reads only the snapshot's
+index instead of re-parsing YAML and rebuilding the pydantic models, and the
+snapshot is rebuilt as soon as any source file's content changes. A framework is
+read from the file and unpickled when first asked for, so a process only holds
+the ones it uses.
+
+Snapshots are only ever read from the local cache directory the app writes them to.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import pydantic
+from loguru import logger
+
+SNAPSHOT_FORMAT = 3
+SOURCE_PATTERNS = ("*.yaml", "*.md")
+
+Fingerprint = Tuple[int, int, str]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Index of a snapshot file: where each pickled framework starts and its length."""
+    path: Path
+    stamp: Tuple[int, int]
+    entries: Dict[str, Tuple[int, int]]
+
+    def __contains__(self, framework: str) -> bool:
+        return framework in self.entries
+
+
+def source_files(standards_dir: Path) -> Dict[str, Path]:
+    """Return every YAML and Markdown source under the standards directory, by relative path."""
+    return {
+        path.relative_to(standards_dir).as_posix(): path
+        for pattern in SOURCE_PATTERNS
+        for path in sorted(standards_dir.rglob(pattern))
+        if path.is_file()
+    }
+
+
+def fingerprint(path: Path) -> Fingerprint:
+    """Return (mtime_ns, size, sha256) of a file."""
+    stat = path.stat()
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+
+def fingerprints(standards_dir: Path) -> Dict[str, Fingerprint]:
+    """Fingerprint every source under the standards directory."""
+    return {name: fingerprint(path) for name, path in source_files(standards_dir).items()}
+
+
+def _header() -> Dict[str, Any]:
+    return {"format": SNAPSHOT_FORMAT, "pydantic": pydantic.VERSION}
+
+
+def _sources_match(standards_dir: Path, recorded: Dict[str, Fingerprint]) -> bool:
+    """Check recorded fingerprints, hashing only files whose mtime or size moved."""
+    current = source_files(standards_dir)
+    if current.keys() != recorded.keys():
+        return False
+    for name, path in current.items():
+        mtime_ns, size, digest = recorded[name]
+        stat = path.stat()
+        if stat.st_mtime_ns == mtime_ns and stat.st_size == size:
+            continue
+        if fingerprint(path)[2] != digest:
+            return False
+    return True
+
+
+def _stamp(f) -> Tuple[int, int]:
+    stat = os.fstat(f.fileno())
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_snapshot(snapshot_path: Path, standards_dir: Path) -> Optional[Snapshot]:
+    """Return the index of the snapshot, or None if it is missing or stale.
+
+    Only the index is read; load a framework with load_entry() when it is needed.
+    """
+    try:
+        with open(snapshot_path, "rb") as f:
+            snapshot = pickle.load(f)
+            data_start = f.tell()
+            stamp = _stamp(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable standards snapshot {snapshot_path}: {str(e)}")
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("header") != _header():
+        logger.info(f"Standards snapshot {snapshot_path} is from another version, rebuilding")
+        return None
+    try:
+        if not _sources_match(standards_dir, snapshot["sources"]):
+            logger.info("Standards sources changed, rebuilding snapshot")
+            return None
+    except OSError as e:
+        logger.warning(f"Could not check standards sources: {str(e)}")
+        return None
+    return Snapshot(
+        path=snapshot_path,
+        stamp=stamp,
+        entries={name: (data_start + offset, length) for name, (offset, length) in snapshot["standards"].items()}
+    )
+
+
+def load_entry(snapshot: Snapshot, framework: str) -> Optional[Any]:
+    """Read and unpickle one framework, or return None if the file changed since it was indexed."""
+    offset, length = snapshot.entries[framework]
+    try:
+        with open(snapshot.path, "rb") as f:
+            if _stamp(f) != snapshot.stamp:
+                logger.info(f"Standards snapshot {snapshot.path} was replaced, not reading {framework}")
+                return None
+            f.seek(offset)
+            return pickle.loads(f.read(length))
+    except Exception as e:
+        logger.warning(f"Could not read {framework} from standards snapshot {snapshot.path}: {str(e)}")
+        return None
+
+
+def save_snapshot(snapshot_path: Path, sources: Dict[str, Fingerprint], standards: Dict[str, Any]) -> None:
+    """Write the standards and the fingerprints of their sources to the snapshot, atomically.
+    
+    Take the fingerprints before parsing, so an edit made meanwhile makes the snapshot stale.
+    The file holds a pickled index followed by each framework's pickle, so a reader
+    can seek to one framework without loading the others.
+    """
+    blobs = {name: pickle.dumps(standard, protocol=pickle.HIGHEST_PROTOCOL) for name, standard in standards.items()}
+    entries = {}
+    offset = 0
+    for name, blob in blobs.items():
+        entries[name] = (offset, len(blob))
+        offset += len(blob)
+    index = {"header": _header(), "sources": sources, "standards": entries}
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+        for blob in blobs.values():
+            f.write(blob)
+    os.replace(tmp_path, snapshot_path)
@@ -0,0 +1,97 @@
+"""
+Tests for the process-wide app resources and their invalidation.
+"""
+
+import os
+
+import pytest
+
+import engine.llm_service as llm_service
+import utils.app_resources as app_resources
+
+
+@pytest.fixture
+def resources(monkeypatch, tmp_path):
+    """App resources pointed at a temporary config file and standards directory."""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text("analysis:\n  section_concurrency: 4\n")
+    standards_dir = tmp_path / "standards"
+    (standards_dir / "ifc").mkdir(parents=True)
+    (standards_dir / "ifc" / "ifc.yaml").write_text("name: IFC\n")
+    monkeypatch.setattr(app_resources, "CONFIG_PATH", str(config_path))
+    monkeypatch.setattr(app_resources, "STANDARDS_DIR", str(standards_dir))
+    manager_class = llm_service.LLMServiceManager
+    monkeypatch.setattr(llm_service, "LLMServiceManager",
+                        lambda: manager_class(settings={"app": {"cache_dir": str(tmp_path)}}))
+    app_resources.invalidate()
+    yield config_path, standards_dir
+    app_resources.invalidate()
+
+
+def touch(path, content):
+    """Rewrite a file and move its mtime forward so the change is always visible."""
+    path.write_text(content)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_resources_are_reused_across_reruns(resources):
+    """Repeated accesses return the same objects without reloading."""
+    assert app_resources.get_config() is app_resources.get_config()
+    assert app_resources.get_standards_loader() is app_resources.get_standards_loader()
+    prompt_manager = app_resources.get_prompt_manager()
+    assert prompt_manager is app_resources.get_prompt_manager()
+    assert prompt_manager.standards_loader is app_resources.get_standards_loader()
+
+
+def test_file_changes_rebuild_only_dependent_resources(resources):
+    """Editing config.yaml reloads the config; editing a standard rebuilds the loader."""
+    config_path, standards_dir = resources
+    loader = app_resources.get_standards_loader()
+
+    touch(config_path, "analysis:\n  section_concurrency: 8\n")
+    assert app_resources.get_config()["analysis"]["section_concurrency"] == 8
+    assert app_resources.get_standards_loader() is loader
+
+    touch(standards_dir / "ifc" / "ifc.yaml", "name: IFC v2\n")
+    new_loader = app_resources.get_standards_loader()
+    assert new_loader is not loader
+    assert app_resources.get_prompt_manager().standards_loader is new_loader
+
+
+def test_invalidate_rebuilds_everything(resources):
+    """invalidate() drops cached resources, including the LLM manager."""
+    config = app_resources.get_config()
+    loader = app_resources.get_standards_loader()
+    manager = app_resources.get_llm_manager()
+    assert app_resources.get_llm_manager() is manager
+
+    app_resources.invalidate()
+    assert app_resources.get_config() is not config
+    assert app_resources.get_standards_loader() is not loader
+    assert app_resources.get_llm_manager() is not manager
+
+
+def test_only_standards_data_files_rebuild_the_loader(resources):
+    """Python sources and bytecode under standards/ do not count as a standards change."""
+    _, standards_dir = resources
+    loader = app_resources.get_standards_loader()
+
+    touch(standards_dir / "loader.py", "# changed\n")
+    (standards_dir / "__pycache__").mkdir()
+    touch(standards_dir / "__pycache__" / "loader.cpython-311.pyc", "bytecode")
+    assert app_resources.get_standards_loader() is loader
+
+    touch(standards_dir / "ifc" / "notes.md", "# Notes\n")
+    assert app_resources.get_standards_loader() is not loader
+
+
+def test_loader_settings_change_rebuilds_the_prompt_manager(resources):
+    """The prompt manager is keyed on the same settings as the loader it wraps."""
+    config_path, _ = resources
+    prompt_manager = app_resources.get_prompt_manager()
+
+    touch(config_path, "standards:\n  max_cached_criteria: 10\n")
+    new_manager = app_resources.get_prompt_manager()
+    assert new_manager is not prompt_manager
+    assert new_manager.standards_loader is app_resources.get_standards_loader()
@@ -0,0 +1,82 @@
+"""
+Tests for reading and normalizing the criteria files of every framework.
+"""
+
+from standards.criteria_files import merge_criteria, normalize_criterion, read_criteria_file
+from standards.loader import StandardsLoader
+
+MIXED_FILE = """name: "Test Standards"
+version: "2024"
+criteria:
+  - id: "T-1"
+    title: "Board oversight"
+    pillar: "G"
+    section: "Governance"
+    keywords: ["board"]
+    priority: "high"
+    description: "Board oversees ESG"
+- id: T-2
+  titre: Gestion de l'eau
+  section: Water
+  pilier: Environnement
+  mots_cles: [water, effluents]
+  priorité: critique
+  note: Consommation d'eau maîtrisée
+  paragraphe: 6
+- id: T-1
+  titre: Supervision du conseil
+  pilier: Gouvernance
+  mots_cles: [Board, ESG committee]
+  priorité: moyenne
+"""
+
+
+def test_mixed_file_is_read_block_by_block(tmp_path):
+    """A header mapping followed by a top-level list yields both schemas' records."""
+    path = tmp_path / "test-criteria.yaml"
+    path.write_text(MIXED_FILE, encoding="utf-8")
+    metadata, records = read_criteria_file(path)
+    assert metadata == {"name": "Test Standards", "version": "2024"}
+    assert [r["id"] for r in records] == ["T-1", "T-2", "T-1"]
+
+
+def test_french_keys_are_normalized_and_duplicates_merged(tmp_path):
+    """French keys and values map to the English schema; the first record of an id wins."""
+    path = tmp_path / "test-criteria.yaml"
+    path.write_text(MIXED_FILE, encoding="utf-8")
+    merged = merge_criteria([normalize_criterion(r) for r in read_criteria_file(path)[1]])
+    assert [c["id"] for c in merged] == ["T-1", "T-2"]
+    water = merged[1]
+    assert (water["title"], water["pillar"], water["priority"], water["paragraph"]) == (
+        "Gestion de l'eau", "E", "critical", 6
+    )
+    assert water["description"] == "Consommation d'eau maîtrisée"
+    board = merged[0]
+    assert (board["title"], board["priority"]) == ("Board oversight", "high")
+    assert board["keywords"] == ["board", "ESG committee"]
+
+
+def test_loader_reads_every_criteria_file():
+    """Each framework combines its criteria files into one standard with unique ids."""
+    loader = StandardsLoader()
+    assert loader.available_frameworks() == ["ifc", "2x", "internal"]
+    for framework, minimum in (("ifc", 60), ("2x", 20), ("internal", 25)):
+        criteria = loader.load_standard(framework).criteria
+        ids = [c.id for c in criteria]
+        assert len(ids) >= minimum and len(set(ids)) == len(ids)
+        assert {c.pillar for c in criteria} <= {"E", "S", "G"}
+        assert {c.priority for c in criteria} <= {"critical", "high", "medium", "low"}
+    assert loader.get_index("internal").get("IPAE3-ESG-001").priority == "high"
+
+
+def test_cache_drops_least_recently_used_frameworks():
+    """Past the criteria limit, the least recently used framework and its indexes are dropped."""
+    loader = StandardsLoader(max_cached_criteria=100)
+    loader.get_index("ifc")
+    loader.load_standard("2x")
+    loader.load_standard("ifc")
+    loader.get_retriever(["internal"])
+    assert list(loader._standards_cache) == ["ifc", "internal"]
+    assert "2x" not in loader._indexes and "ifc" in loader._indexes
+    assert loader.load_standard("2x").criteria
+    assert list(loader._standards_cache) == ["internal", "2x"]
@@ -0,0 +1,84 @@
+"""
+Tests for relevance-ranked criteria selection.
+"""
+
+from standards.loader import StandardCriterion, StandardsLoader
+from standards.retrieval import CriteriaRetriever, estimate_tokens, format_criterion
+from prompts.enhanced_prompts import EnhancedPromptManager, MASTER_PROMPT_INSTRUCTIONS
+
+
+def criterion(id, pillar, priority, title, keywords, description="Requirement details."):
+    return StandardCriterion(id=id, title=title, pillar=pillar, section="Section", keywords=keywords,
+                             priority=priority, description=description)
+
+
+CRITERIA = [
+    ("ifc", criterion("E-1", "E", "high", "Pollution from mining", ["tailings", "mining", "dust"])),
+    ("ifc", criterion("E-2", "E", "medium", "Renewable energy efficiency", ["solar", "energy", "batteries"])),
+    ("ifc", criterion("E-3", "E", "medium", "Water use in agriculture", ["irrigation", "water"])),
+    ("ifc", criterion("S-1", "S", "critical", "Labor and working conditions", ["workers", "wages"])),
+    ("2x", criterion("S-2", "S", "high", "Women employment", ["women", "female", "workforce"])),
+    ("2x", criterion("G-1", "G", "medium", "Board gender diversity", ["board", "women"])),
+]
+
+SOLAR = "Infrastructure Solar Power Pay-as-you-go solar home systems with batteries for rural households"
+
+
+def test_bm25_ranks_matching_criteria_first():
+    """Criteria sharing terms with the company rank first within their pillar."""
+    selection = CriteriaRetriever(CRITERIA).retrieve(SOLAR, top_k=2)
+    assert [r.criterion.id for r in selection["E"]] == ["E-2"]
+    # Critical criteria are kept even without a matching term; others are not
+    assert [r.criterion.id for r in selection["S"]] == ["S-1"]
+    assert "G" not in selection
+
+
+def test_priority_boost_and_framework_filter():
+    """Equal matches are ordered by priority, and only selected frameworks are returned."""
+    retriever = CriteriaRetriever(CRITERIA)
+    selection = retriever.retrieve("Cashew processing with a mostly female workforce of women and workers")
+    assert [r.criterion.id for r in selection["S"]][0] == "S-2"
+    only_ifc = retriever.retrieve("women workers", frameworks=["ifc"])
+    assert {r.framework for results in only_ifc.values() for r in results} == {"ifc"}
+
+
+def test_token_budget_limits_selection():
+    """The selected criteria fit in the token budget."""
+    retriever = CriteriaRetriever(CRITERIA)
+    query = "mining dust water irrigation solar energy women board workers"
+    unbounded = retriever.retrieve(query, top_k=5)
+    budget = estimate_tokens(format_criterion("ifc", CRITERIA[0][1])) * 2
+    bounded = retriever.retrieve(query, top_k=5, token_budget=budget)
+    used = sum(estimate_tokens(format_criterion(r.framework, r.criterion)) for rs in bounded.values() for r in rs)
+    assert used <= budget
+    assert sum(map(len, bounded.values())) < sum(map(len, unbounded.values()))
+
+
+def test_retrieved_criteria_go_after_the_cacheable_prefix():
+    """With retrieval on, the prefix is the same for every company and criteria go in the suffix."""
+    manager = EnhancedPromptManager(StandardsLoader(), retrieval={"enabled": True, "top_k_per_pillar": 3})
+    company = {"name": "SunHarvest", "country": "Kenya", "sector": "Infrastructure",
+               "subsector": "Solar Power", "description": "Solar home systems for rural households"}
+    parts = manager.generate_prompt_parts(company, ["ifc", "2x"])
+    other = manager.generate_prompt_parts(dict(company, description="Cashew processing"), ["ifc", "2x"])
+    assert parts.prefix == other.prefix == MASTER_PROMPT_INSTRUCTIONS
+    assert "Most Relevant Standards Criteria" in parts.suffix
+    assert "IFC Standards Context" not in parts.text
+
+
+def test_english_company_text_matches_the_shipped_french_criteria():
+    """English queries find the shipped IFC and 2X criteria, many of which are written in French."""
+    retriever = StandardsLoader().get_retriever(["ifc", "2x"])
+    query = ("Agriculture Crop farming Kenya Smallholder maize farms using irrigation and pesticides, "
+             "with seasonal workers and a mostly female workforce. The family owners plan an "
+             "environmental and social management system and board governance policies.")
+    selection = retriever.retrieve(query, top_k=5)
+
+    for pillar in ("E", "S", "G"):
+        assert sum(r.score > 0 for r in selection[pillar]) >= 3, pillar
+    ids = {pillar: [r.criterion.id for r in results if r.score > 0] for pillar, results in selection.items()}
+    # "Consommation d'eau" and "Utilisation des pesticides"
+    assert {"IFC-PS3-009", "IFC-PS3-014"} <= set(ids["E"])
+    # "Femmes dans la main-d'œuvre"
+    assert "2X-Employment-01" in ids["S"]
+    assert "IFC-PS1-005" in ids["G"]
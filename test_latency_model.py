@@ -0,0 +1,75 @@
+"""
+Tests for the per-model latency model and adaptive request timeouts.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import engine.llm_service as llm_service
+from engine.latency_model import LatencyModel
+from engine.llm_service import LLMServiceManager, ProviderType
+
+
+def request(completion_tokens, latency, success=True):
+    return SimpleNamespace(provider="openai", model="gpt-4", success=success,
+                           completion_tokens=completion_tokens, latency=latency)
+
+
+def test_fit_recovers_overhead_and_per_token_latency():
+    """Latency is fitted as overhead plus a per-token cost; failures are ignored."""
+    model = LatencyModel(min_samples=3)
+    assert model.fit("openai", "gpt-4") is None
+
+    for tokens in (100, 500, 1000, 2000):
+        model.record(request(tokens, 1.0 + 0.02 * tokens))
+    model.record(request(0, 90.0, success=False))
+
+    fit = model.fit("openai", "gpt-4")
+    assert fit.overhead == pytest.approx(1.0)
+    assert fit.seconds_per_token == pytest.approx(0.02)
+    assert model.predict("openai", "gpt-4", 3000) == pytest.approx(61.0)
+    assert model.snapshot()["openai/gpt-4"]["samples"] == 4
+
+
+def test_timeout_scales_with_max_tokens_within_bounds():
+    """Timeouts follow max_tokens, stay within bounds, and default without samples."""
+    model = LatencyModel(min_samples=2, timeout_multiplier=2.0, min_timeout=10, max_timeout=120)
+    assert model.timeout("openai", "gpt-4", 4000, default=60) == 60
+
+    for _ in range(3):
+        model.record(request(1000, 10.0))
+    assert model.timeout("openai", "gpt-4", 2000, default=60) == pytest.approx(40)
+    assert model.timeout("openai", "gpt-4", 100, default=60) == 10
+    assert model.timeout("openai", "gpt-4", 10000, default=60) == 120
+
+
+def test_manager_sizes_request_timeout_from_observed_latency(monkeypatch, tmp_path):
+    """Once enough requests are observed, the manager predicts durations and sets timeouts."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai")
+    manager = LLMServiceManager(settings={
+        "app": {"cache_dir": str(tmp_path)},
+        "llm": {"timeout": 300, "adaptive_timeouts": {"min_samples": 2, "min_timeout": 5}}
+    })
+    timeouts = []
+
+    async def fake_acompletion(**kwargs):
+        timeouts.append(kwargs["timeout"])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=500, total_tokens=510)
+        )
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+    assert manager.predict_duration(ProviderType.OPENAI, 1000) is None
+
+    service = manager.providers[ProviderType.OPENAI]
+    for _ in range(2):
+        service._notify_metrics(llm_service.RequestMetrics(
+            provider="openai", model=service.config.model, prompt_tokens=10, completion_tokens=500,
+            total_tokens=510, cost=0.0, latency=5.0, timestamp=llm_service.datetime.now(), success=True
+        ))
+    assert manager.predict_duration(ProviderType.OPENAI, 1000) == pytest.approx(10.0)
+
+    manager.generate_response("prompt", max_tokens=1000, use_cache=False)
+    assert timeouts == [pytest.approx(20.0)]
@@ -0,0 +1,574 @@
+"""
+Offline tests for the LLM service manager (litellm calls are mocked).
+"""
+
+import asyncio
+import gc
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import engine.llm_service as llm_service
+from engine.llm_service import LLMServiceManager, ProviderType, RateLimitError
+
+
+def make_response(content: str, prompt_tokens: int = 10, completion_tokens: int = 20):
+    """Build a minimal litellm-style completion response."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens
+        )
+    )
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    """LLM manager with fake API keys for every provider and a temporary cache."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-anthropic")
+    monkeypatch.setenv("FIREWORKS_API_KEY", "test-fireworks")
+    return LLMServiceManager(settings={"app": {"cache_dir": str(tmp_path)}})
+
+
+def test_sync_generate_wraps_async_path(manager, monkeypatch):
+    """The sync entry point runs through litellm.acompletion."""
+    calls = []
+
+    async def fake_acompletion(**kwargs):
+        calls.append(kwargs["model"])
+        return make_response("report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    assert manager.generate_response("prompt", primary_provider=ProviderType.OPENAI) == "report"
+    assert calls == [manager.providers[ProviderType.OPENAI].config.model]
+
+
+def test_async_fallback_to_next_provider(manager, monkeypatch):
+    """A failing primary provider falls back to the next one."""
+    anthropic_model = manager.providers[ProviderType.ANTHROPIC].config.model
+
+    async def fake_acompletion(**kwargs):
+        if kwargs["model"] != anthropic_model:
+            raise ValueError("provider down")
+        return make_response("fallback report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    result = asyncio.run(manager.agenerate_response(
+        "prompt",
+        primary_provider=ProviderType.OPENAI,
+        fallback_providers=[ProviderType.ANTHROPIC]
+    ))
+    assert result == "fallback report"
+
+
+def test_concurrent_async_requests(manager, monkeypatch):
+    """Many analyses can be in flight at once on the manager loop."""
+    async def fake_acompletion(**kwargs):
+        await asyncio.sleep(0.2)
+        return make_response(kwargs["messages"][0]["content"])
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    async def run_all():
+        return await asyncio.gather(*[
+            manager.agenerate_response(f"prompt {i}") for i in range(20)
+        ])
+
+    start = time.time()
+    results = asyncio.run(run_all())
+    elapsed = time.time() - start
+
+    assert results == [f"prompt {i}" for i in range(20)]
+    assert elapsed < 2
+
+
+def test_rate_limit_error_is_mapped(manager):
+    """litellm rate limit errors surface as the service's RateLimitError."""
+    service = manager.providers[ProviderType.OPENAI]
+    error = llm_service.litellm.RateLimitError("slow down", llm_provider="openai", model="gpt-4")
+
+    assert isinstance(service._handle_error(error, 0.0), RateLimitError)
+    other = ValueError("boom")
+    assert service._handle_error(other, 0.0) is other
+
+
+def make_stream(texts, fail_after=None):
+    """Build a litellm-style streaming response, optionally failing mid-stream."""
+    for i, text in enumerate(texts):
+        if fail_after is not None and i == fail_after:
+            raise ValueError("stream interrupted")
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=text))],
+            usage=None
+        )
+
+
+def test_stream_falls_back_before_first_token(manager, monkeypatch):
+    """Fallback happens when the primary fails before producing any text."""
+    openai_model = manager.providers[ProviderType.OPENAI].config.model
+
+    def fake_completion(**kwargs):
+        assert kwargs["stream"] is True
+        if kwargs["model"] == openai_model:
+            return make_stream(["never"], fail_after=0)
+        return make_stream(["## 1. ", "SUMMARY", " DASHBOARD"])
+
+    monkeypatch.setattr(llm_service, "completion", fake_completion)
+
+    chunks = list(manager.stream_response(
+        "prompt",
+        primary_provider=ProviderType.OPENAI,
+        fallback_providers=[ProviderType.ANTHROPIC]
+    ))
+    assert "".join(chunks) == "## 1. SUMMARY DASHBOARD"
+
+
+def test_stream_error_after_first_token_is_raised(manager, monkeypatch):
+    """Once text has been streamed, errors are not hidden by a fallback."""
+    monkeypatch.setattr(
+        llm_service, "completion",
+        lambda **kwargs: make_stream(["partial", "rest"], fail_after=1)
+    )
+
+    stream = manager.stream_response(
+        "prompt",
+        primary_provider=ProviderType.OPENAI,
+        fallback_providers=[ProviderType.ANTHROPIC]
+    )
+    assert next(stream) == "partial"
+    with pytest.raises(ValueError):
+        next(stream)
+
+
+def test_stream_skips_open_circuit_before_rate_limiting(manager, monkeypatch):
+    """A provider with an open circuit takes no limiter tokens and is skipped without waiting."""
+    manager.health.settings.update({"failure_threshold": 2, "cooldown": 60})
+    for _ in range(2):
+        manager.health.record("openai", False, 1.0)
+    admitted = []
+
+    def fake_acquire_blocking(provider, model, tokens, timeout=None):
+        admitted.append(provider)
+        return 0.0
+
+    monkeypatch.setattr(manager.rate_limiter, "acquire_blocking", fake_acquire_blocking)
+    monkeypatch.setattr(llm_service, "completion", lambda **kwargs: make_stream(["fallback"]))
+
+    chunks = list(manager.stream_response(
+        "prompt",
+        primary_provider=ProviderType.OPENAI,
+        fallback_providers=[ProviderType.ANTHROPIC],
+        use_cache=False
+    ))
+    assert chunks == ["fallback"]
+    assert admitted == ["anthropic"]
+
+
+def test_response_cache_hits_and_bypass(manager, monkeypatch):
+    """Identical requests are served from the cache unless it is bypassed."""
+    calls = []
+
+    async def fake_acompletion(**kwargs):
+        calls.append(kwargs["messages"][0]["content"])
+        return make_response(f"report {len(calls)}")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    first = manager.generate_response("Company: Acme  \r\nSector: Energy", max_tokens=500)
+    second = manager.generate_response("Company: Acme\nSector: Energy\n", max_tokens=500)
+    other_budget = manager.generate_response("Company: Acme\nSector: Energy", max_tokens=800)
+    fresh = manager.generate_response("Company: Acme\nSector: Energy", max_tokens=500, use_cache=False)
+
+    assert first == second == "report 1"
+    assert other_budget == "report 2"
+    assert fresh == "report 3"
+    stats = manager.response_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_hedged_request_prefers_fast_fallback(manager, monkeypatch):
+    """A slow primary is hedged to the fallback and the loser is cancelled."""
+    manager.hedging_settings = {"default_delay": 0.1, "min_delay": 0}
+    openai_model = manager.providers[ProviderType.OPENAI].config.model
+    recorded = []
+    for service in manager.providers.values():
+        service.metrics_listeners.append(recorded.append)
+
+    async def fake_acompletion(**kwargs):
+        if kwargs["model"] == openai_model:
+            await asyncio.sleep(5)
+            return make_response("slow report")
+        await asyncio.sleep(0.1)
+        return make_response("hedged report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    start = time.time()
+    result = manager.generate_response(
+        "prompt",
+        primary_provider=ProviderType.OPENAI,
+        fallback_providers=[ProviderType.ANTHROPIC],
+        hedge=True
+    )
+
+    assert result == "hedged report"
+    assert time.time() - start < 2
+    assert sorted((m.provider, m.success) for m in recorded) == [
+        ("anthropic", True),
+        ("openai", False)
+    ]
+
+
+def test_circuit_opens_and_skips_failing_provider(manager, monkeypatch):
+    """Repeated failures open the circuit so the provider is skipped instantly."""
+    manager.health.settings.update({"failure_threshold": 2, "cooldown": 60})
+    openai_model = manager.providers[ProviderType.OPENAI].config.model
+    manager.providers[ProviderType.OPENAI].retry_policy.max_retries = 0
+    calls = []
+
+    async def fake_acompletion(**kwargs):
+        calls.append(kwargs["model"])
+        if kwargs["model"] == openai_model:
+            raise llm_service.litellm.ServiceUnavailableError("provider down", "openai", openai_model)
+        return make_response("fallback report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    for _ in range(3):
+        manager.generate_response(
+            "prompt",
+            primary_provider=ProviderType.OPENAI,
+            fallback_providers=[ProviderType.ANTHROPIC],
+            use_cache=False
+        )
+
+    assert calls.count(openai_model) == 2
+    health = {h["provider"]: h for h in manager.get_provider_health()}
+    assert health["openai"]["state"] == "open"
+    assert health["anthropic"]["state"] == "closed"
+
+
+def test_client_errors_do_not_open_the_circuit(manager, monkeypatch):
+    """Bad requests fail over without counting against the provider's health."""
+    manager.health.settings.update({"failure_threshold": 1})
+    openai_model = manager.providers[ProviderType.OPENAI].config.model
+
+    async def fake_acompletion(**kwargs):
+        if kwargs["model"] == openai_model:
+            raise llm_service.litellm.BadRequestError("context window exceeded", openai_model, "openai")
+        return make_response("fallback report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    for _ in range(2):
+        manager.generate_response(
+            "prompt",
+            primary_provider=ProviderType.OPENAI,
+            fallback_providers=[ProviderType.ANTHROPIC],
+            use_cache=False
+        )
+    health = {h["provider"]: h for h in manager.get_provider_health()}
+    assert health["openai"]["state"] == "closed"
+    assert health["anthropic"]["requests"] == 2
+
+
+def test_unused_fallback_keeps_its_half_open_probe(manager, monkeypatch):
+    """A half-open fallback is only probed when it is actually called."""
+    manager.health.settings.update({"failure_threshold": 1, "cooldown": 60})
+    manager.health.record("anthropic", False, 1.0)
+    manager.health._breaker("anthropic").opened_at -= 60  # Cooldown over: half-open on next check
+
+    async def fake_acompletion(**kwargs):
+        return make_response("report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    for _ in range(2):
+        manager.generate_response(
+            "prompt",
+            primary_provider=ProviderType.OPENAI,
+            fallback_providers=[ProviderType.ANTHROPIC],
+            use_cache=False
+        )
+    assert manager.health.allow_request("anthropic")
+
+
+def test_circuit_half_open_probe_closes_on_success():
+    """After the cooldown a single probe is allowed and success closes the circuit."""
+    from engine.health import CircuitBreaker, CircuitState
+
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+    breaker.record_failure(1.0)
+    assert breaker.state == CircuitState.OPEN
+
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record_success(0.5)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_sections_generated_concurrently_in_order(manager, monkeypatch):
+    """Sections run in parallel, bounded by max_concurrency, and keep report order."""
+    in_flight = []
+    peak = []
+
+    async def fake_acompletion(**kwargs):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.3 if "slow" in kwargs["messages"][0]["content"] else 0.1)
+        in_flight.pop()
+        return make_response(kwargs["messages"][0]["content"].upper())
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    prompts = {"summary": "slow summary", "impact": "impact", "dd_checklist": "checklist"}
+    gc.collect()  # Keep a collection of earlier tests' managers out of the timed window
+    start = time.time()
+    sections = manager.generate_sections(prompts, max_concurrency=2)
+
+    assert list(sections) == ["summary", "impact", "dd_checklist"]
+    assert sections["summary"] == "SLOW SUMMARY"
+    assert max(peak) == 2
+    assert time.time() - start < 0.6
+
+
+def test_failed_section_is_left_out(manager, monkeypatch):
+    """A failing section does not sink the other sections."""
+    async def fake_acompletion(**kwargs):
+        if kwargs["messages"][0]["content"] == "broken":
+            raise ValueError("bad section")
+        return make_response("ok")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    sections = manager.generate_sections({"summary": "fine", "impact": "broken"})
+    assert sections == {"summary": "ok"}
+
+
+def test_prompt_prefix_cached_by_provider(manager, monkeypatch):
+    """Anthropic gets the prefix as a cache-control block and cache reads are recorded."""
+    requests = []
+
+    async def fake_acompletion(**kwargs):
+        requests.append(kwargs["messages"])
+        response = make_response("report", prompt_tokens=1000)
+        response.usage.prompt_tokens_details = SimpleNamespace(cached_tokens=900)
+        return response
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    for provider in (ProviderType.ANTHROPIC, ProviderType.OPENAI):
+        manager.generate_response("company", primary_provider=provider, prompt_prefix="standards")
+
+    anthropic_content = requests[0][0]["content"]
+    assert anthropic_content[0] == {
+        "type": "text", "text": "standards", "cache_control": {"type": "ephemeral"}
+    }
+    assert anthropic_content[1]["text"] == "company"
+    assert requests[1][0]["content"] == "standardscompany"
+    assert [row["cached_tokens"] for row in manager.metrics.recent] == [900, 900]
+
+
+def test_provider_calls_share_pooled_http_client(manager, monkeypatch):
+    """Every provider call goes through the manager's pooled keep-alive connections."""
+    clients = {}
+
+    async def fake_acompletion(**kwargs):
+        clients[kwargs["model"]] = kwargs.get("client")
+        return make_response("report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    for provider in ProviderType:
+        manager.generate_response("company", primary_provider=provider, use_cache=False)
+
+    pool = manager.http_pool
+    anthropic_model = manager.providers[ProviderType.ANTHROPIC].config.model
+    deepseek_model = manager.providers[ProviderType.DEEPSEEK].config.model
+    assert clients[anthropic_model] is clients[deepseek_model] is pool.handler(asynchronous=True)
+    assert clients[manager.providers[ProviderType.OPENAI].config.model] is None
+    assert llm_service.litellm.aclient_session is pool.aclient
+    assert pool.handler(asynchronous=True).client._transport is pool.aclient._transport
+
+
+def test_identical_in_flight_requests_are_coalesced(manager, monkeypatch):
+    """Concurrent identical requests from sync and async callers share one completion."""
+    calls = []
+
+    async def fake_acompletion(**kwargs):
+        calls.append(kwargs["messages"][0]["content"])
+        await asyncio.sleep(0.3)
+        return make_response("shared report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    async def run_all():
+        sync_call = asyncio.to_thread(manager.generate_response, "same deal", use_cache=False)
+        return await asyncio.gather(
+            sync_call,
+            *[manager.agenerate_response("same deal  ", use_cache=False) for _ in range(3)],
+            manager.agenerate_response("other deal", use_cache=False)
+        )
+
+    results = asyncio.run(run_all())
+
+    assert results == ["shared report"] * 5
+    assert sorted(calls) == ["other deal", "same deal"]
+    assert manager.single_flight.coalesced == 3
+
+
+def test_cache_bypass_and_hedging_do_not_share_flights(manager, monkeypatch):
+    """Requests that differ only in use_cache or hedge are sent separately."""
+    calls = []
+
+    async def fake_acompletion(**kwargs):
+        calls.append(kwargs["messages"][0]["content"])
+        await asyncio.sleep(0.3)
+        return make_response("report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    async def run_all():
+        return await asyncio.gather(
+            manager.agenerate_response("same deal"),
+            manager.agenerate_response("same deal", use_cache=False),
+            manager.agenerate_response("same deal", use_cache=False, hedge=True)
+        )
+
+    asyncio.run(run_all())
+    assert calls == ["same deal"] * 3
+    assert manager.single_flight.coalesced == 0
+    assert manager.single_flight.in_flight() == 0
+
+
+def test_coalesced_callers_share_errors_and_survive_cancellation(manager, monkeypatch):
+    """Every waiter gets the shared error; one waiter cancelling does not cancel the call."""
+    async def failing_acompletion(**kwargs):
+        await asyncio.sleep(0.2)
+        raise ValueError("provider down")
+
+    monkeypatch.setattr(llm_service, "acompletion", failing_acompletion)
+
+    async def run_failing():
+        return await asyncio.gather(
+            *[manager.agenerate_response("deal", use_cache=False) for _ in range(2)],
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run_failing())
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def slow_acompletion(**kwargs):
+        await asyncio.sleep(0.3)
+        return make_response("report")
+
+    monkeypatch.setattr(llm_service, "acompletion", slow_acompletion)
+
+    async def run_cancelled():
+        first = asyncio.create_task(manager.agenerate_response("deal", use_cache=False))
+        second = asyncio.create_task(manager.agenerate_response("deal", use_cache=False))
+        await asyncio.sleep(0.1)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run_cancelled()) == "report"
+
+
+VALID_REPORT = "## 1. SUMMARY DASHBOARD\n| Item | Value |\n|---|---|\n| Risk | Cat B |\n## 2. E&S CLASSIFICATION\nCat B"
+REQUIRED_SECTIONS = ["1. SUMMARY DASHBOARD", "2. E&S CLASSIFICATION"]
+
+
+def test_cascade_served_by_fast_tier_when_report_validates(manager, monkeypatch):
+    """A valid fast-tier report is returned without calling the premium model."""
+    models = []
+
+    async def fake_acompletion(**kwargs):
+        models.append(kwargs["model"])
+        return make_response(VALID_REPORT)
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+    manager.cascade_settings = {"fast_models": {"openai": "gpt-3.5-turbo"}}
+
+    result = manager.generate_cascade("prompt", required_sections=REQUIRED_SECTIONS)
+
+    assert result.tier == "fast" and not result.escalated
+    assert models == ["gpt-3.5-turbo"]
+    assert result.saved_cost > 0
+    assert manager.metrics.cascade_summary()["requests"] == {"fast": 1}
+
+    saved = manager.metrics.cascade_summary()["saved_cost"]
+    cached = manager.generate_cascade("prompt", required_sections=REQUIRED_SECTIONS)
+    assert cached.tier == "fast" and cached.saved_cost == 0 and cached.saved_latency is None
+    assert models == ["gpt-3.5-turbo"]
+    assert manager.metrics.cascade_summary()["saved_cost"] == saved
+
+
+def test_cascade_escalates_on_invalid_report(manager, monkeypatch):
+    """Missing sections or broken tables escalate to the premium model."""
+    premium_model = manager.providers[ProviderType.OPENAI].config.model
+
+    async def fake_acompletion(**kwargs):
+        if kwargs["model"] == "gpt-3.5-turbo":
+            return make_response("## 1. SUMMARY DASHBOARD\n| Item | Value |\n| Risk |")
+        return make_response(VALID_REPORT)
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+    manager.cascade_settings = {"fast_models": {"openai": "gpt-3.5-turbo"}}
+
+    result = manager.generate_cascade("prompt", required_sections=REQUIRED_SECTIONS)
+
+    assert result.tier == "premium" and result.escalated
+    assert result.model == premium_model
+    assert result.text == VALID_REPORT
+    assert "missing section: 2. E&S CLASSIFICATION" in result.reasons
+    assert any(reason.startswith("table 1") for reason in result.reasons)
+    assert result.saved_cost <= 0
+
+
+def test_cascade_escalates_to_the_selected_model(manager, monkeypatch):
+    """The premium tier answers with the model chosen by the caller."""
+    models = []
+
+    async def fake_acompletion(**kwargs):
+        models.append(kwargs["model"])
+        return make_response("no sections" if kwargs["model"] == "gpt-3.5-turbo" else VALID_REPORT)
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+    manager.cascade_settings = {"fast_models": {"openai": "gpt-3.5-turbo"}}
+
+    result = manager.generate_cascade("prompt", required_sections=REQUIRED_SECTIONS, model="gpt-4")
+
+    assert models == ["gpt-3.5-turbo", "gpt-4"]
+    assert result.tier == "premium" and result.model == "gpt-4"
+
+
+def test_close_stops_the_loop_and_closes_the_stores(monkeypatch, tmp_path):
+    """Closing a manager releases its loop thread, metrics database and response cache."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai")
+    manager = LLMServiceManager(settings={
+        "app": {"cache_dir": str(tmp_path)},
+        "llm": {"metrics": {"store_path": str(tmp_path / "metrics.db")}}
+    })
+
+    async def fake_acompletion(**kwargs):
+        return make_response("report")
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+    manager.generate_response("prompt", primary_provider=ProviderType.OPENAI)
+    thread = manager._loop_thread
+    assert thread.is_alive()
+    assert manager.metrics.store is not None
+
+    manager.close()
+
+    assert not thread.is_alive()
+    assert manager.metrics.store is None
+    assert manager.response_cache.get("missing") is None
+    assert manager.response_cache.stats()["entries"] == 0
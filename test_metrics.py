@@ -0,0 +1,89 @@
+"""
+Tests for the LLM metrics registry and its exporters.
+"""
+
+import socket
+import threading
+import urllib.request
+from datetime import datetime
+from types import SimpleNamespace
+
+from engine.llm_service import RequestMetrics, REQUEST_CANCELLED
+from engine.metrics import MetricsRegistry
+
+
+def make_metrics(latency: float, success: bool = True, error: str = None) -> RequestMetrics:
+    return RequestMetrics(
+        provider="openai",
+        model="gpt-4",
+        prompt_tokens=100 if success else 0,
+        completion_tokens=50 if success else 0,
+        total_tokens=150 if success else 0,
+        cost=0.01 if success else 0.0,
+        latency=latency,
+        timestamp=datetime.now(),
+        success=success,
+        error=error
+    )
+
+
+def test_summary_and_prometheus_export(tmp_path):
+    """Requests are aggregated into counters, histograms and percentiles."""
+    registry = MetricsRegistry(
+        store_path=str(tmp_path / "metrics.sqlite"),
+        cancelled_errors=[REQUEST_CANCELLED]
+    )
+    for latency in (1.0, 2.0, 3.0, 40.0):
+        registry.record(make_metrics(latency))
+    registry.record(make_metrics(0.5, success=False, error="RateLimitError: slow down"))
+    registry.record(make_metrics(0.2, success=False, error=REQUEST_CANCELLED))
+
+    summary = registry.summary()[0]
+    assert summary["requests"] == 6
+    assert summary["p95_latency"] == 40.0
+    assert summary["tokens"] == 600
+
+    text = registry.to_prometheus()
+    assert 'esg_llm_requests_total{provider="openai",model="gpt-4",status="success"} 4' in text
+    assert 'status="cancelled"} 1' in text
+    assert 'esg_llm_errors_total{provider="openai",model="gpt-4",error="RateLimitError"} 1' in text
+    assert 'esg_llm_request_latency_seconds_bucket{provider="openai",model="gpt-4",le="2"} 2' in text
+    assert 'esg_llm_request_latency_seconds_count{provider="openai",model="gpt-4"} 4' in text
+
+    rows = registry.store.query()
+    assert len(rows) == 6
+    reopened = MetricsRegistry(store_path=str(tmp_path / "metrics.sqlite"))
+    assert len(reopened.store.query()) == 6
+
+
+def test_store_writes_in_background_and_flushes_on_close(tmp_path, monkeypatch):
+    """Recording only queues rows; the writer thread persists them, and close() drains the queue."""
+    registry = MetricsRegistry(store_path=str(tmp_path / "metrics.sqlite"))
+    writers = []
+    execute_many = registry.store._conn.executemany
+    monkeypatch.setattr(registry.store, "_conn", SimpleNamespace(
+        executemany=lambda *args: writers.append(threading.current_thread().name) or execute_many(*args),
+        commit=registry.store._conn.commit,
+        close=registry.store._conn.close
+    ))
+    for latency in (1.0, 2.0, 3.0):
+        registry.record(make_metrics(latency))
+    registry.close()
+
+    assert writers and set(writers) == {"llm-metrics-writer"}
+    assert len(MetricsRegistry(store_path=str(tmp_path / "metrics.sqlite")).store.query()) == 3
+
+
+def test_http_endpoint_serves_prometheus_text():
+    """The optional HTTP exporter serves the registry at /metrics."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    registry = MetricsRegistry()
+    registry.record(make_metrics(1.0))
+    registry.start_http_server(port)
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        body = response.read().decode("utf-8")
+    assert "esg_llm_tokens_total" in body
@@ -0,0 +1,56 @@
+"""
+Tests for the client-side RPM/TPM rate limiter.
+"""
+
+import asyncio
+import time
+
+from engine.rate_limiter import RateLimiter
+
+
+def test_unconfigured_provider_is_not_throttled():
+    """Providers without limits are admitted immediately."""
+    limiter = RateLimiter({"openai": {"rpm": 1}})
+    assert limiter.acquire_blocking("anthropic", "claude", 10_000) == 0.0
+
+
+def test_token_budget_delays_admission():
+    """Requests wait until the TPM bucket has refilled enough tokens."""
+    limiter = RateLimiter({"openai": {"tpm": 600}})  # refills 10 tokens per second
+
+    limiter.acquire_blocking("openai", "gpt-4", 600)
+    start = time.monotonic()
+    limiter.acquire_blocking("openai", "gpt-4", 5)
+    assert 0.3 < time.monotonic() - start < 2
+
+
+def test_model_override_uses_separate_bucket():
+    """Per-model limits get their own bucket."""
+    limiter = RateLimiter({"openai": {"tpm": 600, "models": {"gpt-4": {"tpm": 60_000}}}})
+
+    limiter.acquire_blocking("openai", "gpt-3.5-turbo", 600)
+    start = time.monotonic()
+    limiter.acquire_blocking("openai", "gpt-4", 600)
+    assert time.monotonic() - start < 0.1
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    """Queued requests are served first come, first served."""
+    limiter = RateLimiter({"openai": {"tpm": 6000}}, poll_interval=0.01)  # 100 tokens per second
+    limiter.acquire_blocking("openai", "gpt-4", 6000)
+    admitted = []
+
+    async def request(name: str, tokens: int, delay: float):
+        await asyncio.sleep(delay)
+        await limiter.acquire("openai", "gpt-4", tokens)
+        admitted.append(name)
+
+    async def run_all():
+        await asyncio.gather(
+            request("large", 30, 0.0),
+            request("small", 1, 0.02),
+            request("last", 1, 0.04)
+        )
+
+    asyncio.run(run_all())
+    assert admitted == ["large", "small", "last"]
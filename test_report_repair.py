@@ -0,0 +1,119 @@
+"""
+Tests for targeted repair of missing or malformed report sections.
+"""
+
+from engine.report_repair import find_sections_to_repair, repair_report
+from formatters.docx_formatter import DocxFormatter
+from prompts.enhanced_prompts import REPORT_SECTIONS, EnhancedPromptManager, assemble_report
+from utils.llm_report_parser import parse_llm_report
+
+COMPANY = {
+    "name": "SolarCo",
+    "sector": "Energy",
+    "subsector": "Solar",
+    "country": "Kenya",
+    "description": "Off-grid solar home systems."
+}
+
+
+class StubStandardsLoader:
+    def get_ifc_standards(self) -> str:
+        return "PS1 Assessment and Management of E&S Risks"
+
+
+class RecordingManager:
+    """Stands in for LLMServiceManager.generate_sections."""
+
+    def __init__(self):
+        self.prompts = {}
+        self.kwargs = {}
+
+    def generate_sections(self, section_prompts, **kwargs):
+        self.prompts = section_prompts
+        self.kwargs = kwargs
+        return {section: f"Repaired {section} content." for section in section_prompts}
+
+
+def full_sections():
+    return {section: f"## {heading}\n\n{section} content." for section, heading in REPORT_SECTIONS}
+
+
+def test_only_defective_sections_are_regenerated_and_spliced():
+    """Missing and malformed sections are re-requested with context and spliced in order."""
+    sections = full_sections()
+    del sections["stakeholder"]
+    sections["summary"] = "## 1. SUMMARY DASHBOARD\n\n| Item | Value |\n| Risk | B |"
+    report = assemble_report(sections)
+    assert set(find_sections_to_repair(report)) == {"summary", "stakeholder"}
+
+    manager = RecordingManager()
+    result = repair_report(manager, EnhancedPromptManager(StubStandardsLoader()), report, COMPANY, ["ifc"],
+                           temperature=0.2)
+
+    assert list(manager.prompts) == ["summary", "stakeholder"]
+    assert "ifc_analysis content." in manager.prompts["stakeholder"]
+    assert "impact content." in manager.prompts["stakeholder"]
+    assert manager.kwargs == {"temperature": 0.2}
+    assert result.repaired == ["summary", "stakeholder"]
+    assert not result.remaining
+
+    report = result.report
+    assert "| Risk | B |" not in report
+    positions = [report.index(heading) for _, heading in REPORT_SECTIONS]
+    assert positions == sorted(positions)
+    assert "Repaired stakeholder content." in report
+    assert report.count("## 1. SUMMARY DASHBOARD") == 1
+
+
+def test_complete_report_is_left_alone():
+    """A report without defects makes no requests."""
+    report = assemble_report(full_sections())
+    manager = RecordingManager()
+    result = repair_report(manager, EnhancedPromptManager(StubStandardsLoader()), report, COMPANY, ["ifc"])
+
+    assert result.report == report
+    assert result.repaired == [] and manager.prompts == {}
+
+
+def test_repaired_report_is_parsed_for_export():
+    """The numbered template sections, repaired ones included, fill the DOCX analysis fields."""
+    sections = full_sections()
+    del sections["dd_checklist"]
+    sections["impact"] = (
+        "## 5. IMPACT ANALYSIS\n\n| Pillar | Assessment |\n|---|---|\n"
+        "| Decent jobs & job creation | Aligned |\n| Gender lens & empowerment | Partially aligned |"
+    )
+    manager = RecordingManager()
+    report = repair_report(manager, EnhancedPromptManager(StubStandardsLoader()),
+                           assemble_report(sections), COMPANY, ["ifc"]).report
+
+    analysis = parse_llm_report(report, "SolarCo")
+    assert analysis["executive_summary"] == "summary content."
+    assert analysis["environmental_analysis"] == "es_classification content.\n\nifc_analysis content."
+    assert analysis["social_analysis"] == "stakeholder content."
+    assert analysis["impact_alignment"]["decent_jobs"] == "Aligned"
+    assert analysis["impact_alignment"]["gender_empowerment"] == "Partially aligned"
+    assert analysis["recommendations"]["due_diligence"] == ["Repaired dd_checklist content."]
+
+
+def test_parsed_report_fills_every_docx_table_row():
+    """Each climate aspect and impact area of a numbered report gets its own DOCX row."""
+    sections = full_sections()
+    sections["impact"] = (
+        "## 5. IMPACT ANALYSIS\n\n| Pillar | Assessment |\n|---|---|\n"
+        "| Decent jobs & job creation | Aligned |\n| Resilience | Not aligned |"
+    )
+    analysis = parse_llm_report(assemble_report(sections), "SolarCo")
+
+    formatter = DocxFormatter()
+    formatter.format_analysis(analysis)
+    rows = {
+        table.rows[0].cells[0].text: [(row.cells[0].text, row.cells[1].text) for row in table.rows[1:]]
+        for table in formatter.document.tables
+    }
+    assert [label for label, _ in rows["Aspect"]] == [
+        "Climate Solutions", "Vulnerability", "Adaptation", "Carbon Footprint", "Decoupling Potential"
+    ]
+    assert rows["Impact Area"][1] == ("Decent Jobs", "Aligned")
+    assert rows["Impact Area"][4] == ("Resilience", "Not aligned")
+    assert rows["Impact Area"][-1][0] == "Overall Impact"
@@ -0,0 +1,102 @@
+"""
+Tests for the deadline-aware retry engine.
+"""
+
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import engine.llm_service as llm_service
+from engine.llm_service import LLMServiceManager, ProviderType
+from engine.retry import Deadline, DeadlineExceededError, RetryPolicy, retry_after_seconds, retry_call
+
+
+class Transient(Exception):
+    pass
+
+
+def rate_limit_error(retry_after_ms: str):
+    response = httpx.Response(429, headers={"retry-after-ms": retry_after_ms},
+                              request=httpx.Request("POST", "https://api.test"))
+    return llm_service.litellm.RateLimitError("slow down", llm_provider="openai", model="gpt-4",
+                                              response=response)
+
+
+def test_backoff_is_jittered_and_capped():
+    """Backoff grows from retry_delay with equal jitter and never exceeds max_delay."""
+    policy = RetryPolicy(base_delay=2, max_delay=5)
+    for retry, cap in [(0, 2), (1, 4), (4, 5)]:
+        delays = [policy.backoff(retry) for _ in range(50)]
+        assert all(cap / 2 <= d <= cap for d in delays)
+        assert len(set(delays)) > 1
+
+
+def test_retries_stop_at_max_retries_and_skip_non_retryable():
+    """Only retryable errors are retried, at most max_retries times."""
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        raise Transient("flaky")
+
+    policy = RetryPolicy(max_retries=2, base_delay=0.01, attempt_timeout=30, retryable=(Transient,))
+    with pytest.raises(Transient):
+        retry_call(attempt, policy)
+    assert calls == [30, 30, 30]
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        retry_call(lambda timeout: calls.append(timeout) or int("x"), policy)
+    assert len(calls) == 1
+
+
+def test_retry_skipped_when_it_cannot_finish_before_deadline():
+    """A retry whose wait would run past the deadline is not attempted."""
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        raise Transient("flaky")
+
+    policy = RetryPolicy(max_retries=5, base_delay=4, attempt_timeout=60, min_attempt_time=1,
+                         retryable=(Transient,))
+    start = time.monotonic()
+    with pytest.raises(Transient):
+        retry_call(attempt, policy, Deadline(3))
+    assert len(calls) == 1
+    assert calls[0] <= 3
+    assert time.monotonic() - start < 1
+
+    expired = Deadline(0.001)
+    time.sleep(0.01)
+    with pytest.raises(DeadlineExceededError):
+        retry_call(attempt, policy, expired)
+
+
+def test_provider_honors_retry_after(monkeypatch, tmp_path):
+    """The service waits the provider's Retry-After and then succeeds."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai")
+    manager = LLMServiceManager(settings={
+        "app": {"cache_dir": str(tmp_path)},
+        "llm": {"retry_delay": 30, "max_retries": 2}
+    })
+    error = rate_limit_error("200")
+    assert retry_after_seconds(manager.providers[ProviderType.OPENAI]._handle_error(error, 0.0)) == 0.2
+
+    attempts = []
+
+    async def fake_acompletion(**kwargs):
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise rate_limit_error("200")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=1, completion_tokens=1, total_tokens=2)
+        )
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+
+    assert manager.generate_response("prompt", use_cache=False) == "ok"
+    assert 0.2 <= attempts[1] - attempts[0] < 5
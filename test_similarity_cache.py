@@ -0,0 +1,61 @@
+"""
+Tests for the TF-IDF near-duplicate analysis lookup.
+"""
+
+from engine.similarity_cache import SimilarityCache
+
+COMPANY = {
+    "name": "SolarCo",
+    "sector": "Energy",
+    "subsector": "Solar",
+    "country": "Kenya",
+    "description": "Off-grid solar home systems sold on pay-as-you-go plans to rural households."
+}
+
+
+def test_lightly_edited_description_hits_previous_report(tmp_path):
+    """A re-screen with a small edit is served the prior report; other companies are not."""
+    cache = SimilarityCache(cache_dir=str(tmp_path), threshold=0.7)
+    cache.add(COMPANY, ["ifc", "2x"], "standard", "previous report")
+    cache.add(
+        {"name": "AgriCo", "sector": "Agriculture", "country": "Ghana",
+         "description": "Cocoa processing and export for international chocolate makers."},
+        ["ifc", "2x"], "standard", "agri report"
+    )
+
+    edited = dict(COMPANY, description=COMPANY["description"] + " Expanding to Uganda.")
+    match = cache.lookup(edited, ["2x", "ifc"], "standard")
+    assert match is not None
+    assert match.report == "previous report"
+    assert match.company_name == "SolarCo"
+    assert match.score >= 0.7
+
+    assert cache.lookup(edited, ["ifc"], "detailed") is None
+    unrelated = dict(COMPANY, sector="Finance", subsector="Banking", country="Peru",
+                     description="Microfinance lending to small retailers in Lima.")
+    assert cache.lookup(unrelated, ["ifc", "2x"], "standard") is None
+
+
+def test_index_is_persisted(tmp_path):
+    """The sparse matrix and entries are reloaded by a new instance."""
+    SimilarityCache(cache_dir=str(tmp_path)).add(COMPANY, ["ifc"], "standard", "saved report")
+
+    reloaded = SimilarityCache(cache_dir=str(tmp_path))
+    assert len(reloaded.entries) == 1
+    assert reloaded.lookup(COMPANY, ["ifc"], "standard").report == "saved report"
+
+    reloaded.clear()
+    assert SimilarityCache(cache_dir=str(tmp_path)).lookup(COMPANY, ["ifc"], "standard") is None
+
+
+def test_hit_for_another_company_is_not_the_same_company(tmp_path):
+    """A near-identical profile under another name matches but must not be reused as-is."""
+    cache = SimilarityCache(cache_dir=str(tmp_path), threshold=0.7)
+    cache.add(COMPANY, ["ifc"], "standard", "SolarCo report")
+
+    other = dict(COMPANY, name="BrightPower")
+    match = cache.lookup(other, ["ifc"], "standard")
+    assert match is not None
+    assert match.company_name == "SolarCo"
+    assert not match.is_same_company(other["name"])
+    assert match.is_same_company("  solarco ")
@@ -0,0 +1,56 @@
+"""
+Tests for the criteria indexes of the standards loader.
+"""
+
+import pytest
+
+from standards.index import CriteriaIndex
+from standards.loader import ESGStandard, StandardCriterion, StandardsLoader
+
+
+def criterion(id, pillar, priority, section, keywords):
+    return StandardCriterion(id=id, title=id, pillar=pillar, section=section, keywords=keywords,
+                             priority=priority, description=f"{id} description")
+
+
+STANDARD = ESGStandard(name="Test", version="1", criteria=[
+    criterion("T-1", "E", "critical", "Pollution Prevention", ["GHG emissions", "water"]),
+    criterion("T-2", "S", "high", "Labor Conditions", ["wages", "child labor"]),
+    criterion("T-3", "E", "high", "Pollution Prevention", ["waste", "Water"]),
+    criterion("T-4", "G", "medium", "Governance", ["board"]),
+])
+
+
+def test_select_combines_filters_in_standard_order():
+    """Filters intersect across keys and union within a key."""
+    index = CriteriaIndex.build("test", STANDARD)
+    assert [c.id for c in index.select(pillar="E")] == ["T-1", "T-3"]
+    assert [c.id for c in index.select(priority=["critical", "high"], pillar="e")] == ["T-1", "T-3"]
+    assert [c.id for c in index.select(section="pollution  prevention", priority="high")] == ["T-3"]
+    assert [c.id for c in index.select(keyword="water")] == ["T-1", "T-3"]
+    assert [c.id for c in index.select(keyword="Child Labor")] == ["T-2"]
+    assert [c.id for c in index.select(keyword="emissions")] == ["T-1"]
+    assert index.select(pillar="G", priority="critical") == []
+    assert len(index.select()) == 4
+    assert index.get("T-4").pillar == "G"
+
+
+def test_indexes_are_read_only():
+    """Indexes cannot be modified once built."""
+    index = CriteriaIndex.build("test", STANDARD)
+    with pytest.raises(TypeError):
+        index.by_pillar["E"] = frozenset()
+    with pytest.raises(AttributeError):
+        index.criteria = ()
+
+
+def test_loader_queries_across_frameworks():
+    """The loader builds each index once and queries frameworks in the order given."""
+    loader = StandardsLoader()
+    assert loader.get_index("ifc") is loader.get_index("ifc")
+    assert loader.get_index("missing") is None
+    critical = loader.find_criteria(["internal", "ifc"], priority="critical")
+    ids = [c.id for c in critical]
+    assert ids[0] == "INT-001" and "IFC-PS1-005" in ids
+    assert ids.index("IPAE3-ESG-002") < ids.index("IFC-PS1-005")
+    assert loader.get_criteria_by_pillar("ifc", "G") == loader.find_criteria(["ifc"], pillar="G")
@@ -0,0 +1,92 @@
+"""
+Tests for the section index over the Markdown standard documents.
+"""
+
+import json
+
+from standards.loader import StandardsLoader
+from standards.sections import SectionIndexStore, parse_sections
+
+DOCUMENT = """# PS1 – Assessment and Management
+
+## Introduction
+
+### 1.
+Intro paragraph.
+
+## Requirements
+
+### Policy
+
+### 6.
+The client will establish a policy.
+
+### Management Programs
+
+### 13.
+Management programs text.
+
+### 14.
+More programs text.
+
+# Performance Standard 2: Labor
+
+## Requirements
+
+### Management Programs
+
+### 5.
+Labor programs.
+"""
+
+
+def test_numbered_paragraphs_nest_under_named_headings():
+    """'### 6.' belongs to the preceding '### Policy', not beside it."""
+    nodes = parse_sections(DOCUMENT.encode("utf-8"))
+    titles = {n.title: n for n in nodes}
+    policy = titles["Policy"]
+    assert nodes[titles["6."].parent] is policy
+    assert nodes[policy.parent].title == "Requirements"
+    assert nodes[titles["Management Programs"].parent].title == "Requirements"
+
+
+def test_lookups_read_exact_byte_ranges(tmp_path):
+    """Sections are found by title within a standard and read from their byte range."""
+    path = tmp_path / "standard.md"
+    path.write_text(DOCUMENT, encoding="utf-8")
+    index = SectionIndexStore().get(path)
+
+    programs = index.resolve("Management Programs", within="PS1")
+    text = index.read(programs)
+    assert text.startswith("### Management Programs")
+    assert "More programs text." in text
+    assert "Performance Standard 2" not in text
+
+    assert index.read(index.resolve("Management Programs", within="PS2"), include_heading=False).endswith(
+        "Labor programs."
+    )
+    assert index.read(index.paragraph(6, within="PS1")) == "### 6.\nThe client will establish a policy."
+    assert index.resolve("Missing Section", within="PS1") is None
+
+
+def test_index_is_persisted_and_rebuilt_on_change(tmp_path):
+    """A saved index is reused by a new store until the document's content changes."""
+    path = tmp_path / "standard.md"
+    path.write_text(DOCUMENT, encoding="utf-8")
+    index_dir = tmp_path / "sections"
+    SectionIndexStore(str(index_dir)).get(path)
+    saved = next(index_dir.glob("*.json"))
+    assert len(json.loads(saved.read_text())["nodes"]) == len(parse_sections(DOCUMENT.encode("utf-8")))
+
+    path.write_text("# Preface\n\nNew text.\n\n" + DOCUMENT, encoding="utf-8")
+    index = SectionIndexStore(str(index_dir)).get(path)
+    assert index.read(index.paragraph(6, within="PS1")).endswith("establish a policy.")
+
+
+def test_loader_reads_the_section_of_a_criterion():
+    """IFC criteria resolve to their section within their Performance Standard."""
+    loader = StandardsLoader()
+    criterion = loader.load_standard("ifc").criteria[0]
+    text = loader.get_criterion_text("ifc", criterion)
+    assert text.startswith(f"### {criterion.section}")
+    assert loader.get_criterion_text("ifc", criterion, max_chars=50) == text[:50].strip()
@@ -0,0 +1,77 @@
+"""
+Tests for the compiled standards snapshot.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from standards.loader import StandardsLoader
+
+
+@pytest.fixture
+def standards_dir(tmp_path):
+    """A copy of the shipped standards that tests can edit."""
+    return shutil.copytree("standards", tmp_path / "standards", ignore=shutil.ignore_patterns("__pycache__"))
+
+
+def no_parsing(self, framework):
+    raise AssertionError(f"{framework} was parsed instead of read from the snapshot")
+
+
+def test_snapshot_is_built_once_and_reused(standards_dir, tmp_path, monkeypatch):
+    """A second process-like loader reads every framework from the snapshot."""
+    snapshot = tmp_path / "standards.snapshot"
+    expected = StandardsLoader(str(standards_dir), snapshot_path=str(snapshot)).get_all_standards()
+    assert snapshot.exists()
+    assert set(expected) == set(StandardsLoader.FRAMEWORKS)
+
+    monkeypatch.setattr(StandardsLoader, "_parse_standard", no_parsing)
+    loaded = StandardsLoader(str(standards_dir), snapshot_path=str(snapshot)).get_all_standards()
+    assert loaded == expected
+
+
+def test_snapshot_is_rebuilt_when_a_source_changes(standards_dir, tmp_path, monkeypatch):
+    """Touching a file keeps the snapshot; changing its content rebuilds it."""
+    snapshot = tmp_path / "standards.snapshot"
+    StandardsLoader(str(standards_dir), snapshot_path=str(snapshot)).load_standard("ifc")
+
+    yaml_path = standards_dir / "ifc" / "ifc.yaml"
+    stat = yaml_path.stat()
+    os.utime(yaml_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with monkeypatch.context() as patch:
+        patch.setattr(StandardsLoader, "_parse_standard", no_parsing)
+        StandardsLoader(str(standards_dir), snapshot_path=str(snapshot)).load_standard("ifc")
+
+    yaml_path.write_text(yaml_path.read_text(encoding="utf-8").replace(
+        'name: "IFC Performance Standards"', 'name: "IFC Performance Standards (edited)"'
+    ), encoding="utf-8")
+    standard = StandardsLoader(str(standards_dir), snapshot_path=str(snapshot)).load_standard("ifc")
+    assert standard.name == "IFC Performance Standards (edited)"
+
+
+def test_frameworks_are_read_from_the_snapshot_file_on_demand(standards_dir, tmp_path, monkeypatch):
+    """Only the index stays in memory; evicted frameworks are re-read from the file."""
+    snapshot = tmp_path / "standards.snapshot"
+    StandardsLoader(str(standards_dir), snapshot_path=str(snapshot)).get_all_standards()
+
+    monkeypatch.setattr(StandardsLoader, "_parse_standard", no_parsing)
+    loader = StandardsLoader(str(standards_dir), snapshot_path=str(snapshot), max_cached_criteria=1)
+    ifc = loader.load_standard("ifc")
+    assert all(isinstance(entry, tuple) for entry in loader._snapshot.entries.values())
+
+    loader.load_standard("2x")
+    assert "ifc" not in loader._standards_cache
+    assert loader.load_standard("ifc") == ifc
+
+
+def test_replaced_snapshot_falls_back_to_parsing(standards_dir, tmp_path):
+    """A snapshot rewritten after it was indexed is not read at stale offsets."""
+    snapshot = tmp_path / "standards.snapshot"
+    expected = StandardsLoader(str(standards_dir), snapshot_path=str(snapshot)).load_standard("ifc")
+
+    loader = StandardsLoader(str(standards_dir), snapshot_path=str(snapshot))
+    loader.load_standard("2x")
+    snapshot.write_bytes(snapshot.read_bytes() + b"\0")
+    assert loader.load_standard("ifc") == expected
@@ -0,0 +1,60 @@
+"""
+Tests for the local LLM stub server used by the benchmarks.
+"""
+
+import pytest
+
+from engine.metrics import percentile
+from benchmarks.stub_server import StubServer, StubSettings
+from engine.llm_service import LLMServiceManager, ProviderType
+from prompts.enhanced_prompts import REPORT_SECTIONS
+from utils.llm_report_parser import validate_llm_report
+
+
+@pytest.fixture
+def stub_manager(monkeypatch, tmp_path):
+    """A stub server without latency and a manager whose providers all point at it."""
+    for key in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "FIREWORKS_API_KEY"):
+        monkeypatch.setenv(key, "stub-key")
+    with StubServer(StubSettings(ttft_median=0, tokens_per_second=0, retry_after=0.05, seed=7)) as stub:
+        manager = LLMServiceManager(settings={
+            "app": {"cache_dir": str(tmp_path)},
+            "standards": {"cache_enabled": False},
+            "llm": {"api_bases": stub.api_bases(), "retry_delay": 0.05}
+        })
+        yield stub, manager
+        manager.close()
+
+
+def test_stub_speaks_every_provider_protocol(stub_manager):
+    """Each provider gets a complete report from the stub, streamed and not."""
+    stub, manager = stub_manager
+    for provider in ProviderType:
+        report = manager.generate_response(f"analyse {provider.value}", primary_provider=provider,
+                                           use_cache=False)
+        assert validate_llm_report(report, [heading for _, heading in REPORT_SECTIONS]).passed
+        streamed = "".join(manager.stream_response(f"stream {provider.value}", primary_provider=provider,
+                                                   max_tokens=20, use_cache=False))
+        assert 0 < len(streamed) < len(report)
+
+    assert stub.stats.snapshot()["streamed"] == len(ProviderType)
+    assert {row["provider"] for row in manager.metrics.summary()} == {p.value for p in ProviderType}
+
+
+def test_injected_rate_limits_are_retried(stub_manager):
+    """429s from the stub carry Retry-After and are retried by the manager."""
+    stub, manager = stub_manager
+    stub.settings.rate_limit_rate = 0.5
+    for i in range(4):
+        assert manager.generate_response(f"company {i}", use_cache=False)
+    stats = stub.stats.snapshot()
+    assert stats["rate_limited"] > 0
+    assert stats["requests"] == 4 + stats["rate_limited"]
+
+
+def test_percentile_uses_nearest_rank():
+    """Benchmark percentiles use the shared nearest-rank helper."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) is None
@@ -0,0 +1,73 @@
+"""
+Tests for the pre-flight prompt budget check.
+"""
+
+import pytest
+
+from engine.token_budget import (
+    PromptTooLargeError,
+    TRUNCATION_NOTICE,
+    apply_budget,
+    count_tokens,
+    get_tokenizer
+)
+
+
+def test_max_tokens_clamped_to_model_output_limit():
+    """Requests above a model's output limit are clamped instead of failing."""
+    budget = apply_budget("anthropic/claude-3-haiku-20240307", "Short prompt", 16000)
+    assert budget.max_tokens == 4096
+    assert not budget.trimmed
+
+
+def test_max_tokens_clamped_to_remaining_context():
+    """max_tokens never exceeds what is left of the context window."""
+    prompt = "ESG " * 6000
+    budget = apply_budget("gpt-4", prompt, 4000, reserve_tokens=100)
+    assert budget.prompt_tokens + budget.max_tokens <= 8192 - 100
+
+
+def test_oversized_prompt_is_trimmed():
+    """Prompts that leave no room for a response are trimmed from the end."""
+    prompt = "Company context. " + "IFC standard paragraph. " * 5000
+    budget = apply_budget("gpt-4", prompt, 2000, min_completion_tokens=1000)
+    assert budget.trimmed
+    assert budget.prompt.startswith("Company context.")
+    assert budget.prompt.endswith(TRUNCATION_NOTICE)
+    assert budget.max_tokens >= 1000
+
+
+def test_oversized_prefix_is_trimmed_before_prompt():
+    """With a static prefix, the prefix is trimmed and the company-specific prompt kept whole."""
+    prefix = "IFC standard paragraph. " * 5000
+    prompt = "\n# COMPANY INFORMATION\nCompany Name: Acme"
+    budget = apply_budget("gpt-4", prompt, 2000, min_completion_tokens=1000, prefix=prefix)
+    assert budget.trimmed
+    assert budget.prompt == prompt
+    assert budget.prefix.endswith(TRUNCATION_NOTICE)
+    assert budget.prompt_tokens == count_tokens("gpt-4", budget.prefix + budget.prompt)
+
+
+def test_oversized_prompt_rejected():
+    """With overflow='reject' the request fails before any network call."""
+    with pytest.raises(PromptTooLargeError):
+        apply_budget("gpt-4", "word " * 20000, 1000, overflow="reject")
+
+
+def test_tokenizer_is_loaded_once_per_model():
+    """Counting tokens repeatedly reuses the memoized tokenizer."""
+    get_tokenizer.cache_clear()
+    for _ in range(5):
+        count_tokens("gpt-3.5-turbo", "Sustainable finance in Kenya")
+    info = get_tokenizer.cache_info()
+    assert info.misses == 1
+    assert info.hits >= 4
+
+
+def test_litellm_tokenizer_helper_is_available():
+    """The private litellm tokenizer helper still exists, so the cached path is used."""
+    from engine import token_budget
+
+    assert token_budget._select_tokenizer is not None
+    get_tokenizer.cache_clear()
+    assert get_tokenizer("gpt-3.5-turbo") is not None
@@ -0,0 +1,91 @@
+"""
+Tests for pipeline tracing spans and exporters.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import engine.llm_service as llm_service
+from engine import tracing
+from engine.llm_service import LLMServiceManager, ProviderType
+from engine.tracing import InMemoryExporter, JsonlExporter, Tracer, waterfall
+
+
+def test_spans_nest_and_export(tmp_path):
+    """Child spans get their parent's id and every exporter receives the trace."""
+    memory = InMemoryExporter(max_traces=2)
+    tracer = Tracer([memory, JsonlExporter(str(tmp_path / "traces.jsonl"))])
+
+    with tracer.trace("analysis", company="Acme") as root:
+        with tracing.span("llm", model="gpt-4") as llm_span:
+            with tracing.span("llm.request") as request_span:
+                request_span.add(prompt_tokens=10)
+                request_span.add(prompt_tokens=5)
+        with tracing.span("docx") as docx_span:
+            docx_span.set(bytes=1234)
+    assert tracing.current_span() is None
+
+    trace = memory.traces()[0]
+    spans = {s["name"]: s for s in trace["spans"]}
+    assert spans["llm"]["parent_id"] == root.span_id
+    assert spans["llm.request"]["parent_id"] == llm_span.span_id
+    assert spans["llm.request"]["attributes"] == {"prompt_tokens": 15}
+    assert spans["docx"]["attributes"] == {"bytes": 1234}
+    assert {s["trace_id"] for s in trace["spans"]} == {root.trace_id}
+    assert [(row["name"], row["depth"]) for row in waterfall(trace)] == [
+        ("analysis", 0), ("llm", 1), ("llm.request", 2), ("docx", 1)
+    ]
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert json.loads(lines[0])["trace_id"] == root.trace_id
+
+
+def test_errors_are_recorded_on_span_and_trace():
+    """An exception marks the span it escaped from and the trace."""
+    memory = InMemoryExporter()
+    tracer = Tracer([memory])
+
+    with pytest.raises(ValueError):
+        with tracer.trace("analysis"):
+            with tracing.span("parse"):
+                raise ValueError("bad report")
+
+    trace = memory.traces()[0]
+    assert trace["error"] == "ValueError: bad report"
+    assert [s["error"] for s in trace["spans"] if s["name"] == "parse"] == ["ValueError: bad report"]
+
+
+def test_spans_outside_a_trace_are_not_recorded():
+    """Instrumented code runs unchanged when no trace is active."""
+    with tracing.span("llm.request") as span:
+        span.add(prompt_tokens=10)
+    assert span.attributes == {}
+    assert tracing.current_span() is None
+
+
+def test_llm_requests_on_manager_loop_join_the_caller_trace(monkeypatch, tmp_path):
+    """Requests run on the manager loop are traced under the caller's span, with tokens."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai")
+
+    async def fake_acompletion(**kwargs):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="report"))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+        )
+
+    monkeypatch.setattr(llm_service, "acompletion", fake_acompletion)
+    manager = LLMServiceManager(settings={"app": {"cache_dir": str(tmp_path)}})
+    memory = InMemoryExporter()
+    tracer = Tracer([memory])
+
+    with tracer.trace("analysis"):
+        with tracing.span("llm") as llm_span:
+            manager.generate_response("prompt", primary_provider=ProviderType.OPENAI, use_cache=False)
+
+    request = next(s for s in memory.traces()[0]["spans"] if s["name"] == "llm.request")
+    assert request["parent_id"] == llm_span.span_id
+    assert request["attributes"]["provider"] == "openai"
+    assert request["attributes"]["prompt_tokens"] == 10
+    assert request["attributes"]["completion_tokens"] == 20
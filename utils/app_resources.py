@@ -0,0 +1,135 @@
+"""
+Process-wide resources shared by every Streamlit rerun and session.
+Config, standards loader, prompt manager and LLM manager are built once per
+process and rebuilt only when their source files change or invalidate() is called.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import streamlit as st
+import yaml
+from dotenv import load_dotenv
+from loguru import logger
+
+from engine import llm_service
+from engine.llm_service import LLMServiceManager
+from engine.tracing import get_tracer
+from prompts.enhanced_prompts import EnhancedPromptManager
+from standards.loader import StandardsLoader
+from standards.snapshot import SOURCE_PATTERNS
+
+CONFIG_PATH = "config/config.yaml"
+ENV_PATH = ".env"
+STANDARDS_DIR = "standards"
+
+FileVersion = Tuple[Tuple[str, int, int], ...]
+
+_llm_lock = threading.Lock()
+_llm_version: Dict[str, FileVersion] = {}
+
+
+def file_version(*paths: str) -> FileVersion:
+    """Return (path, mtime, size) of the given files and of the standards files under the given directories."""
+    stats = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files = sorted(p for pattern in SOURCE_PATTERNS for p in path.rglob(pattern) if p.is_file())
+        else:
+            files = [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            stats.append((str(file), stat.st_mtime_ns, stat.st_size))
+    return tuple(stats)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_environment(version: FileVersion) -> None:
+    load_dotenv()
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_config(version: FileVersion) -> Dict[str, Any]:
+    logger.info(f"Loading configuration from {CONFIG_PATH}")
+    with open(CONFIG_PATH, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _build_standards_loader(version: FileVersion, settings: Dict[str, Any]) -> StandardsLoader:
+    logger.info(f"Creating standards loader for {STANDARDS_DIR}")
+    return StandardsLoader(
+        STANDARDS_DIR,
+        snapshot_path=settings.get("snapshot_path"),
+        section_index_dir=settings.get("section_index_dir"),
+        max_cached_criteria=settings.get("max_cached_criteria")
+    )
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _build_prompt_manager(
+    version: FileVersion,
+    settings: Dict[str, Any],
+    retrieval: Optional[Dict[str, Any]]
+) -> EnhancedPromptManager:
+    return EnhancedPromptManager(_build_standards_loader(version, settings), retrieval=retrieval)
+
+
+def load_environment() -> None:
+    """Load .env into the process environment, again only when it changes."""
+    _load_environment(file_version(ENV_PATH))
+
+
+def get_config() -> Dict[str, Any]:
+    """Return the parsed config.yaml, re-read only when the file changes.
+
+    The returned dict is shared by every session and must not be modified.
+    """
+    return _load_config(file_version(CONFIG_PATH))
+
+
+def _loader_settings() -> Dict[str, Any]:
+    """Return the standards settings the loader is built from."""
+    settings = get_config().get("standards", {})
+    return {
+        "snapshot_path": settings.get("snapshot_path"),
+        "section_index_dir": settings.get("section_index_dir"),
+        "max_cached_criteria": settings.get("max_cached_criteria")
+    }
+
+
+def get_standards_loader() -> StandardsLoader:
+    """Return the shared standards loader, rebuilt when any standards file or its settings change."""
+    return _build_standards_loader(file_version(STANDARDS_DIR), _loader_settings())
+
+
+def get_prompt_manager() -> EnhancedPromptManager:
+    """Return the shared prompt manager, rebuilt with the standards loader it is bound to."""
+    retrieval = get_config().get("standards", {}).get("retrieval")
+    return _build_prompt_manager(file_version(STANDARDS_DIR), _loader_settings(), retrieval)
+
+
+def get_llm_manager() -> LLMServiceManager:
+    """Return the shared LLM manager, rebuilt when config.yaml changes."""
+    version = file_version(CONFIG_PATH)
+    with _llm_lock:
+        if _llm_version.get("config", version) != version:
+            logger.info(f"{CONFIG_PATH} changed, rebuilding the LLM service manager")
+            llm_service.reset_llm_manager()
+        _llm_version["config"] = version
+        return llm_service.get_llm_manager()
+
+
+def invalidate() -> None:
+    """Drop every cached resource so the next access rebuilds it from disk."""
+    for cached in (_load_environment, _load_config, _build_standards_loader, _build_prompt_manager):
+        cached.clear()
+    with _llm_lock:
+        llm_service.reset_llm_manager()
+        _llm_version.clear()
+    get_tracer.cache_clear()
+    logger.info("Cleared cached app resources")
@@ -1,5 +1,16 @@
 import re
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
+
+# Report sections in output order, with the heading used in the master template
+REPORT_SECTIONS = [
+    ("summary", "1. SUMMARY DASHBOARD"),
+    ("es_classification", "2. E&S CLASSIFICATION"),
+    ("ifc_analysis", "3. E&S IFC ANALYSIS"),
+    ("stakeholder", "4. STAKEHOLDER ENGAGEMENT ANALYSIS"),
+    ("impact", "5. IMPACT ANALYSIS"),
+    ("dd_checklist", "6. DUE DILIGENCE ACTION CHECKLIST"),
+]
 
 def parse_section(text: str, section_title: str) -> str:
     """Extract a section by its title (case-insensitive, flexible heading)."""
@@ -55,18 +66,19 @@ def parse_climate_impact(section: str) -> Dict:
     return result
 
 def parse_impact_alignment(section: str) -> Dict:
+    """Parse the impact pillar assessments from "Pillar: value" lines or "| Pillar | value |" rows."""
     keys = [
-        ("local_entrepreneurship", "Local Entrepreneurship"),
-        ("decent_jobs", "Decent Jobs"),
-        ("climate_action", "Climate Action"),
-        ("gender_empowerment", "Gender Empowerment"),
-        ("resilience", "Resilience"),
-        ("overall_impact", "Overall Impact")
+        ("local_entrepreneurship", r"Local Entrepreneurship"),
+        ("decent_jobs", r"Decent Jobs(?: & Job Creation)?"),
+        ("climate_action", r"Climate Action(?: & Resilience)?"),
+        ("gender_empowerment", r"Gender (?:Lens & )?Empowerment"),
+        ("resilience", r"Resilience"),
+        ("overall_impact", r"Overall Impact")
     ]
     result = {}
     for key, label in keys:
-        m = re.search(rf"{label}[:\-\s]+(.+)", section, re.IGNORECASE)
-        result[key] = m.group(1).strip() if m else ""
+        m = re.search(rf"{label}\**\s*(?:\|\s*([^|\n]+)|[:\-\s]+(.+))", section, re.IGNORECASE)
+        result[key] = (m.group(1) or m.group(2)).strip() if m else ""
     return result
 
 def parse_kpis(section: str) -> List[Dict]:
@@ -79,8 +91,23 @@ def parse_kpis(section: str) -> List[Dict]:
     items = parse_list_section(section)
     return [dict(name=item, target="", frequency="") for item in items]
 
+def report_section_bodies(text: str) -> Dict[str, str]:
+    """Map the key of each REPORT_SECTIONS section found in a report to its text below the heading."""
+    spans = find_section_spans(text, [heading for _, heading in REPORT_SECTIONS])
+    bodies = {}
+    for section, heading in REPORT_SECTIONS:
+        if heading in spans:
+            start, end = spans[heading]
+            block = text[start:end]
+            bodies[section] = block.split("\n", 1)[1].strip() if "\n" in block else ""
+    return bodies
+
 def parse_llm_report(text: str, company_name: str) -> dict:
-    """Parse the LLM output into the structure expected by DocxFormatter."""
+    """Parse the LLM output into the structure expected by DocxFormatter.
+
+    Reads the numbered REPORT_SECTIONS of the master template, falling back to
+    the headings of the earlier report format for older reports.
+    """
     # Initialize with default values
     analysis = {
         "company_name": company_name,
@@ -112,8 +139,10 @@ def parse_llm_report(text: str, company_name: str) -> dict:
     }
 
     try:
+        sections = report_section_bodies(text)
+
         # Executive Summary
-        summary = parse_section(text, "Executive Summary")
+        summary = sections.get("summary") or parse_section(text, "Executive Summary")
         if summary:
             analysis["executive_summary"] = summary
 
@@ -126,8 +155,10 @@ def parse_llm_report(text: str, company_name: str) -> dict:
             if activities:
                 analysis["business_activities"] = activities
 
-        # Environmental Analysis
-        env_analysis = parse_section(text, "Environmental Analysis")
+        # Environmental Analysis: E&S classification and IFC analysis in the current template
+        env_analysis = "\n\n".join(
+            sections[key] for key in ("es_classification", "ifc_analysis") if sections.get(key)
+        ) or parse_section(text, "Environmental Analysis")
         if env_analysis:
             analysis["environmental_analysis"] = env_analysis
 
@@ -139,7 +170,7 @@ def parse_llm_report(text: str, company_name: str) -> dict:
                 analysis["climate_impact"].update(climate_impact)
 
         # Social Analysis
-        social_analysis = parse_section(text, "Social Analysis")
+        social_analysis = sections.get("stakeholder") or parse_section(text, "Social Analysis")
         if social_analysis:
             analysis["social_analysis"] = social_analysis
 
@@ -149,12 +180,20 @@ def parse_llm_report(text: str, company_name: str) -> dict:
             analysis["governance_analysis"] = gov_analysis
 
         # Impact Thesis Alignment
-        impact_section = parse_section(text, "Impact Thesis Alignment")
+        impact_section = sections.get("impact") or parse_section(text, "Impact Thesis Alignment")
         if impact_section:
             impact_alignment = parse_impact_alignment(impact_section)
             if impact_alignment:
                 analysis["impact_alignment"].update(impact_alignment)
 
+        # Due diligence checklist: its list items, or its paragraphs if written as prose
+        checklist = sections.get("dd_checklist")
+        if checklist:
+            analysis["recommendations"]["due_diligence"] = parse_list_section(checklist) or [
+                line.strip() for line in checklist.splitlines()
+                if line.strip() and not line.strip().startswith(("|", "#"))
+            ]
+
         # Recommendations
         rec_section = parse_section(text, "Recommendations")
         if rec_section:
@@ -183,4 +222,110 @@ def parse_llm_report(text: str, company_name: str) -> dict:
         print(f"Warning: Error parsing LLM response: {str(e)}")
         # Return the analysis with default values if parsing fails
 
-    return analysis 
\ No newline at end of file
+    return analysis
+
+TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$")
+
+@dataclass
+class ReportValidation:
+    """Outcome of the structural checks on a generated report."""
+    missing_sections: List[str] = field(default_factory=list)
+    table_errors: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.missing_sections and not self.table_errors
+
+    @property
+    def reasons(self) -> List[str]:
+        """Human-readable reasons the report failed validation."""
+        return (
+            [f"missing section: {section}" for section in self.missing_sections]
+            + self.table_errors
+        )
+
+def section_heading_pattern(section_title: str) -> str:
+    """Regex for a heading with the section title, allowing any numbering prefix."""
+    title = re.sub(r"^\d+\.\s*", "", section_title)
+    return rf"^#+\s*(?:\d+[.)]?\s*)?{re.escape(title)}"
+
+def has_section(text: str, section_title: str) -> bool:
+    """Check for a heading with the section title, allowing any numbering prefix."""
+    return re.search(section_heading_pattern(section_title), text, re.IGNORECASE | re.MULTILINE) is not None
+
+def find_section_spans(text: str, section_titles: List[str]) -> Dict[str, Tuple[int, int]]:
+    """Locate each section as (start, end) offsets, ending where the next listed section starts.
+
+    Subsection headings stay inside their section; sections without a heading are left out.
+    """
+    starts = {}
+    for title in section_titles:
+        match = re.search(section_heading_pattern(title), text, re.IGNORECASE | re.MULTILINE)
+        if match:
+            starts[title] = match.start()
+    ordered = sorted(starts.items(), key=lambda item: item[1])
+    spans = {}
+    for i, (title, start) in enumerate(ordered):
+        end = ordered[i + 1][1] if i + 1 < len(ordered) else len(text)
+        spans[title] = (start, end)
+    return spans
+
+def table_errors(text: str) -> List[str]:
+    """Describe the malformed Markdown tables in a text."""
+    errors = []
+    for number, table in enumerate(find_tables(text), start=1):
+        if len(table) < 2 or not TABLE_SEPARATOR.match(table[1]):
+            errors.append(f"table {number}: missing header separator row")
+            continue
+        columns = count_cells(table[0])
+        bad_rows = [row for row in table[2:] if count_cells(row) != columns]
+        if bad_rows:
+            errors.append(f"table {number}: {len(bad_rows)} row(s) without {columns} cells")
+    return errors
+
+def find_defective_sections(text: str, required_sections: List[str]) -> Dict[str, str]:
+    """Map each required section that is missing, empty or has malformed tables to the reason."""
+    spans = find_section_spans(text or "", required_sections)
+    defects = {}
+    for title in required_sections:
+        if title not in spans:
+            defects[title] = "missing"
+            continue
+        start, end = spans[title]
+        body = text[start:end].split("\n", 1)[1] if "\n" in text[start:end] else ""
+        if not body.strip():
+            defects[title] = "empty"
+            continue
+        errors = table_errors(body)
+        if errors:
+            defects[title] = "; ".join(errors)
+    return defects
+
+def find_tables(text: str) -> List[List[str]]:
+    """Return the Markdown tables in a text as lists of consecutive pipe-delimited lines."""
+    tables, current = [], []
+    for line in text.splitlines():
+        if line.strip().startswith("|"):
+            current.append(line.strip())
+        elif current:
+            tables.append(current)
+            current = []
+    if current:
+        tables.append(current)
+    return tables
+
+def count_cells(row: str) -> int:
+    """Count the cells of a Markdown table row."""
+    return len(row.strip().strip("|").split("|"))
+
+def validate_llm_report(text: str, required_sections: Optional[List[str]] = None) -> ReportValidation:
+    """Check that a report has the required section headings and well-formed tables."""
+    validation = ReportValidation()
+    if not text or not text.strip():
+        validation.missing_sections = list(required_sections or ["report"])
+        return validation
+    validation.missing_sections = [
+        section for section in required_sections or [] if not has_section(text, section)
+    ]
+    validation.table_errors = table_errors(text)
+    return validation